@@ -1,13 +1,14 @@
 from typing import Any
 import httpx
 import json
+import os
 from mcp.server.fastmcp import FastMCP
 
 # Initialize FastMCP server
 mcp = FastMCP("licitaciones")
 
 # Constants
-LICITACIONES_API_BASE = "https://dev.lumacloud.co/apilic"
+LICITACIONES_API_BASE = os.getenv("LICITACIONES_API_BASE", "https://dev.lumacloud.co/apilic")
 USER_AGENT = "licitaciones-app/1.0"
 
 
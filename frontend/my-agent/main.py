@@ -1,36 +1,126 @@
+import os
+import sys
 from pathlib import Path
-from fastapi import FastAPI
+from typing import Any
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from ag_ui_adk import ADKAgent, add_adk_fastapi_endpoint
+from ag_ui.core import RunAgentInput
+from ag_ui_adk import add_adk_fastapi_endpoint
 from google.adk.agents import LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+from google.adk.tools.mcp_tool.mcp_toolset import (
+    StdioServerParameters,
+    StreamableHTTPConnectionParams,
+)
 from google.genai import types
 
+# Módulos compartidos con el servidor MCP (contexto.py y tracing.py, que también usa
+# progreso.py): se importan de su directorio, no de una copia. Con my-agent desplegado
+# solo, LICITACIONES_MCP_SERVER_DIR indica dónde está.
+SERVIDOR_DIR = Path(
+    os.getenv("LICITACIONES_MCP_SERVER_DIR")
+    or Path(__file__).resolve().parent.parent.parent / "mcp server licitaciones" / "mcp_server_licitaciones"
+)
+# Al final: los módulos de my-agent (p. ej. su licitaciones.py) tienen prioridad
+sys.path.append(str(SERVIDOR_DIR))
+
+import tracing
+from contexto import INSTRUCCION, CompactadorContexto
+from progreso import ADKAgentConProgreso, MCPToolsetConProgreso
+from session_store import BoundedSessionService
+from sesion_usuario import verificar
+
 # =========================
 # PATH CONFIGURATION
 # =========================
 BASE_DIR = Path(__file__).resolve().parent
-MCP_SERVER_PATH = BASE_DIR / "licitaciones.py"
+# Servidor MCP que se lanza por stdio: el completo de "mcp server licitaciones" (progreso,
+# caché, límite por llamante, trazas). La copia local licitaciones.py es el conjunto de
+# herramientas original, sin progreso ni trazas: solo se usa si el completo no está junto
+# a este directorio (p. ej. al desplegar my-agent solo) o si se indica con LICITACIONES_MCP_SERVER_PATH.
+SERVIDOR_COMPLETO = SERVIDOR_DIR / "licitaciones.py"
+MCP_SERVER_PATH = Path(
+    os.getenv("LICITACIONES_MCP_SERVER_PATH")
+    or (SERVIDOR_COMPLETO if SERVIDOR_COMPLETO.exists() else BASE_DIR / "licitaciones.py")
+)
+# Si se define (ej: http://localhost:8004/mcp) el agente se conecta por streamable HTTP
+# a un servidor MCP compartido en lugar de lanzar licitaciones.py como subproceso stdio
+MCP_SERVER_URL = os.getenv("LICITACIONES_MCP_URL")
+# Sesiones persistentes en SQLite (el mismo fichero que usa `adk web`) con una caché
+# LRU acotada en memoria: las conversaciones sobreviven a un reinicio
+SESSION_DB_PATH = Path(os.getenv("ADK_SESSION_DB", BASE_DIR / ".adk" / "session.db"))
+SESSION_CACHE_MAX = int(os.getenv("ADK_SESSION_CACHE_MAX", "200"))
+SESSION_CACHE_BYTES = int(float(os.getenv("ADK_SESSION_CACHE_MB", "64")) * 1024 * 1024)
+SESSION_MIN_IDLE = float(os.getenv("ADK_SESSION_MIN_IDLE", "60"))
+# Por encima de este tamaño estimado de la petición se compactan los resultados de
+# herramienta antiguos (se conservan intactos los CONTEXT_KEEP más recientes)
+CONTEXT_MAX_TOKENS = int(os.getenv("ADK_CONTEXT_MAX_TOKENS", "12000"))
+CONTEXT_KEEP = int(os.getenv("ADK_CONTEXT_KEEP", "2"))
+# Trazas OpenTelemetry del agente (LICITACIONES_TRACE_EXPORTER, ver tracing.py); con
+# `adk web` se usa el proveedor que ya haya configurado ADK
+tracing.configurar("licitaciones-agent")
+
+
+def mcp_connection_params():
+    if MCP_SERVER_URL:
+        return StreamableHTTPConnectionParams(url=MCP_SERVER_URL)
+    if MCP_SERVER_PATH != SERVIDOR_COMPLETO:
+        print(f"Servidor MCP por stdio: {MCP_SERVER_PATH} (no es el servidor completo; la copia local no envía progreso)", file=sys.stderr)
+    return StdioServerParameters(
+        # El intérprete del agente: el servidor usa las mismas dependencias (mcp, httpx)
+        command=sys.executable,
+        args=[str(MCP_SERVER_PATH)],
+        env={
+            "PYTHONUNBUFFERED": "1",
+            "PYTHONIOENCODING": "utf-8",
+            # Configuración del servidor (API, caché, límites...)
+            **{clave: valor for clave, valor in os.environ.items() if clave.startswith("LICITACIONES_")},
+            # El subproceso no hereda el entorno: sus trazas (también OTEL_*) se configuran
+            # igual que las del agente y continúan su traza con el traceparent de cada llamada
+            **tracing.entorno(),
+        },
+    )
+
+
+# Cabecera con el token de sesión firmado que route.ts reenvía desde la cookie de la app
+# (ver sesion_usuario.py). Su usuario es el user_id de ADK (sesiones) y el X-Client-Id ante
+# el servidor MCP (límite por usuario). Sin APP_SESSION_SECRET no se acepta ningún token.
+USER_HEADER = os.getenv("ADK_USER_HEADER", "X-User-Session")
+SESSION_SECRET = os.getenv("APP_SESSION_SECRET", "")
+
+
+async def usuario_de_peticion(request: Request, input: RunAgentInput) -> dict[str, Any]:
+    """Lleva al estado del run el usuario del token de sesión, si la firma es válida.
+
+    Siempre se fija la clave (vacía sin token válido) para que el cliente no pueda
+    suplantar a otro usuario enviándola en el estado.
+    """
+    return {"usuario": verificar(request.headers.get(USER_HEADER), SESSION_SECRET) or ""}
+
+
+def usuario_del_run(input: RunAgentInput) -> str:
+    """user_id de ADK: el usuario autenticado o, sin él, uno por conversación (como ag_ui_adk)."""
+    estado = input.state if isinstance(input.state, dict) else {}
+    return estado.get("usuario") or f"thread_user_{input.thread_id}"
+
+
+def cabeceras_llamante(context) -> dict[str, str]:
+    """Identifica al usuario ante el servidor MCP por HTTP, que limita el caudal hacia la API por llamante."""
+    return {"X-Client-Id": context.user_id}
 
 # =========================
 # LLM AGENT
 # =========================
+compactador = CompactadorContexto(max_tokens=CONTEXT_MAX_TOKENS, conservar=CONTEXT_KEEP)
+
 agent = LlmAgent(
     name="assistant",
     model="gemini-2.5-flash",
-    instruction="Eres un asistente experto en gestión de licitaciones públicas. Ayuda a los usuarios a consultar información sobre licitaciones, requisitos, documentos y proporciona análisis inteligentes.",
+    instruction="Eres un asistente experto en gestión de licitaciones públicas. Ayuda a los usuarios a consultar información sobre licitaciones, requisitos, documentos y proporciona análisis inteligentes. " + INSTRUCCION,
     tools=[
-        MCPToolset(
-            connection_params=StdioServerParameters(
-                command="python",
-                args=[str(MCP_SERVER_PATH)],
-                env={
-                    "PYTHONUNBUFFERED": "1",
-                    "PYTHONIOENCODING": "utf-8",
-                },
-            )
-        )
+        # Pide al servidor MCP notificaciones de progreso y le propaga la traza (ver progreso.py)
+        MCPToolsetConProgreso(connection_params=mcp_connection_params(), header_provider=cabeceras_llamante)
     ],
+    before_model_callback=compactador,
     generate_content_config=types.GenerateContentConfig(
         temperature=0.3,
         max_output_tokens=2000,
@@ -40,11 +130,25 @@ agent = LlmAgent(
 # =========================
 # ADK AGENT WRAPPER
 # =========================
-adk_agent = ADKAgent(
+session_service = BoundedSessionService.sqlite(
+    SESSION_DB_PATH,
+    max_sessions=SESSION_CACHE_MAX,
+    max_bytes=SESSION_CACHE_BYTES,
+    min_idle_seconds=SESSION_MIN_IDLE,
+)
+
+# Intercala el progreso de las herramientas con los eventos AG-UI del run
+adk_agent = ADKAgentConProgreso(
     adk_agent=agent,
     app_name="demo_app",
-    user_id="demo_user",
+    user_id_extractor=usuario_del_run,
+    session_service=session_service,
     session_timeout_seconds=3600,
+    # Al caducar, la sesión deja de seguirse pero su historial se queda en disco
+    # (y no se copia a un servicio de memoria en RAM que crecería sin límite)
+    delete_session_on_cleanup=False,
+    save_session_to_memory_on_cleanup=False,
+    # Solo artefactos y credenciales en memoria; las sesiones van a session_service
     use_in_memory_services=True
 )
 
@@ -63,7 +167,7 @@ app.add_middleware(
 )
 
 # Add CopilotKit endpoint
-add_adk_fastapi_endpoint(app, adk_agent)
+add_adk_fastapi_endpoint(app, adk_agent, extract_state_from_request=usuario_de_peticion)
 
 # =========================
 # HEALTH CHECK
@@ -73,7 +177,9 @@ async def health_check():
     return {
         "status": "healthy",
         "agent": "licitaciones_assistant",
-        "mcp_server": str(MCP_SERVER_PATH)
+        "mcp_server": MCP_SERVER_URL or str(MCP_SERVER_PATH),
+        "sessions": session_service.stats(),
+        "context": compactador.stats(),
     }
 
 # =========================
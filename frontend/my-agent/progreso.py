@@ -0,0 +1,115 @@
+"""
+Progreso de las herramientas MCP hacia la interfaz AG-UI.
+
+Las herramientas largas del servidor de licitaciones (expediente, varias licitaciones)
+envían notificaciones MCP de progreso según llega cada sección. ADK no las pide al
+llamar a la herramienta, así que:
+
+- `MCPToolsetConProgreso` pide el progreso en cada `tools/call` y lo entrega al
+  emisor del run AG-UI en curso (una ContextVar: cada run tiene el suyo).
+- `ADKAgentConProgreso` mezcla esos avisos con los eventos normales del run como
+  eventos `CUSTOM` con nombre `tool_progress`. Al terminar la herramienta se envía
+  uno con `"done": true`.
+
+El valor del evento es `{"tool", "progress", "total", "message", "done"}`; route.ts lo
+convierte en estado del agente para que la interfaz lo pinte.
+
+Con las trazas activas (tracing.py) cada run abre un span raíz del que cuelgan los de
+ADK (modelo y herramientas), la apertura de cada sesión MCP (arranque del subproceso
+stdio) tiene su span y cada `tools/call` envía `traceparent` en `_meta` para que el
+servidor MCP continúe la traza.
+"""
+import asyncio
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator
+
+from ag_ui.core import BaseEvent, CustomEvent, RunAgentInput
+from ag_ui_adk import ADKAgent
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
+
+import tracing
+
+EVENTO = "tool_progress"
+
+_emisor: ContextVar[Callable[[dict[str, Any]], None] | None] = ContextVar("emisor_progreso", default=None)
+
+
+class _SesionConProgreso:
+    """ClientSession de MCP que pide progreso en `call_tool`, lo reenvía al emisor del run y propaga la traza."""
+
+    def __init__(self, session: Any):
+        self._session = session
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self._session, nombre)
+
+    async def call_tool(self, name: str, arguments: dict[str, Any] | None = None, *args: Any, **kwargs: Any) -> Any:
+        if tracing.activo:
+            kwargs["meta"] = tracing.inyectar(dict(kwargs.get("meta") or {}))
+        emitir = _emisor.get()
+        if emitir is None or kwargs.get("progress_callback") is not None:
+            return await self._session.call_tool(name, arguments, *args, **kwargs)
+
+        async def al_progresar(progress: float, total: float | None, message: str | None) -> None:
+            emitir({"tool": name, "progress": progress, "total": total, "message": message, "done": False})
+
+        try:
+            return await self._session.call_tool(name, arguments, *args, progress_callback=al_progresar, **kwargs)
+        finally:
+            emitir({"tool": name, "progress": None, "total": None, "message": None, "done": True})
+
+
+class _GestorConProgreso:
+    """Envuelve el MCPSessionManager de ADK para que sus sesiones sean `_SesionConProgreso`."""
+
+    def __init__(self, gestor: Any):
+        self._gestor = gestor
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self._gestor, nombre)
+
+    async def create_session(self, *args: Any, **kwargs: Any) -> _SesionConProgreso:
+        # ADK reutiliza la sesión abierta: el span solo dura de verdad cuando la abre (stdio: arranca el proceso)
+        with tracing.span("mcp session"):
+            return _SesionConProgreso(await self._gestor.create_session(*args, **kwargs))
+
+
+class MCPToolsetConProgreso(MCPToolset):
+    """MCPToolset cuyas herramientas piden notificaciones de progreso al servidor."""
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        # Las herramientas que crea get_tools() comparten este gestor de sesiones
+        self._mcp_session_manager = _GestorConProgreso(self._mcp_session_manager)
+
+
+class ADKAgentConProgreso(ADKAgent):
+    """ADKAgent que intercala los eventos `tool_progress` con los del run."""
+
+    async def run(self, input: RunAgentInput) -> AsyncGenerator[BaseEvent, None]:
+        cola: asyncio.Queue = asyncio.Queue()
+        fin = object()
+
+        async def ejecutar() -> None:
+            # El emisor se fija en esta tarea: la ejecución en segundo plano de ADK la hereda
+            _emisor.set(lambda valor: cola.put_nowait(CustomEvent(name=EVENTO, value=valor)))
+            try:
+                # Raíz de la traza del run: la tarea de ADK en segundo plano hereda el span actual
+                with tracing.span(
+                    "agent run",
+                    kind="server",
+                    **{"gen_ai.operation.name": "invoke_agent", "ag_ui.thread_id": input.thread_id, "ag_ui.run_id": input.run_id},
+                ):
+                    async for event in ADKAgent.run(self, input):
+                        await cola.put(event)
+            finally:
+                await cola.put(fin)
+
+        tarea = asyncio.create_task(ejecutar())
+        try:
+            while (event := await cola.get()) is not fin:
+                yield event
+            await tarea
+        finally:
+            tarea.cancel()
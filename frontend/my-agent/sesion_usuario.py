@@ -0,0 +1,46 @@
+"""
+Usuario autenticado de cada run a partir de un token de sesión firmado.
+
+La app (my-copilot-app) guarda tras el login una cookie con el token que crea
+`firmarSesion` en `app/lib/sesion.ts`; route.ts la reenvía al agente en una cabecera.
+El navegador no puede fabricar ni modificar el token sin el secreto compartido
+`APP_SESSION_SECRET`, así que una cabecera con un usuario cualquiera no sirve para
+usar las sesiones, la memoria o el límite de caudal de otro.
+
+Formato: `<usuario en base64url>.<expiración, segundos epoch>.<HMAC-SHA256 hex>`, con
+la firma calculada sobre las dos primeras partes. Es el mismo que en sesion.ts.
+"""
+import base64
+import hashlib
+import hmac
+import time
+
+
+def _firma(datos: str, secreto: str) -> str:
+    return hmac.new(secreto.encode(), datos.encode(), hashlib.sha256).hexdigest()
+
+
+def firmar(usuario: str, secreto: str, validez: float = 8 * 3600, ahora: float | None = None) -> str:
+    """Token de sesión de `usuario` válido `validez` segundos (pruebas y scripts; la app usa sesion.ts)."""
+    codificado = base64.urlsafe_b64encode(usuario.encode()).rstrip(b"=").decode()
+    datos = f"{codificado}.{int((time.time() if ahora is None else ahora) + validez)}"
+    return f"{datos}.{_firma(datos, secreto)}"
+
+
+def verificar(token: str | None, secreto: str, ahora: float | None = None) -> str | None:
+    """Usuario del token si la firma es correcta y no ha caducado; None en otro caso (o sin secreto)."""
+    if not secreto or not token:
+        return None
+    partes = token.split(".")
+    if len(partes) != 3:
+        return None
+    codificado, expira, firma = partes
+    if not hmac.compare_digest(firma, _firma(f"{codificado}.{expira}", secreto)):
+        return None
+    if not expira.isdigit() or int(expira) < (time.time() if ahora is None else ahora):
+        return None
+    try:
+        usuario = base64.urlsafe_b64decode(codificado + "=" * (-len(codificado) % 4)).decode()
+    except ValueError:
+        return None
+    return usuario or None
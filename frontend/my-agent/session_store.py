@@ -0,0 +1,186 @@
+"""
+Almacén de sesiones ADK persistente y con memoria acotada.
+
+`BoundedSessionService` envuelve otro servicio de sesiones (por defecto
+`SqliteSessionService` sobre `.adk/session.db`, el mismo fichero que usa `adk web`):
+
+- Escritura directa: crear sesiones y añadir eventos se guarda siempre en SQLite,
+  así que reiniciar el proceso no pierde ninguna conversación.
+- En memoria solo se mantienen las sesiones usadas recientemente, con un límite
+  por número y por tamaño aproximado (JSON serializado). Al pasarse del límite se
+  descartan las menos usadas que lleven `min_idle_seconds` sin actividad: ya están
+  en disco, así que descartarlas es gratis.
+- Una sesión que no está en memoria se rehidrata desde SQLite la próxima vez que
+  se pide.
+- Las escrituras se serializan con un lock: `SqliteSessionService` abre una conexión
+  por operación y con varias conversaciones a la vez SQLite acaba devolviendo
+  "database is locked". El fichero va en modo WAL para que las lecturas no esperen.
+
+El estado `app:`/`user:` compartido entre sesiones se lee al rehidratar; si otra
+sesión lo cambia, la copia en memoria no lo ve hasta que se descarta.
+"""
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.sqlite_session_service import SqliteSessionService
+
+Clave = tuple[str, str, str]
+
+
+class BoundedSessionService(BaseSessionService):
+    """Caché LRU de sesiones en memoria delante de un servicio persistente."""
+
+    def __init__(
+        self,
+        backend: BaseSessionService,
+        max_sessions: int = 200,
+        max_bytes: int = 64 * 1024 * 1024,
+        min_idle_seconds: float = 60.0,
+    ):
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.min_idle_seconds = min_idle_seconds
+        # clave → (sesión, bytes estimados, último acceso)
+        self._sesiones: OrderedDict[Clave, tuple[Session, int, float]] = OrderedDict()
+        self._bytes = 0
+        self._escritura = asyncio.Lock()
+        self.hits = 0
+        self.rehydrations = 0
+        self.evictions = 0
+
+    @classmethod
+    def sqlite(cls, db_path: str | Path, **kwargs: Any) -> "BoundedSessionService":
+        """Servicio sobre un fichero SQLite (se crea el directorio si no existe)."""
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        backend = SqliteSessionService(str(db_path))
+        # journal_mode=WAL queda guardado en el fichero: vale para las conexiones de aiosqlite
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+        return cls(backend, **kwargs)
+
+    # ----- BaseSessionService -----
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        async with self._escritura:
+            session = await self.backend.create_session(
+                app_name=app_name, user_id=user_id, state=state, session_id=session_id
+            )
+        self._guardar(session)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        clave = (app_name, user_id, session_id)
+        entrada = self._sesiones.get(clave)
+        if entrada is None:
+            session = await self.backend.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            if session is None:
+                return None
+            self.rehydrations += 1
+            self._guardar(session)
+        else:
+            session, tamano, _ = entrada
+            self.hits += 1
+            self._sesiones[clave] = (session, tamano, time.monotonic())
+            self._sesiones.move_to_end(clave)
+        if config is None:
+            # Se devuelve el mismo objeto que se guarda: append_event lo mantiene al día
+            return session
+        return session.model_copy(update={"events": _filtrar_eventos(session.events, config)})
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        return await self.backend.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        async with self._escritura:
+            await self.backend.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        self._olvidar((app_name, user_id, session_id))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        async with self._escritura:
+            event = await self.backend.append_event(session, event)
+        if event.partial:
+            return event
+        clave = (session.app_name, session.user_id, session.id)
+        entrada = self._sesiones.get(clave)
+        if entrada is None or entrada[0] is not session:
+            # Si había otra copia en memoria ya no tiene este evento: se sustituye por esta
+            self._guardar(session)
+            return event
+        tamano = entrada[1] + len(event.model_dump_json(exclude_none=True))
+        self._bytes += tamano - entrada[1]
+        self._sesiones[clave] = (session, tamano, time.monotonic())
+        self._sesiones.move_to_end(clave)
+        self._desalojar()
+        return event
+
+    # ----- caché -----
+
+    def _guardar(self, session: Session) -> None:
+        clave = (session.app_name, session.user_id, session.id)
+        self._olvidar(clave)
+        tamano = len(session.model_dump_json(exclude_none=True))
+        self._sesiones[clave] = (session, tamano, time.monotonic())
+        self._bytes += tamano
+        self._desalojar()
+
+    def _olvidar(self, clave: Clave) -> None:
+        entrada = self._sesiones.pop(clave, None)
+        if entrada is not None:
+            self._bytes -= entrada[1]
+
+    def _desalojar(self) -> None:
+        """Descarta las sesiones inactivas menos usadas hasta volver dentro de los límites.
+
+        Las sesiones con actividad reciente no se descartan (puede haber un run en curso
+        con ese objeto), así que con mucha concurrencia el límite es blando.
+        """
+        limite = time.monotonic() - self.min_idle_seconds
+        for clave in list(self._sesiones):
+            if len(self._sesiones) <= self.max_sessions and self._bytes <= self.max_bytes:
+                return
+            if self._sesiones[clave][2] > limite:
+                # En orden LRU: a partir de aquí todas son más recientes
+                return
+            self._olvidar(clave)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "cached_sessions": len(self._sesiones),
+            "cached_bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "rehydrations": self.rehydrations,
+            "evictions": self.evictions,
+        }
+
+
+def _filtrar_eventos(eventos: list[Event], config: GetSessionConfig) -> list[Event]:
+    if config.num_recent_events:
+        eventos = eventos[-config.num_recent_events:]
+    if config.after_timestamp:
+        eventos = [evento for evento in eventos if evento.timestamp >= config.after_timestamp]
+    return list(eventos)
@@ -0,0 +1,136 @@
+"""
+Prueba de resistencia del almacén de sesiones: RSS del proceso según el número de
+sesiones concurrentes, con `InMemorySessionService` (lo que usaba
+`use_in_memory_services=True`) frente a `BoundedSessionService` sobre SQLite.
+
+Cada sesión simula una conversación de `--turns` turnos (pregunta del usuario,
+respuesta del modelo con una salida de herramienta de `--payload-kb` KB). Las
+sesiones avanzan a la vez, `--concurrency` en paralelo. Cada modo corre en su
+propio proceso para que el RSS de uno no cuente en el otro. Al final se comprueba
+que una instancia nueva (como tras un reinicio) rehidrata las sesiones desde disco.
+
+Uso:
+    uv run soak_sessions.py [--sessions 1000] [--turns 6] [--payload-kb 8]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import random
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from session_store import BoundedSessionService
+
+APP = "demo_app"
+USER = "demo_user"
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for linea in status:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def evento(autor: str, texto: str) -> Event:
+    return Event(
+        author=autor,
+        invocation_id=uuid.uuid4().hex,
+        content=types.Content(role="user" if autor == "user" else "model", parts=[types.Part(text=texto)]),
+    )
+
+
+async def conversar(service, session_id: str, turnos: int, payload: str, semaforo: asyncio.Semaphore) -> None:
+    for turno in range(turnos):
+        async with semaforo:
+            # Como el Runner: se pide la sesión en cada turno y se le añaden los eventos
+            session = await service.get_session(app_name=APP, user_id=USER, session_id=session_id)
+            await service.append_event(session, evento("user", f"Pregunta {turno} sobre la licitación {session_id}"))
+            await service.append_event(session, evento("assistant", payload))
+        await asyncio.sleep(random.random() / 100)
+
+
+async def soak(modo: str, args: argparse.Namespace, db_path: str) -> dict:
+    if modo == "memory":
+        service = InMemorySessionService()
+    else:
+        service = BoundedSessionService.sqlite(
+            db_path,
+            max_sessions=args.cache_sessions,
+            max_bytes=int(args.cache_mb * 1024 * 1024),
+            min_idle_seconds=0.5,
+        )
+    payload = "x" * (args.payload_kb * 1024)
+    semaforo = asyncio.Semaphore(args.concurrency)
+    gc.collect()
+    base = rss_mb()
+    puntos = []
+    creadas = 0
+    inicio = time.perf_counter()
+    for objetivo in args.checkpoints:
+        nuevas = []
+        for _ in range(creadas, objetivo):
+            session = await service.create_session(app_name=APP, user_id=USER)
+            nuevas.append(session.id)
+        creadas = objetivo
+        await asyncio.gather(*(conversar(service, sid, args.turns, payload, semaforo) for sid in nuevas))
+        gc.collect()
+        punto = {
+            "sessions": objetivo,
+            "elapsed_s": round(time.perf_counter() - inicio, 2),
+            "rss_mb": round(rss_mb(), 1),
+            "delta_mb": round(rss_mb() - base, 1),
+        }
+        if isinstance(service, BoundedSessionService):
+            punto["cache"] = service.stats()
+        puntos.append(punto)
+    resultado = {"mode": modo, "elapsed_s": round(time.perf_counter() - inicio, 2), "points": puntos}
+
+    if isinstance(service, BoundedSessionService):
+        # "Reinicio": otra instancia sobre el mismo fichero, sin nada en memoria
+        nuevo = BoundedSessionService.sqlite(db_path)
+        listadas = await nuevo.list_sessions(app_name=APP, user_id=USER)
+        muestra = random.sample(listadas.sessions, min(20, len(listadas.sessions)))
+        eventos = []
+        for session in muestra:
+            rehidratada = await nuevo.get_session(app_name=APP, user_id=USER, session_id=session.id)
+            eventos.append(len(rehidratada.events))
+        resultado["after_restart"] = {
+            "sessions_on_disk": len(listadas.sessions),
+            "sampled": len(muestra),
+            "events_per_session": sorted(set(eventos)),
+        }
+    return resultado
+
+
+def _hijo(modo: str, args: argparse.Namespace, db_path: str) -> dict:
+    return asyncio.run(soak(modo, args, db_path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--payload-kb", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--cache-sessions", type=int, default=200)
+    parser.add_argument("--cache-mb", type=float, default=64)
+    parser.add_argument("--modes", nargs="+", default=["memory", "bounded"], choices=["memory", "bounded"])
+    args = parser.parse_args()
+    args.checkpoints = sorted({max(1, args.sessions * fraccion // 4) for fraccion in (1, 2, 3, 4)})
+
+    informe = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for modo in args.modes:
+            with ProcessPoolExecutor(max_workers=1) as proceso:
+                informe.append(proceso.submit(_hijo, modo, args, str(Path(tmp) / "session.db")).result())
+    print(json.dumps(informe, indent=2))
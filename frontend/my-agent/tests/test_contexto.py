@@ -0,0 +1,61 @@
+"""
+La compactación solo cambia la petición al modelo, nunca el historial de la sesión.
+
+    uv run --with pytest pytest tests
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from google.adk.events import Event
+from google.adk.models import LlmRequest
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+# contexto.py es el del servidor MCP (main.py lo importa del mismo sitio)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "mcp server licitaciones" / "mcp_server_licitaciones"))
+
+from contexto import CompactadorContexto
+
+
+def _resultado(n: int) -> str:
+    return json.dumps({"id": str(n), "descripcion": "x" * 4000, "entidad": "Gobernación"})
+
+
+async def _sesion_con_resultados(turnos: int):
+    servicio = InMemorySessionService()
+    sesion = await servicio.create_session(app_name="test", user_id="u")
+    for n in range(turnos):
+        llamada = types.Part(function_call=types.FunctionCall(
+            id=f"c{n}", name="obtener_detalles_licitacion", args={"licitacion_id": str(n)},
+        ))
+        respuesta = types.Part(function_response=types.FunctionResponse(
+            id=f"c{n}", name="obtener_detalles_licitacion",
+            response={"content": [{"type": "text", "text": _resultado(n)}]},
+        ))
+        for autor, part in (("assistant", llamada), ("user", respuesta)):
+            await servicio.append_event(sesion, Event(
+                author=autor, invocation_id=f"i{n}", content=types.Content(role="model" if autor == "assistant" else "user", parts=[part]),
+            ))
+    return sesion
+
+
+def test_compactar_no_modifica_la_sesion():
+    sesion = asyncio.run(_sesion_con_resultados(6))
+    antes = [evento.model_dump() for evento in sesion.events]
+
+    # Peor caso: la petición comparte los Content de los eventos (ni siquiera copia superficial)
+    peticion = LlmRequest(contents=[evento.content for evento in sesion.events])
+    compactador = CompactadorContexto(max_tokens=2000, conservar=2)
+    compactador(None, peticion)
+
+    assert compactador.resultados_compactados > 0
+    assert [evento.model_dump() for evento in sesion.events] == antes
+    compactados = [
+        part.function_response.response
+        for content in peticion.contents for part in content.parts
+        if part.function_response and part.function_response.response.get("compactado")
+    ]
+    assert len(compactados) == compactador.resultados_compactados
+    assert compactados[0]["llamada"] == {"herramienta": "obtener_detalles_licitacion", "argumentos": {"licitacion_id": "0"}}
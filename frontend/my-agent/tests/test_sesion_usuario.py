@@ -0,0 +1,44 @@
+"""
+El usuario del run solo sale de un token de sesión firmado con el secreto compartido.
+
+    uv run --with pytest pytest tests
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sesion_usuario import firmar, verificar
+
+SECRETO = "secreto-de-prueba"
+
+
+def test_token_valido_devuelve_el_usuario():
+    assert verificar(firmar("ana@example.com", SECRETO), SECRETO) == "ana@example.com"
+
+
+def test_usuario_con_puntos_y_no_ascii():
+    assert verificar(firmar("josé.pérez", SECRETO), SECRETO) == "josé.pérez"
+
+
+def test_rechaza_usuario_cambiado_sin_firmar_de_nuevo():
+    _, expira, firma = firmar("ana", SECRETO).split(".")
+    otro = firmar("luis", SECRETO).split(".")[0]
+    assert verificar(f"{otro}.{expira}.{firma}", SECRETO) is None
+
+
+def test_rechaza_otro_secreto_y_sin_secreto():
+    token = firmar("ana", SECRETO)
+    assert verificar(token, "otro") is None
+    assert verificar(token, "") is None
+
+
+def test_rechaza_token_caducado():
+    token = firmar("ana", SECRETO, validez=60, ahora=1000)
+    assert verificar(token, SECRETO, ahora=1059) == "ana"
+    assert verificar(token, SECRETO, ahora=1061) is None
+
+
+def test_rechaza_cabeceras_sin_formato_de_token():
+    for valor in (None, "", "ana", "a.b", "a.b.c.d"):
+        assert verificar(valor, SECRETO) is None
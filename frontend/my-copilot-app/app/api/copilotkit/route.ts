@@ -3,18 +3,68 @@ import {
   ExperimentalEmptyAdapter,
   copilotRuntimeNextJSAppRouterEndpoint,
 } from "@copilotkit/runtime";
-import { HttpAgent } from "@ag-ui/client";
+import {
+  HttpAgent,
+  EventType,
+  type BaseEvent,
+  type CustomEvent,
+  type RunAgentInput,
+  type StateDeltaEvent,
+} from "@ag-ui/client";
 import { NextRequest } from "next/server";
+import { Observable, map } from "rxjs";
+import { COOKIE_SESION, verificarSesion } from "@/app/lib/sesion";
 
 const serviceAdapter = new ExperimentalEmptyAdapter();
 
-const runtime = new CopilotRuntime({
-  agents: {
-    my_agent: new HttpAgent({ url: "http://localhost:8000/" }),
+// Valor de los eventos "tool_progress" (ver progreso.py en my-agent)
+type ProgresoHerramienta = {
+  tool: string;
+  progress: number | null;
+  total: number | null;
+  message: string | null;
+  done: boolean;
+};
+
+// El agente (main.py) reenvía las notificaciones MCP de progreso como eventos CUSTOM
+// "tool_progress". Aquí se convierten en un cambio del estado del agente
+// (`tool_progress`), que page.tsx pinta en el chat mientras la herramienta trabaja.
+function progresoComoEstado(event: BaseEvent): BaseEvent {
+  if (event.type !== EventType.CUSTOM || (event as CustomEvent).name !== "tool_progress") {
+    return event;
+  }
+  const progreso = (event as CustomEvent).value as ProgresoHerramienta | undefined;
+  const delta: StateDeltaEvent = {
+    type: EventType.STATE_DELTA,
+    delta: [{ op: "add", path: "/tool_progress", value: !progreso || progreso.done ? null : progreso }],
+  };
+  return delta;
+}
+
+class LicitacionesAgent extends HttpAgent {
+  run(input: RunAgentInput): Observable<BaseEvent> {
+    return super.run(input).pipe(map(progresoComoEstado));
   }
-});
+}
+
+// Usuario de la petición: el de la cookie de sesión firmada que pone el login de la app
+// (ver app/lib/sesion.ts), nunca una cabecera que el navegador pueda escribir. Se reenvía
+// el token, no el usuario: el agente comprueba la firma y lo usa como user_id de ADK y
+// como identidad ante el servidor MCP, que limita por usuario las peticiones a la API.
+const CABECERA_SESION = "x-user-session";
 
 export const POST = async (req: NextRequest) => {
+  const token = req.cookies.get(COOKIE_SESION)?.value;
+  const autenticado = verificarSesion(token) !== null;
+  const runtime = new CopilotRuntime({
+    agents: {
+      my_agent: new LicitacionesAgent({
+        url: "http://localhost:8000/",
+        headers: autenticado && token ? { [CABECERA_SESION]: token } : {},
+      }),
+    },
+  });
+
   const { handleRequest } = copilotRuntimeNextJSAppRouterEndpoint({
     runtime,
     serviceAdapter,
@@ -22,4 +72,4 @@ export const POST = async (req: NextRequest) => {
   });
 
   return handleRequest(req);
-};
\ No newline at end of file
+};
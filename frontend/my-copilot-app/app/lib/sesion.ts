@@ -0,0 +1,44 @@
+import { createHmac, timingSafeEqual } from "crypto";
+
+// Sesión del usuario autenticado: un token firmado con APP_SESSION_SECRET (el mismo
+// secreto que usa el agente en sesion_usuario.py) que la app guarda en una cookie
+// httpOnly tras el login. route.ts lo reenvía al agente, que vuelve a comprobar la firma.
+// Formato: <usuario en base64url>.<expiración, segundos epoch>.<HMAC-SHA256 hex>.
+export const COOKIE_SESION = "licitaciones_sesion";
+
+const SECRETO = process.env.APP_SESSION_SECRET ?? "";
+
+function firma(datos: string): string {
+  return createHmac("sha256", SECRETO).update(datos).digest("hex");
+}
+
+// Para el login de la app: `cookies().set(COOKIE_SESION, firmarSesion(id), { httpOnly: true, ... })`
+export function firmarSesion(usuario: string, segundos = 8 * 3600): string {
+  if (!SECRETO) {
+    throw new Error("Falta APP_SESSION_SECRET");
+  }
+  const expira = Math.floor(Date.now() / 1000) + segundos;
+  const datos = `${Buffer.from(usuario, "utf8").toString("base64url")}.${expira}`;
+  return `${datos}.${firma(datos)}`;
+}
+
+// Usuario del token si la firma es correcta y no ha caducado; null en otro caso
+export function verificarSesion(token: string | undefined): string | null {
+  if (!SECRETO || !token) {
+    return null;
+  }
+  const partes = token.split(".");
+  if (partes.length !== 3) {
+    return null;
+  }
+  const [usuario, expira, recibida] = partes;
+  const esperada = Buffer.from(firma(`${usuario}.${expira}`));
+  const dada = Buffer.from(recibida);
+  if (dada.length !== esperada.length || !timingSafeEqual(dada, esperada)) {
+    return null;
+  }
+  if (!/^\d+$/.test(expira) || Number(expira) < Date.now() / 1000) {
+    return null;
+  }
+  return Buffer.from(usuario, "base64url").toString("utf8") || null;
+}
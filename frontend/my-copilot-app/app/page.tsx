@@ -1,9 +1,41 @@
-import { CopilotSidebar } from "@copilotkit/react-ui"; 
+"use client";
+
+import { useCoAgentStateRender } from "@copilotkit/react-core";
+import { CopilotSidebar } from "@copilotkit/react-ui";
+
+type ProgresoHerramienta = {
+  tool: string;
+  progress: number;
+  total: number | null;
+  message: string | null;
+};
+
+type EstadoAgente = {
+  tool_progress?: ProgresoHerramienta | null;
+};
+
+function Progreso({ tool, progress, total, message }: ProgresoHerramienta) {
+  return (
+    <div style={{ fontSize: 13, margin: "8px 0" }}>
+      <div>
+        {tool}: {message ?? "trabajando…"} {total ? `(${progress}/${total})` : ""}
+      </div>
+      {total ? <progress value={progress} max={total} style={{ width: "100%" }} /> : <progress style={{ width: "100%" }} />}
+    </div>
+  );
+}
+
 export default function Page() {
+  // Progreso de las herramientas largas (ver app/api/copilotkit/route.ts)
+  useCoAgentStateRender<EstadoAgente>({
+    name: "my_agent",
+    render: ({ state }) => (state.tool_progress ? <Progreso {...state.tool_progress} /> : null),
+  });
+
   return (
     <main>
       <h1>Your App</h1>
       <CopilotSidebar />
     </main>
   );
-}
\ No newline at end of file
+}
@@ -0,0 +1,85 @@
+"""
+Peticiones condicionales (ETag / If-None-Match) contra el stub: bytes descargados
+al refrescar repetidamente el listado y las secciones `completo` y `correo` de
+20 licitaciones, con y sin validadores, cambiando unas pocas licitaciones por ronda.
+
+Uso:
+    python bench_conditional.py [--rounds 10] [--changes 2]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from stub_api import StubConfig, run_stub
+
+IDS = [str(i) for i in range(1, 21)]
+SECCIONES = ("completo", "correo")
+
+
+async def _ronda(licitaciones) -> None:
+    await licitaciones.obtener_listado_licitaciones(refrescar=True)
+    await asyncio.gather(*(
+        licitaciones.fetch_licitacion_seccion(licitacion_id, seccion, refrescar=True)
+        for licitacion_id in IDS
+        for seccion in SECCIONES
+    ))
+
+
+async def medir(licitaciones, config: StubConfig, etags: bool, rounds: int, changes: int) -> dict:
+    config.etags = etags
+    config.bytes_sent = config.not_modified = 0
+    config.hits.clear()
+    config.revisiones.clear()
+    licitaciones.response_cache.clear()
+    licitaciones.validadores_url.clear()
+
+    async with licitaciones.http_client_lifespan():
+        await _ronda(licitaciones)  # descarga inicial
+        bytes_iniciales = config.bytes_sent
+        inicio = time.perf_counter()
+        for ronda in range(rounds):
+            for licitacion_id in IDS[ronda % len(IDS):][:changes]:
+                config.revisiones[licitacion_id] += 1
+            await _ronda(licitaciones)
+        duracion = time.perf_counter() - inicio
+
+    peticiones = sum(config.hits.values())
+    return {
+        "etags": etags,
+        "initial_bytes": bytes_iniciales,
+        "refresh_bytes": config.bytes_sent - bytes_iniciales,
+        "refresh_requests": peticiones - (1 + len(IDS) * len(SECCIONES)),
+        "not_modified": config.not_modified,
+        "refresh_wall_ms": round(duracion * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--changes", type=int, default=2, help="licitaciones modificadas por ronda")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=args.latency_ms)
+    with run_stub(config) as base_url:
+        os.environ["LICITACIONES_API_BASE"] = base_url
+        os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+        # Cada ronda pide 41 recursos de golpe: sin límite de caudal para medir solo los bytes
+        os.environ["LICITACIONES_RATE_GLOBAL"] = "0"
+        os.environ["LICITACIONES_RATE_PER_CALLER"] = "0"
+        import licitaciones
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        sin = asyncio.run(medir(licitaciones, config, False, args.rounds, args.changes))
+        con = asyncio.run(medir(licitaciones, config, True, args.rounds, args.changes))
+
+    ahorro = 1 - con["refresh_bytes"] / sin["refresh_bytes"] if sin["refresh_bytes"] else 0.0
+    print(json.dumps({"sin_etags": sin, "con_etags": con, "refresh_bytes_saved": f"{ahorro:.1%}"}, indent=2))
@@ -0,0 +1,168 @@
+"""
+Tokens de entrada por llamada al modelo en una conversación guionizada de varios
+turnos, con y sin la compactación de contexto de `contexto.py`.
+
+Los resultados de herramienta son reales (herramientas MCP de licitaciones.py contra
+el stub), con la misma forma que les da ADK. Cada llamada al modelo se reconstruye
+como lo hace ADK (todo el historial) y se mide:
+
+- sin `--live`: tokens estimados (caracteres / 4) de cada petición;
+- con `--live` (requiere GOOGLE_API_KEY): las dos variantes se envían a Gemini en
+  streaming y se registran `prompt_token_count` y el tiempo hasta el primer trozo.
+
+Uso:
+    python bench_context.py [--max-tokens 6000] [--payload-chars 4000] [--live --model gemini-2.5-flash]
+"""
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from google.genai import types
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from stub_api import StubConfig, run_stub
+
+PORT = 8774
+
+# (pregunta del usuario, herramienta, argumentos); sin herramienta el modelo responde con lo que ya tiene
+GUION = [
+    ("¿Qué licitaciones abiertas hay?", "listar_licitaciones", {"estado": "abierta"}),
+    ("Dame toda la información de la licitación 3", "obtener_licitacion_completa", {"licitacion_id": "3"}),
+    ("¿Qué requisitos técnicos pide?", "obtener_requisitos_tecnicos", {"licitacion_id": "3"}),
+    ("¿Y cómo se puntúa?", "obtener_criterios_puntaje", {"licitacion_id": "3"}),
+    ("Ahora la licitación 7 completa", "obtener_licitacion_completa", {"licitacion_id": "7"}),
+    ("¿Qué documentos hay que presentar para la 7?", "obtener_documentos_requeridos", {"licitacion_id": "7"}),
+    ("Enséñame el correo original de la 7", "ver_correo_licitacion", {"licitacion_id": "7"}),
+    ("Resumen IA de la 3", "obtener_resumen_ia", {"licitacion_id": "3"}),
+    ("Y la licitación 12 completa", "obtener_licitacion_completa", {"licitacion_id": "12"}),
+    ("Requisitos financieros de la 12", "obtener_requisitos_financieros", {"licitacion_id": "12"}),
+    ("Compara la 3, la 7 y la 12 en una tabla", None, None),
+    ("¿Cuál me recomiendas y por qué?", None, None),
+]
+
+RESPUESTA = "Resumen de la respuesta del asistente con los datos relevantes de la consulta. " * 5
+
+
+async def resultado_mcp(mcp, herramienta: str, argumentos: dict) -> dict:
+    """El resultado de la herramienta como lo recibe el modelo desde ADK (CallToolResult serializado)."""
+    salida = await mcp.call_tool(herramienta, argumentos)
+    bloques, estructurado = salida if isinstance(salida, tuple) else (salida, None)
+    respuesta = {"content": [b.model_dump(exclude_none=True, mode="json") for b in bloques], "isError": False}
+    if estructurado is not None:
+        respuesta["structuredContent"] = estructurado
+    return respuesta
+
+
+async def peticiones(mcp) -> list[tuple[int, list[types.Content]]]:
+    """Contenido de cada llamada al modelo a lo largo del guion: (turno, contents)."""
+    historial: list[types.Content] = []
+    llamadas = []
+    for turno, (pregunta, herramienta, argumentos) in enumerate(GUION, 1):
+        historial.append(types.Content(role="user", parts=[types.Part(text=pregunta)]))
+        llamadas.append((turno, copy.deepcopy(historial)))
+        if herramienta:
+            historial.append(types.Content(role="model", parts=[
+                types.Part(function_call=types.FunctionCall(name=herramienta, args=argumentos)),
+            ]))
+            historial.append(types.Content(role="user", parts=[
+                types.Part(function_response=types.FunctionResponse(
+                    name=herramienta, response=await resultado_mcp(mcp, herramienta, argumentos),
+                )),
+            ]))
+            llamadas.append((turno, copy.deepcopy(historial)))
+        historial.append(types.Content(role="model", parts=[types.Part(text=RESPUESTA)]))
+    return llamadas
+
+
+async def primer_trozo(client, modelo: str, contents: list[types.Content], config) -> dict:
+    inicio = time.perf_counter()
+    ttft = None
+    prompt_tokens = None
+    async for trozo in await client.aio.models.generate_content_stream(model=modelo, contents=contents, config=config):
+        if ttft is None:
+            ttft = time.perf_counter() - inicio
+        if trozo.usage_metadata and trozo.usage_metadata.prompt_token_count:
+            prompt_tokens = trozo.usage_metadata.prompt_token_count
+    return {"ttft_ms": round(ttft * 1000, 1), "prompt_tokens": prompt_tokens}
+
+
+async def main(args: argparse.Namespace) -> dict:
+    import licitaciones
+    from contexto import CompactadorContexto, estimar_tokens
+
+    compactador = CompactadorContexto(max_tokens=args.max_tokens, conservar=args.keep)
+    cliente = config = None
+    if args.live:
+        from google import genai
+
+        cliente = genai.Client()
+        herramientas = {tool.name: tool for tool in await licitaciones.mcp.list_tools()}
+        config = types.GenerateContentConfig(
+            max_output_tokens=64,
+            tools=[types.Tool(function_declarations=[
+                types.FunctionDeclaration(
+                    name=nombre, description=herramientas[nombre].description,
+                    parameters_json_schema=herramientas[nombre].inputSchema,
+                )
+                for nombre in sorted({h for _, h, _ in GUION if h})
+            ])],
+        )
+
+    filas = []
+    for turno, contents in await peticiones(licitaciones.mcp):
+        compactado = list(contents)
+        compactador.compactar(compactado)
+        fila = {"turn": turno, "tokens_full": estimar_tokens(contents), "tokens_compacted": estimar_tokens(compactado)}
+        if cliente is not None:
+            fila["live_full"] = await primer_trozo(cliente, args.model, contents, config)
+            fila["live_compacted"] = await primer_trozo(cliente, args.model, compactado, config)
+        filas.append(fila)
+
+    total = sum(f["tokens_full"] for f in filas)
+    total_compactado = sum(f["tokens_compacted"] for f in filas)
+    informe = {
+        "max_tokens": args.max_tokens,
+        "keep": args.keep,
+        "model_calls": len(filas),
+        "estimated_input_tokens": {
+            "full": total,
+            "compacted": total_compactado,
+            "reduction_pct": round(100 * (1 - total_compactado / total), 1),
+            "last_call_full": filas[-1]["tokens_full"],
+            "last_call_compacted": filas[-1]["tokens_compacted"],
+        },
+        "calls": filas,
+    }
+    if cliente is not None:
+        for variante in ("full", "compacted"):
+            informe[f"live_{variante}"] = {
+                "prompt_tokens": sum(f[f"live_{variante}"]["prompt_tokens"] or 0 for f in filas),
+                "ttft_ms_mean": round(statistics.fmean(f[f"live_{variante}"]["ttft_ms"] for f in filas), 1),
+                "ttft_ms_last_3": round(statistics.fmean(f[f"live_{variante}"]["ttft_ms"] for f in filas[-3:]), 1),
+            }
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-tokens", type=int, default=6000)
+    parser.add_argument("--keep", type=int, default=2)
+    parser.add_argument("--payload-chars", type=int, default=4000)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    args = parser.parse_args()
+
+    with run_stub(StubConfig(latency_ms=0, payload_chars=args.payload_chars), port=PORT) as base_url:
+        os.environ["LICITACIONES_API_BASE"] = base_url
+        os.environ["LICITACIONES_PREFETCH"] = "0"
+        os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        print(json.dumps(asyncio.run(main(args)), indent=2, ensure_ascii=False))
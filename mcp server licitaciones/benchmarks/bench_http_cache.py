@@ -0,0 +1,89 @@
+"""
+Bytes en la red y tiempo de cliente (petición + parseo JSON) de la API REST de
+server.py según cómo pida el cliente: sin compresión, con gzip, con brotli y
+revalidando con If-None-Match (304).
+
+Uso:
+    python bench_http_cache.py [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from stub_api import StubConfig, run_stub
+
+PORT = 8770
+RUTAS = ("/api/licitaciones/1", "/api/licitaciones/1/correo", "/api/licitaciones?limit=50")
+
+
+async def medir(ruta: str, accept_encoding: str, revalidar: bool, peticiones: int) -> dict:
+    tiempos = []
+    descargados = 0
+    cuerpo = None
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=30) as client:
+        primera = await client.get(ruta, headers={"Accept-Encoding": accept_encoding})
+        etag = primera.headers["ETag"]
+        for _ in range(peticiones):
+            headers = {"Accept-Encoding": accept_encoding}
+            if revalidar:
+                headers["If-None-Match"] = etag
+            inicio = time.perf_counter()
+            response = await client.get(ruta, headers=headers)
+            # Un 304 reutiliza la copia que el cliente ya tenía parseada
+            cuerpo = cuerpo if response.status_code == 304 else json.loads(response.content)
+            tiempos.append(time.perf_counter() - inicio)
+            descargados += response.num_bytes_downloaded
+    return {
+        "accept_encoding": accept_encoding,
+        "if_none_match": revalidar,
+        "bytes_per_request": round(descargados / peticiones),
+        "mean_ms": round(statistics.fmean(tiempos) * 1000, 3),
+    }
+
+
+async def main(peticiones: int) -> dict:
+    informe = {}
+    for ruta in RUTAS:
+        informe[ruta] = [
+            await medir(ruta, "identity", False, peticiones),
+            await medir(ruta, "gzip", False, peticiones),
+            await medir(ruta, "br", False, peticiones),
+            await medir(ruta, "gzip, br", True, peticiones),
+        ]
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with run_stub(StubConfig(latency_ms=0)) as base_url:
+        os.environ["LICITACIONES_API_BASE"] = base_url
+        os.environ["LICITACIONES_PREFETCH"] = "0"
+        os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+        import server
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        servidor = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=PORT, log_level="warning"))
+        hilo = threading.Thread(target=servidor.run, daemon=True)
+        hilo.start()
+        while not servidor.started:
+            time.sleep(0.01)
+        try:
+            print(json.dumps(asyncio.run(main(args.requests)), indent=2))
+        finally:
+            servidor.should_exit = True
+            hilo.join()
@@ -0,0 +1,78 @@
+"""
+Benchmark: un httpx.AsyncClient por llamada vs. el pool compartido de licitaciones.py.
+
+Uso:
+    python bench_http_pool.py [--calls 500] [--latency-ms 2]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from stub_api import StubConfig, run_stub
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _resumen(tiempos: list[float]) -> dict:
+    return {
+        "calls": len(tiempos),
+        "p50_ms": round(_percentil(tiempos, 50) * 1000, 3),
+        "p99_ms": round(_percentil(tiempos, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(tiempos) * 1000, 3),
+    }
+
+
+async def _cliente_por_llamada(url: str) -> dict:
+    """Comportamiento anterior: un cliente (y una conexión nueva) por llamada."""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, timeout=30.0)
+        response.raise_for_status()
+        return response.json()
+
+
+async def _medir(fn, url: str, calls: int) -> list[float]:
+    tiempos = []
+    for _ in range(calls):
+        inicio = time.perf_counter()
+        await fn(url)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+async def main(calls: int) -> dict:
+    url = f"{licitaciones.LICITACIONES_API_BASE}/api/licitaciones/1/detalles"
+    # Calentamiento de ambos caminos para no medir imports ni el primer connect
+    await _medir(_cliente_por_llamada, url, 5)
+    async with licitaciones.http_client_lifespan():
+        await _medir(licitaciones.make_licitaciones_request, url, 5)
+        despues = await _medir(licitaciones.make_licitaciones_request, url, calls)
+    antes = await _medir(_cliente_por_llamada, url, calls)
+    return {"antes_cliente_por_llamada": _resumen(antes), "despues_pool_compartido": _resumen(despues)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with run_stub(StubConfig(latency_ms=args.latency_ms)) as base_url:
+        os.environ["LICITACIONES_API_BASE"] = base_url
+        os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+        import httpx
+        import licitaciones
+
+        # FastMCP configura logging INFO; httpx registraría cada petición
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        print(json.dumps(asyncio.run(main(args.calls)), indent=2))
@@ -0,0 +1,100 @@
+"""
+Benchmark: tiempo hasta la primera respuesta de una herramienta con MCP por stdio
+(un subproceso licitaciones.py por conexión) vs. streamable HTTP contra un servidor
+ya arrancado y compartido.
+
+Uso:
+    python bench_mcp_startup.py [--runs 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from stub_api import StubConfig, run_stub
+
+SERVER_DIR = Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"
+MCP_PORT = 8767
+
+
+async def _primera_respuesta(session: ClientSession) -> None:
+    await session.initialize()
+    await session.call_tool("obtener_detalles_licitacion", {"licitacion_id": "1"})
+
+
+async def _stdio(env: dict[str, str]) -> float:
+    inicio = time.perf_counter()
+    params = StdioServerParameters(command=sys.executable, args=[str(SERVER_DIR / "licitaciones.py")], env=env)
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await _primera_respuesta(session)
+    return time.perf_counter() - inicio
+
+
+async def _http() -> float:
+    inicio = time.perf_counter()
+    async with streamablehttp_client(f"http://127.0.0.1:{MCP_PORT}/mcp") as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await _primera_respuesta(session)
+    return time.perf_counter() - inicio
+
+
+def _resumen(tiempos: list[float]) -> dict:
+    return {
+        "runs": len(tiempos),
+        "p50_ms": round(statistics.median(tiempos) * 1000, 1),
+        "mean_ms": round(statistics.fmean(tiempos) * 1000, 1),
+        "max_ms": round(max(tiempos) * 1000, 1),
+    }
+
+
+def _esperar_servidor(timeout: float = 30.0) -> None:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            httpx.post(f"http://127.0.0.1:{MCP_PORT}/mcp", timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("El servidor MCP HTTP no arrancó")
+
+
+async def main(env: dict[str, str], runs: int) -> dict:
+    stdio = [await _stdio(env) for _ in range(runs)]
+    http = [await _http() for _ in range(runs)]
+    return {"stdio_subproceso": _resumen(stdio), "streamable_http_compartido": _resumen(http)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with run_stub(StubConfig(latency_ms=2)) as base_url:
+        env = {
+            **os.environ,
+            "LICITACIONES_API_BASE": base_url,
+            "LICITACIONES_MCP_PORT": str(MCP_PORT),
+            "PYTHONUNBUFFERED": "1",
+        }
+        servidor = subprocess.Popen(
+            [sys.executable, str(SERVER_DIR / "licitaciones.py"), "streamable-http"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _esperar_servidor()
+            print(json.dumps(asyncio.run(main(env, args.runs)), indent=2))
+        finally:
+            servidor.terminate()
+            servidor.wait()
@@ -0,0 +1,70 @@
+"""
+Mide el coste de la instrumentación de métricas: una herramienta trivial sin
+decorar frente a la misma herramienta con `instrument_tool`, más el coste de
+observar una petición upstream y de renderizar /metrics.
+
+Uso:
+    python bench_metrics_overhead.py [--calls 200000]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+import metrics
+
+
+async def herramienta(licitacion_id: str) -> str:
+    return '{"id":"' + licitacion_id + '"}'
+
+
+async def medir(fn, calls: int) -> float:
+    inicio = time.perf_counter_ns()
+    for _ in range(calls):
+        await fn("1")
+    return (time.perf_counter_ns() - inicio) / calls
+
+
+def medir_upstream(calls: int) -> float:
+    inicio = time.perf_counter_ns()
+    for _ in range(calls):
+        metrics.upstream_in_flight.inc(endpoint="detalles")
+        t = time.perf_counter()
+        metrics.upstream_duration.observe(time.perf_counter() - t, endpoint="detalles", method="GET")
+        metrics.upstream_in_flight.dec(endpoint="detalles")
+        metrics.upstream_requests.inc(endpoint="detalles", method="GET", status=200)
+        metrics.upstream_response_bytes.observe(2048, endpoint="detalles")
+    return (time.perf_counter_ns() - inicio) / calls
+
+
+def main(calls: int) -> dict:
+    instrumentada = metrics.instrument_tool(herramienta)
+    bare_ns = asyncio.run(medir(herramienta, calls))
+    instrumented_ns = asyncio.run(medir(instrumentada, calls))
+    upstream_ns = medir_upstream(calls)
+
+    inicio = time.perf_counter()
+    texto = metrics.registry.render()
+    render_ms = (time.perf_counter() - inicio) * 1000
+
+    assert metrics.tool_calls.value(tool="herramienta", status="ok") == calls
+    return {
+        "calls": calls,
+        "tool_bare_ns": round(bare_ns, 1),
+        "tool_instrumented_ns": round(instrumented_ns, 1),
+        "tool_overhead_ns": round(instrumented_ns - bare_ns, 1),
+        "upstream_observation_ns": round(upstream_ns, 1),
+        "render_ms": round(render_ms, 3),
+        "render_bytes": len(texto),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+    print(json.dumps(main(args.calls), indent=2))
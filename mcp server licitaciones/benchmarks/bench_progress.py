@@ -0,0 +1,80 @@
+"""
+Notificaciones MCP de progreso de las herramientas de varias secciones, con un
+cliente MCP en memoria (sin LLM ni frontend) contra el stub con latencia.
+
+Para cada herramienta informa el tiempo hasta la primera notificación (lo que el
+usuario tarda en ver algo), el tiempo hasta el resultado completo, y comprueba que
+llega una notificación por sección/licitación con el avance creciente.
+
+Uso:
+    python bench_progress.py [--latency-ms 300] [--concurrency 3]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from stub_api import StubConfig, run_stub
+
+PORT = 8776
+
+LLAMADAS = [
+    ("obtener_expediente_licitacion", {"licitacion_id": "5"}),
+    ("obtener_seccion_licitaciones", {"licitacion_ids": [str(i) for i in range(1, 11)], "seccion": "completo"}),
+]
+
+
+async def medir(session, herramienta: str, argumentos: dict) -> dict:
+    notificaciones = []
+    inicio = time.perf_counter()
+
+    async def al_progresar(avance: float, total: float | None, mensaje: str | None) -> None:
+        notificaciones.append((time.perf_counter() - inicio, avance, total, mensaje))
+
+    resultado = await session.call_tool(herramienta, argumentos, progress_callback=al_progresar)
+    total_s = time.perf_counter() - inicio
+    avances = [avance for _, avance, _, _ in notificaciones]
+    return {
+        "tool": herramienta,
+        "is_error": resultado.isError,
+        "notifications": len(notificaciones),
+        "expected": notificaciones[-1][2] if notificaciones else None,
+        "monotonic": avances == sorted(avances),
+        "first_progress_ms": round(notificaciones[0][0] * 1000, 1) if notificaciones else None,
+        "result_ms": round(total_s * 1000, 1),
+        "messages": [mensaje for _, _, _, mensaje in notificaciones[:3]],
+    }
+
+
+async def main() -> list[dict]:
+    import licitaciones
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    informe = []
+    async with create_connected_server_and_client_session(licitaciones.mcp) as session:
+        for herramienta, argumentos in LLAMADAS:
+            licitaciones.response_cache.clear()
+            informe.append(await medir(session, herramienta, argumentos))
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--concurrency", type=int, default=3)
+    args = parser.parse_args()
+
+    with run_stub(StubConfig(latency_ms=args.latency_ms), port=PORT) as base_url:
+        os.environ["LICITACIONES_API_BASE"] = base_url
+        os.environ["LICITACIONES_PREFETCH"] = "0"
+        os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+        os.environ["LICITACIONES_EXPEDIENTE_MAX_CONCURRENCY"] = str(args.concurrency)
+        os.environ["LICITACIONES_BULK_MAX_CONCURRENCY"] = str(args.concurrency)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        print(json.dumps(asyncio.run(main()), indent=2, ensure_ascii=False))
@@ -0,0 +1,181 @@
+"""
+Límite de caudal hacia la API y planificación por prioridad, a través de la API REST
+(server.py en proceso) contra el stub con latencia.
+
+Varios clientes masivos piden secciones con /api/licitaciones/bulk mientras otro hace
+consultas interactivas sueltas; cada cliente se identifica con X-Client-Id. Se compara:
+
+- `sin_limite`: el limitador desactivado (la API recibe todo lo que llega);
+- `fifo`: límite global y por llamante, pero todas las peticiones con la misma prioridad;
+- `prioridad`: la configuración real, con las peticiones masivas por detrás de las interactivas.
+
+Para cada modo se informa de la latencia de las consultas interactivas, la duración
+de las masivas y el pico de peticiones por segundo que recibe la API. Al final un
+cliente lanza una ráfaga de consultas simultáneas y se cuentan los 429 con Retry-After.
+
+Uso:
+    python bench_ratelimit.py [--rate 10] [--per-caller 5] [--bulk-clients 3] [--bulk-ids 60]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from stub_api import StubConfig, run_stub
+
+PORT = 8777
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def masivo(client, cliente: str, ids: list[str]) -> float:
+    inicio = time.perf_counter()
+    async with client.stream(
+        "POST", "/api/licitaciones/bulk",
+        json={"licitacion_ids": ids, "seccion": "detalles"},
+        headers={"X-Client-Id": cliente},
+    ) as response:
+        async for _ in response.aiter_lines():
+            pass
+    return time.perf_counter() - inicio
+
+
+async def interactivo(client, ids: list[str], intervalo: float) -> list[float]:
+    latencias = []
+    for licitacion_id in ids:
+        inicio = time.perf_counter()
+        response = await client.get(f"/api/licitaciones/{licitacion_id}/tecnicos", headers={"X-Client-Id": "interactivo"})
+        response.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+        await asyncio.sleep(intervalo)
+    return latencias
+
+
+async def escenario(modo: str, args: argparse.Namespace, config: StubConfig) -> dict:
+    import httpx
+    import licitaciones
+    import server
+    from ratelimit import UpstreamRateLimiter, con_prioridad
+
+    activo = modo != "sin_limite"
+    licitaciones.upstream_limiter = UpstreamRateLimiter(
+        rate=args.rate if activo else 0,
+        burst=args.rate,
+        per_caller_rate=args.per_caller if activo else 0,
+        per_caller_burst=args.per_caller * 4,
+    )
+    # En fifo las peticiones masivas no bajan de prioridad
+    licitaciones.con_prioridad = (lambda _: contextlib.nullcontext()) if modo == "fifo" else con_prioridad
+    licitaciones.response_cache.clear()
+    config.hits.clear()
+
+    # Peticiones por segundo que recibe la API, muestreadas cada 100 ms sobre ventanas de 1 s
+    muestras: list[int] = []
+
+    async def muestrear() -> None:
+        historial = []
+        while True:
+            historial.append(sum(config.hits.values()))
+            if len(historial) > 10:
+                muestras.append(historial[-1] - historial[-11])
+            await asyncio.sleep(0.1)
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with licitaciones.http_client_lifespan(), httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        muestreo = asyncio.create_task(muestrear())
+        masivos = [
+            asyncio.create_task(masivo(client, f"masivo-{n}", [f"B{n}-{i}" for i in range(args.bulk_ids)]))
+            for n in range(args.bulk_clients)
+        ]
+        await asyncio.sleep(0.5)
+        latencias = await interactivo(client, [f"I{i}" for i in range(args.interactive)], args.interval)
+        duraciones = await asyncio.gather(*masivos)
+        muestreo.cancel()
+
+    return {
+        "mode": modo,
+        "interactive_ms": {
+            "p50": round(statistics.median(latencias) * 1000, 1),
+            "p95": round(percentil(latencias, 0.95) * 1000, 1),
+            "max": round(max(latencias) * 1000, 1),
+        },
+        "bulk_s": round(max(duraciones), 2),
+        "upstream_requests": sum(config.hits.values()),
+        "upstream_peak_rps": max(muestras, default=0),
+        "limiter": {
+            clave: valor for clave, valor in licitaciones.upstream_limiter.stats().items()
+            if clave in ("admitted", "delayed", "wait_seconds", "rejected")
+        } if activo else None,
+    }
+
+
+async def rafaga(args: argparse.Namespace) -> dict:
+    """Un solo cliente pide muchas licitaciones distintas a la vez: lo que no cabe recibe 429."""
+    import httpx
+    import licitaciones
+    import server
+    from ratelimit import UpstreamRateLimiter
+
+    licitaciones.upstream_limiter = UpstreamRateLimiter(
+        rate=args.rate, burst=args.rate, per_caller_rate=args.per_caller, per_caller_burst=args.per_caller * 4,
+    )
+    licitaciones.response_cache.clear()
+    transport = httpx.ASGITransport(app=server.app)
+    async with licitaciones.http_client_lifespan(), httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        respuestas = await asyncio.gather(*(
+            client.get(f"/api/licitaciones/R{i}/detalles", headers={"X-Client-Id": "rafaga"})
+            for i in range(args.burst_requests)
+        ))
+    limitadas = [r for r in respuestas if r.status_code == 429]
+    return {
+        "requests": len(respuestas),
+        "status": dict(Counter(r.status_code for r in respuestas)),
+        "retry_after": sorted({int(r.headers["Retry-After"]) for r in limitadas}),
+        "detail": limitadas[0].json()["detail"] if limitadas else None,
+    }
+
+
+async def main(args: argparse.Namespace, config: StubConfig) -> dict:
+    informe = {"modes": []}
+    for modo in args.modes:
+        informe["modes"].append(await escenario(modo, args, config))
+    informe["burst"] = await rafaga(args)
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--rate", type=float, default=10)
+    parser.add_argument("--per-caller", type=float, default=5)
+    parser.add_argument("--bulk-clients", type=int, default=3)
+    parser.add_argument("--bulk-ids", type=int, default=60)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.25)
+    parser.add_argument("--burst-requests", type=int, default=60)
+    parser.add_argument("--modes", nargs="+", default=["sin_limite", "fifo", "prioridad"],
+                        choices=["sin_limite", "fifo", "prioridad"])
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=args.latency_ms)
+    with run_stub(config, port=PORT) as base_url:
+        os.environ["LICITACIONES_API_BASE"] = base_url
+        os.environ["LICITACIONES_PREFETCH"] = "0"
+        os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+        os.environ["LICITACIONES_MCP_HTTP"] = "0"
+        # Los clientes del banco llegan por ASGITransport desde 127.0.0.1 y se identifican con X-Client-Id
+        os.environ["LICITACIONES_CALLER_TRUSTED"] = "127.0.0.1"
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        print(json.dumps(asyncio.run(main(args, config)), indent=2, ensure_ascii=False))
@@ -0,0 +1,50 @@
+"""
+Comprueba el agrupamiento de peticiones (single-flight) contra el stub local:
+N llamadas concurrentes a obtener_licitacion_completa("X") deben producir una
+sola petición hacia la API.
+
+Uso:
+    python bench_singleflight.py [--concurrency 100] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from stub_api import StubConfig, run_stub
+
+
+async def main(config: StubConfig, concurrency: int) -> dict:
+    async with licitaciones.http_client_lifespan():
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(
+            *(licitaciones.obtener_licitacion_completa("X") for _ in range(concurrency))
+        )
+        duracion = time.perf_counter() - inicio
+
+    upstream = config.hits["/api/licitaciones/X/completo"]
+    assert len(set(resultados)) == 1, "todas las llamadas deben recibir el mismo resultado"
+    assert upstream == 1, f"se esperaba 1 petición a la API y hubo {upstream}"
+    return {"concurrency": concurrency, "upstream_requests": upstream, "wall_ms": round(duracion * 1000, 3)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=args.latency_ms)
+    with run_stub(config) as base_url:
+        os.environ["LICITACIONES_API_BASE"] = base_url
+        os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+        import licitaciones
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        print(json.dumps(asyncio.run(main(config, args.concurrency)), indent=2))
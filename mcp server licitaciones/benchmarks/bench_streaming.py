@@ -0,0 +1,85 @@
+"""
+Memoria de pico (tracemalloc) por petición de un correo grande a la API REST de
+server.py: ruta normal (descarga, parseo, caché y serialización) frente a
+`?stream=true` (el cuerpo de la API se reenvía por trozos). El stub corre en otro
+proceso para que su memoria no cuente.
+
+Uso:
+    python bench_streaming.py [--correo-mb 5] [--requests 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from stub_api import StubConfig, run_stub_process
+
+PUERTO_STUB = 8766
+PUERTO = 8771
+
+
+async def medir(client: httpx.AsyncClient, stream: bool, peticiones: int) -> dict:
+    import licitaciones
+
+    picos = []
+    tiempos = []
+    recibidos = 0
+    for i in range(peticiones):
+        # Cada petición es un fallo de caché: se mide la descarga completa
+        licitaciones.response_cache.clear()
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        ruta = f"/api/licitaciones/{i}/correo"
+        cabeceras = {"Accept-Encoding": "identity"}
+        async with client.stream("GET", ruta, params={"stream": stream}, headers=cabeceras) as response:
+            async for trozo in response.aiter_raw():
+                recibidos += len(trozo)
+        tiempos.append(time.perf_counter() - inicio)
+        picos.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "stream": stream,
+        "bytes_per_request": round(recibidos / peticiones),
+        "peak_mb": round(statistics.fmean(picos) / 1024 / 1024, 2),
+        "mean_ms": round(statistics.fmean(tiempos) * 1000, 1),
+    }
+
+
+async def main(peticiones: int) -> list[dict]:
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PUERTO}", timeout=60) as client:
+        return [await medir(client, False, peticiones), await medir(client, True, peticiones)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--correo-mb", type=float, default=5)
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=0, correo_chars=int(args.correo_mb * 1024 * 1024))
+    with run_stub_process(config, port=PUERTO_STUB) as base_url:
+        os.environ["LICITACIONES_API_BASE"] = base_url
+        os.environ["LICITACIONES_PREFETCH"] = "0"
+        os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+        import server
+
+        # Servidor real (no ASGITransport, que acumula el cuerpo entero en el cliente)
+        servidor = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=PUERTO, log_level="warning"))
+        hilo = threading.Thread(target=servidor.run, daemon=True)
+        hilo.start()
+        while not servidor.started:
+            time.sleep(0.01)
+        print(json.dumps(asyncio.run(main(args.requests)), indent=2))
+        servidor.should_exit = True
+        hilo.join()
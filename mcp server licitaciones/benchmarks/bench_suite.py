@@ -0,0 +1,356 @@
+"""
+Banco de pruebas de carga de server.py (REST) y de las herramientas MCP, llamadas
+directamente en el proceso y por stdio, contra el stub de la API con latencia,
+tamaño de respuesta y tasa de errores configurables.
+
+Para cada escenario y nivel de concurrencia mide peticiones por segundo, latencias
+p50/p95/p99, errores y la memoria residente (RSS, pico durante el nivel) del
+proceso que atiende. El resultado se guarda en JSON con el commit y la
+configuración; `--compare` muestra la diferencia con un fichero anterior.
+
+Escenarios:
+    rest        server.py en un subproceso, cargado por HTTP
+    mcp_direct  mcp.call_tool() en el mismo proceso que genera la carga
+    mcp_stdio   licitaciones.py por stdio, con llamadas concurrentes en una sesión
+
+Uso:
+    python bench_suite.py [--scenarios rest mcp_direct mcp_stdio] [--concurrency 1 8 32 64]
+                          [--duration 5] [--latency-ms 20] [--payload-chars 4000] [--error-rate 0]
+                          [--no-cache] [--output resultados.json] [--compare anterior.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from stub_api import StubConfig, run_stub_process
+
+BENCH_DIR = Path(__file__).resolve().parent
+SERVER_DIR = BENCH_DIR.parent / "mcp_server_licitaciones"
+RESULTS_DIR = BENCH_DIR / "results"
+PORT = 8772
+PORT_STUB = 8773
+IDS = [str(i) for i in range(1, 201)]
+ESCENARIOS = ("rest", "mcp_direct", "mcp_stdio")
+
+# Mezcla de operaciones: (peso, ruta REST, herramienta MCP, argumentos)
+OPERACIONES = [
+    (0.6, "/api/licitaciones/{id}/detalles", "obtener_detalles_licitacion", {"licitacion_id": "{id}"}),
+    (0.2, "/api/licitaciones?limit=20", "listar_licitaciones", {"limit": 20}),
+    (0.1, "/api/licitaciones/buscar?q=obra", "buscar_licitaciones", {"query": "obra"}),
+    (0.1, "/api/licitaciones/{id}/correo", "ver_correo_licitacion", {"licitacion_id": "{id}"}),
+]
+
+# Una operación de la mezcla: devuelve True si la respuesta es correcta
+Llamada = Callable[[str, str, dict], Awaitable[bool]]
+
+
+def _elegir(rng: random.Random) -> tuple[str, str, dict]:
+    peso, ruta, herramienta, argumentos = rng.choices(OPERACIONES, weights=[op[0] for op in OPERACIONES])[0]
+    licitacion_id = rng.choice(IDS)
+    argumentos = {clave: valor.replace("{id}", licitacion_id) if isinstance(valor, str) else valor
+                  for clave, valor in argumentos.items()}
+    return ruta.replace("{id}", licitacion_id), herramienta, argumentos
+
+
+def _texto_error(texto: str) -> bool:
+    return texto.startswith(("Error", "No se pudo", "No se pudieron"))
+
+
+def _rss_mb(pid: int) -> float | None:
+    """Memoria residente actual del proceso (Linux, /proc); None si no se puede leer."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for linea in status:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _hijo_con(nombre: str) -> int | None:
+    """PID del proceso hijo directo cuya línea de órdenes contiene `nombre`."""
+    for entrada in Path("/proc").iterdir():
+        if not entrada.name.isdigit():
+            continue
+        try:
+            stat = (entrada / "stat").read_text()
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+            if ppid == os.getpid() and nombre in (entrada / "cmdline").read_text():
+                return int(entrada.name)
+        except (OSError, ValueError, IndexError):
+            continue
+    return None
+
+
+def _percentil(valores: list[float], p: int) -> float:
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100)[p - 1]
+
+
+async def _carga(llamar: Llamada, concurrencia: int, duracion: float, pid: int | None) -> dict:
+    """Lanza `concurrencia` usuarios durante `duracion` segundos y resume latencias, errores y RSS."""
+    latencias: list[float] = []
+    errores = 0
+    rss_pico: float | None = None
+    fin = time.perf_counter() + duracion
+
+    async def usuario(semilla: int) -> None:
+        nonlocal errores
+        rng = random.Random(semilla)
+        while time.perf_counter() < fin:
+            ruta, herramienta, argumentos = _elegir(rng)
+            inicio = time.perf_counter()
+            try:
+                correcta = await llamar(ruta, herramienta, argumentos)
+            except Exception:
+                correcta = False
+            latencias.append(time.perf_counter() - inicio)
+            errores += not correcta
+
+    async def muestrear_rss() -> None:
+        nonlocal rss_pico
+        while True:
+            rss = _rss_mb(pid) if pid else None
+            if rss is not None:
+                rss_pico = max(rss_pico or 0.0, rss)
+            await asyncio.sleep(0.2)
+
+    muestreo = asyncio.create_task(muestrear_rss())
+    inicio = time.perf_counter()
+    await asyncio.gather(*(usuario(i) for i in range(concurrencia)))
+    transcurrido = time.perf_counter() - inicio
+    muestreo.cancel()
+    return {
+        "concurrency": concurrencia,
+        "requests": len(latencias),
+        "errors": errores,
+        "throughput_rps": round(len(latencias) / transcurrido, 1),
+        "p50_ms": round(_percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(_percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(_percentil(latencias, 99) * 1000, 2),
+        "rss_mb": round(rss_pico, 1) if rss_pico is not None else None,
+    }
+
+
+async def _niveles(llamar: Llamada, args, pid: int | None) -> list[dict]:
+    if args.warmup:
+        await _carga(llamar, max(args.concurrency), args.warmup, None)
+    return [await _carga(llamar, concurrencia, args.duration, pid) for concurrencia in args.concurrency]
+
+
+def _entorno(base_url: str, args) -> dict[str, str]:
+    directorio = tempfile.mkdtemp(prefix="bench_suite_")
+    env = {
+        **os.environ,
+        "LICITACIONES_API_BASE": base_url,
+        "LICITACIONES_PREFETCH": "0",
+        "LICITACIONES_SNAPSHOT_PATH": os.path.join(directorio, "snapshot.sqlite3"),
+        "LICITACIONES_CACHE_PATH": os.path.join(directorio, "cache.sqlite3"),
+        "PYTHONUNBUFFERED": "1",
+    }
+    if args.no_cache:
+        env["LICITACIONES_CACHE_MAX_ENTRIES"] = "0"
+        env["LICITACIONES_SNAPSHOT_PATH"] = ""
+    return env
+
+
+def escenario_rest(base_url: str, args) -> list[dict]:
+    env = {**_entorno(base_url, args), "PORT": str(PORT), "HOST": "127.0.0.1", "LICITACIONES_WORKERS": "1"}
+    proceso = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=SERVER_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        limite = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{PORT}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > limite:
+                raise RuntimeError("server.py no respondió a /health")
+            time.sleep(0.1)
+
+        async def ejecutar() -> list[dict]:
+            limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+                async def llamar(ruta: str, _herramienta: str, _argumentos: dict) -> bool:
+                    response = await client.get(ruta)
+                    if response.status_code != 200:
+                        return False
+                    data = response.json().get("data")
+                    return not (isinstance(data, str) and _texto_error(data))
+
+                return await _niveles(llamar, args, proceso.pid)
+
+        return asyncio.run(ejecutar())
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        proceso.wait(timeout=60)
+
+
+def _texto_resultado(resultado) -> str:
+    """Texto de la respuesta de `FastMCP.call_tool` (bloques de contenido, con o sin salida estructurada)."""
+    if isinstance(resultado, tuple):
+        resultado = resultado[0]
+    if isinstance(resultado, dict):
+        return str(resultado.get("result", ""))
+    return "".join(getattr(bloque, "text", "") for bloque in resultado)
+
+
+def _mcp_directo(env: dict[str, str], args, conexion) -> None:
+    """Proceso hijo: importa licitaciones.py con el entorno del escenario y mide en su propio proceso."""
+    os.environ.clear()
+    os.environ.update(env)
+    sys.path.insert(0, str(SERVER_DIR))
+    import licitaciones
+
+    async def llamar(_ruta: str, herramienta: str, argumentos: dict) -> bool:
+        return not _texto_error(_texto_resultado(await licitaciones.mcp.call_tool(herramienta, argumentos)))
+
+    async def ejecutar() -> list[dict]:
+        async with licitaciones.http_client_lifespan():
+            return await _niveles(llamar, args, os.getpid())
+
+    conexion.send(asyncio.run(ejecutar()))
+    conexion.close()
+
+
+def escenario_mcp_direct(base_url: str, args) -> list[dict]:
+    receptor, emisor = multiprocessing.Pipe(duplex=False)
+    proceso = multiprocessing.Process(target=_mcp_directo, args=(_entorno(base_url, args), args, emisor))
+    proceso.start()
+    resultados = receptor.recv()
+    proceso.join()
+    return resultados
+
+
+def escenario_mcp_stdio(base_url: str, args) -> list[dict]:
+    params = StdioServerParameters(
+        command=sys.executable, args=[str(SERVER_DIR / "licitaciones.py")], env=_entorno(base_url, args)
+    )
+
+    async def ejecutar() -> list[dict]:
+        with open(os.devnull, "w") as errlog:
+            async with stdio_client(params, errlog=errlog) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+
+                    async def llamar(_ruta: str, herramienta: str, argumentos: dict) -> bool:
+                        resultado = await session.call_tool(herramienta, argumentos)
+                        texto = "".join(getattr(bloque, "text", "") for bloque in resultado.content)
+                        return not resultado.isError and not _texto_error(texto)
+
+                    return await _niveles(llamar, args, _hijo_con("licitaciones.py"))
+
+    return asyncio.run(ejecutar())
+
+
+def _commit() -> dict[str, str | bool | None]:
+    def git(*argumentos: str) -> str | None:
+        try:
+            return subprocess.run(
+                ["git", *argumentos], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    estado = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(estado) if estado is not None else None}
+
+
+def comparar(anterior: dict, actual: dict) -> list[str]:
+    """Líneas con la variación de rendimiento y latencia p95 por escenario y concurrencia."""
+    def indexar(informe: dict) -> dict[tuple[str, int], dict]:
+        return {(fila["scenario"], fila["concurrency"]): fila for fila in informe["results"]}
+
+    def variacion(viejo: float, nuevo: float) -> str:
+        return f"{(nuevo - viejo) / viejo * 100:+.1f}%" if viejo else "n/a"
+
+    previos = indexar(anterior)
+    lineas = [f"Comparado con {anterior['meta'].get('commit')} ({anterior['meta'].get('timestamp')})"]
+    for clave, fila in indexar(actual).items():
+        previa = previos.get(clave)
+        if previa is None:
+            continue
+        lineas.append(
+            f"{clave[0]:>10} c={clave[1]:<4} "
+            f"rps {previa['throughput_rps']:>8} → {fila['throughput_rps']:>8} ({variacion(previa['throughput_rps'], fila['throughput_rps'])})  "
+            f"p95 {previa['p95_ms']:>8} → {fila['p95_ms']:>8} ms ({variacion(previa['p95_ms'], fila['p95_ms'])})  "
+            f"rss {previa['rss_mb']} → {fila['rss_mb']} MB"
+        )
+    return lineas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=ESCENARIOS, default=list(ESCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="Segundos por nivel de concurrencia")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Segundos de calentamiento por escenario")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--payload-chars", type=int, default=4000)
+    parser.add_argument("--correo-chars", type=int, default=20_000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true", help="Desactiva la caché y la copia en disco")
+    parser.add_argument("--output", type=Path, help="Fichero JSON de resultados (por defecto en results/)")
+    parser.add_argument("--compare", type=Path, help="Resultados anteriores con los que comparar")
+    args = parser.parse_args()
+
+    stub = StubConfig(
+        latency_ms=args.latency_ms,
+        correo_chars=args.correo_chars,
+        error_rate=args.error_rate,
+        payload_chars=args.payload_chars,
+    )
+    escenarios = {"rest": escenario_rest, "mcp_direct": escenario_mcp_direct, "mcp_stdio": escenario_mcp_stdio}
+    resultados = []
+    with run_stub_process(stub, port=PORT_STUB) as base_url:
+        for escenario in args.scenarios:
+            for fila in escenarios[escenario](base_url, args):
+                fila = {"scenario": escenario, **fila}
+                resultados.append(fila)
+                print(json.dumps(fila), file=sys.stderr)
+
+    ahora = datetime.now(timezone.utc)
+    informe = {
+        "meta": {
+            **_commit(),
+            "timestamp": ahora.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {clave: str(valor) if isinstance(valor, Path) else valor for clave, valor in vars(args).items()},
+        },
+        "results": resultados,
+    }
+    salida = args.output or RESULTS_DIR / f"{ahora:%Y%m%dT%H%M%S}_{informe['meta']['commit'] or 'sin-commit'}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {salida}")
+    if args.compare:
+        print("\n".join(comparar(json.loads(args.compare.read_text()), informe)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Mide el coste de las trazas: una herramienta con `instrument_tool` que abre los mismos
+spans que una consulta real (herramienta → make_licitaciones_request → petición HTTP)
+con las trazas desactivadas y con distintas tasas de muestreo. Los spans se exportan
+en lote como líneas JSON a /dev/null, igual que con LICITACIONES_TRACE_EXPORTER=file.
+Con muestreo 1 el bucle genera spans más deprisa de lo que se exportan y el
+procesador descarta parte ("Queue full"): `spans_exported` cuenta los exportados.
+
+Uso:
+    python bench_tracing_overhead.py [--calls 50000] [--ratios 0 0.1 1]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+import metrics
+import tracing
+
+
+async def herramienta(licitacion_id: str) -> str:
+    with tracing.span("licitaciones GET detalles", **{"licitaciones.singleflight": "leader"}):
+        with tracing.span("GET", kind="client", **{"http.request.method": "GET", "licitaciones.endpoint": "detalles"}) as span:
+            tracing.inyectar({})
+            tracing.anotar(span, **{"http.response.status_code": 200})
+    return '{"id":"' + licitacion_id + '"}'
+
+
+class Contador(ConsoleSpanExporter):
+    def __init__(self):
+        super().__init__(out=open(os.devnull, "w"), formatter=lambda span: span.to_json(indent=None) + "\n")
+        self.spans = 0
+
+    def export(self, spans):
+        self.spans += len(spans)
+        return super().export(spans)
+
+
+async def medir(fn, calls: int) -> float:
+    inicio = time.perf_counter_ns()
+    for _ in range(calls):
+        await fn("1")
+    return (time.perf_counter_ns() - inicio) / calls
+
+
+def main(calls: int, ratios: list[float]) -> dict:
+    instrumentada = metrics.instrument_tool(herramienta)
+    tracing.activo = False
+    off_ns = asyncio.run(medir(instrumentada, calls))
+    informe = {"calls": calls, "tool_tracing_off_ns": round(off_ns, 1), "sampled": []}
+
+    for ratio in ratios:
+        exportador = Contador()
+        provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(ratio)))
+        provider.add_span_processor(BatchSpanProcessor(exportador))
+        tracing.tracer = provider.get_tracer("licitaciones")
+        tracing.activo = True
+        on_ns = asyncio.run(medir(instrumentada, calls))
+        provider.shutdown()
+        informe["sampled"].append({
+            "ratio": ratio,
+            "tool_ns": round(on_ns, 1),
+            "overhead_ns": round(on_ns - off_ns, 1),
+            "spans_exported": exportador.spans,
+        })
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50000)
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.0, 0.1, 1.0])
+    args = parser.parse_args()
+    print(json.dumps(main(args.calls, args.ratios), indent=2))
@@ -0,0 +1,144 @@
+"""
+Prueba de carga de server.py con distinto número de workers (LICITACIONES_WORKERS).
+
+Para cada configuración arranca `python server.py` contra el stub con la caché
+compartida en SQLite, lanza carga REST durante unos segundos desde varios procesos
+cliente y mide peticiones por segundo y latencias. También informa de cuántas
+peticiones de detalles llegaron a la API (con la caché compartida deben rondar el
+número de IDs distintos, no multiplicarse por los workers) y de cuánto tarda el
+apagado ordenado con SIGTERM.
+
+Uso:
+    python bench_workers.py [--workers 1 2 4] [--duration 10] [--concurrency 64] [--client-procs 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+
+from stub_api import StubConfig, run_stub
+
+SERVER_DIR = Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"
+PORT = 8768
+IDS = [str(i) for i in range(1, 51)]
+
+
+async def _carga(duracion: float, concurrencia: int) -> tuple[int, int, list[float]]:
+    base = f"http://127.0.0.1:{PORT}"
+    latencias: list[float] = []
+    errores = 0
+    fin = time.perf_counter() + duracion
+    limits = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30) as client:
+        async def usuario():
+            nonlocal errores
+            while time.perf_counter() < fin:
+                if random.random() < 0.2:
+                    ruta = "/api/licitaciones?limit=20"
+                else:
+                    ruta = f"/api/licitaciones/{random.choice(IDS)}/detalles"
+                inicio = time.perf_counter()
+                try:
+                    response = await client.get(ruta)
+                    if response.status_code != 200:
+                        errores += 1
+                except httpx.HTTPError:
+                    errores += 1
+                latencias.append(time.perf_counter() - inicio)
+
+        await asyncio.gather(*(usuario() for _ in range(concurrencia)))
+    return len(latencias), errores, latencias
+
+
+def _cliente(duracion: float, concurrencia: int) -> tuple[int, int, list[float]]:
+    return asyncio.run(_carga(duracion, concurrencia))
+
+
+def _esperar_salud(timeout: float = 30.0) -> None:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"http://127.0.0.1:{PORT}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server.py no respondió a /health")
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    return statistics.quantiles(valores, n=100)[int(p) - 1] if len(valores) > 1 else valores[0]
+
+
+def medir(config: StubConfig, base_url: str, workers: int, args) -> dict:
+    cache_path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    env = {
+        **os.environ,
+        "LICITACIONES_API_BASE": base_url,
+        "LICITACIONES_WORKERS": str(workers),
+        "LICITACIONES_CACHE_BACKEND": "sqlite",
+        "LICITACIONES_CACHE_PATH": cache_path,
+        "PORT": str(PORT),
+        "HOST": "127.0.0.1",
+    }
+    config.hits.clear()
+    proceso = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=SERVER_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _esperar_salud()
+        por_cliente = max(1, args.concurrency // args.client_procs)
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor(args.client_procs) as pool:
+            resultados = list(pool.map(_cliente, [args.duration] * args.client_procs, [por_cliente] * args.client_procs))
+        duracion = time.perf_counter() - inicio
+    finally:
+        inicio_apagado = time.perf_counter()
+        proceso.send_signal(signal.SIGTERM)
+        codigo = proceso.wait(timeout=60)
+        apagado = time.perf_counter() - inicio_apagado
+
+    peticiones = sum(r[0] for r in resultados)
+    errores = sum(r[1] for r in resultados)
+    latencias = [lat for r in resultados for lat in r[2]]
+    detalles_upstream = sum(n for ruta, n in config.hits.items() if ruta.endswith("/detalles"))
+    return {
+        "workers": workers,
+        "requests": peticiones,
+        "errors": errores,
+        "rps": round(peticiones / duracion, 1),
+        "p50_ms": round(_percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(_percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(_percentil(latencias, 99) * 1000, 2),
+        "upstream_detalles": detalles_upstream,
+        "distinct_ids": len(IDS),
+        "shutdown_s": round(apagado, 2),
+        "exit_code": codigo,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--client-procs", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=args.latency_ms)
+    with run_stub(config) as base_url:
+        informe = [medir(config, base_url, workers, args) for workers in args.workers]
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": informe}, indent=2))
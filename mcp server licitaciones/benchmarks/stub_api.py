@@ -0,0 +1,213 @@
+"""
+Stub local de la API de Licitaciones para benchmarks.
+
+Expone las mismas rutas que `LICITACIONES_API_BASE` bajo el prefijo `/apilic`
+y cuenta las peticiones recibidas, de modo que los benchmarks pueden apuntar
+`LICITACIONES_API_BASE` a `http://127.0.0.1:<puerto>/apilic`.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+SECCIONES = [
+    "completo",
+    "correo",
+    "detalles",
+    "documentos_requeridos",
+    "experiencia",
+    "financiero",
+    "hv",
+    "resumen_ia",
+    "tecnicos",
+    "puntaje",
+]
+
+
+class StubConfig:
+    """Parámetros del stub modificables en caliente desde el benchmark."""
+
+    def __init__(
+        self,
+        latency_ms: float = 5.0,
+        correo_chars: int = 20_000,
+        error_rate: float = 0.0,
+        etags: bool = True,
+        payload_chars: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.correo_chars = correo_chars
+        # Texto de relleno que se añade a cada sección para simular respuestas más grandes
+        self.payload_chars = payload_chars
+        self.error_rate = error_rate
+        # Con etags=True las respuestas llevan ETag/Last-Modified y se responde 304 si no cambiaron
+        self.etags = etags
+        self.hits: Counter[str] = Counter()
+        self.bytes_sent = 0
+        self.not_modified = 0
+        # Revisión de cada licitación; incrementarla simula un cambio en la API
+        self.revisiones: Counter[str] = Counter()
+
+
+ESTADOS = ["abierta", "cerrada", "en_evaluacion", "adjudicada"]
+ENTIDADES = ["Alcaldía de Bogotá", "Gobernación de Antioquia", "Ministerio de Transporte"]
+
+
+LAST_MODIFIED = "Thu, 01 Oct 2026 00:00:00 GMT"
+
+
+def _licitacion(licitacion_id: str, revision: int = 0) -> dict:
+    n = int(licitacion_id) if licitacion_id.isdigit() else len(licitacion_id)
+    return {
+        "revision": revision,
+        "id": licitacion_id,
+        "titulo": f"Licitación {licitacion_id}",
+        "entidad": ENTIDADES[n % len(ENTIDADES)],
+        "estado": ESTADOS[n % len(ESTADOS)],
+        "fecha_publicacion": f"2026-{n % 12 + 1:02d}-{n % 28 + 1:02d}",
+        "monto": 50_000_000 * (n % 10 + 1),
+        "descripcion": ["Construcción de vía terciaria", "Suministro de equipos de cómputo",
+                        "Interventoría de obra pública", "Consultoría en software"][n % 4],
+    }
+
+
+def _texto(caracteres: int) -> str:
+    linea = "Se invita a presentar propuesta conforme al pliego de condiciones. "
+    return (linea * (caracteres // len(linea) + 1))[:caracteres]
+
+
+def create_app(config: StubConfig) -> Starlette:
+    async def _simular_latencia():
+        if config.latency_ms:
+            await asyncio.sleep(config.latency_ms / 1000)
+
+    def _fallo_simulado() -> JSONResponse | None:
+        if config.error_rate and random.random() < config.error_rate:
+            return JSONResponse({"detail": "Service Unavailable"}, status_code=503)
+        return None
+
+    def _json(request: Request, data) -> Response:
+        body = json.dumps(data, ensure_ascii=False).encode()
+        if not config.etags:
+            config.bytes_sent += len(body)
+            return Response(body, media_type="application/json")
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        headers = {"ETag": etag, "Last-Modified": LAST_MODIFIED}
+        if request.headers.get("if-none-match") == etag:
+            config.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        config.bytes_sent += len(body)
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def listar(request: Request):
+        config.hits["/api/licitaciones"] += 1
+        await _simular_latencia()
+        if fallo := _fallo_simulado():
+            return fallo
+        return _json(request, [_licitacion(str(i), config.revisiones[str(i)]) for i in range(1, 21)])
+
+    async def seccion(request: Request):
+        licitacion_id = request.path_params["licitacion_id"]
+        nombre = request.path_params["seccion"]
+        config.hits[f"/api/licitaciones/{licitacion_id}/{nombre}"] += 1
+        await _simular_latencia()
+        if fallo := _fallo_simulado():
+            return fallo
+        if nombre not in SECCIONES:
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+        data = {**_licitacion(licitacion_id, config.revisiones[licitacion_id]), "seccion": nombre}
+        if nombre == "correo":
+            data["cuerpo"] = _texto(config.correo_chars)
+        if config.payload_chars:
+            data["observaciones"] = _texto(config.payload_chars)
+        return _json(request, data)
+
+    async def estado(request: Request):
+        licitacion_id = request.path_params["licitacion_id"]
+        config.hits[f"POST /api/licitaciones/{licitacion_id}/estado"] += 1
+        body = await request.json()
+        await _simular_latencia()
+        if fallo := _fallo_simulado():
+            return fallo
+        return JSONResponse({"id": licitacion_id, "estado": body.get("estado")})
+
+    return Starlette(routes=[
+        Route("/apilic/api/licitaciones", listar),
+        Route("/apilic/api/licitaciones/{licitacion_id}/estado", estado, methods=["POST"]),
+        Route("/apilic/api/licitaciones/{licitacion_id}/{seccion}", seccion),
+    ])
+
+
+@contextmanager
+def run_stub(config: StubConfig, host: str = "127.0.0.1", port: int = 8765):
+    """Levanta el stub en un hilo aparte y devuelve su URL base (con `/apilic`)."""
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}/apilic"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def _servir(config: StubConfig, host: str, port: int) -> None:
+    uvicorn.run(create_app(config), host=host, port=port, log_level="warning")
+
+
+@contextmanager
+def run_stub_process(config: StubConfig, host: str = "127.0.0.1", port: int = 8765):
+    """Como `run_stub`, pero en otro proceso: su CPU y su memoria no cuentan en las mediciones.
+
+    Los contadores de `config` (hits, bytes_sent) no se actualizan en este proceso.
+    """
+    proceso = multiprocessing.Process(target=_servir, args=(config, host, port), daemon=True)
+    proceso.start()
+    base_url = f"http://{host}:{port}/apilic"
+    limite = time.monotonic() + 30
+    while True:
+        try:
+            httpx.get(f"{base_url}/api/licitaciones", timeout=1)
+            break
+        except httpx.TransportError:
+            if time.monotonic() > limite or not proceso.is_alive():
+                proceso.terminate()
+                raise RuntimeError("El stub de la API no arrancó")
+            time.sleep(0.05)
+    try:
+        yield base_url
+    finally:
+        proceso.terminate()
+        proceso.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub local de la API de Licitaciones")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--payload-chars", type=int, default=0)
+    parser.add_argument("--correo-chars", type=int, default=20_000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        correo_chars=args.correo_chars,
+        error_rate=args.error_rate,
+        payload_chars=args.payload_chars,
+    )
+    _servir(config, "127.0.0.1", args.port)
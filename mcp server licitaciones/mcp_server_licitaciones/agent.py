@@ -1,33 +1,65 @@
+import os
 from pathlib import Path
 from google.adk.agents import LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+from google.adk.tools.mcp_tool.mcp_toolset import (
+    MCPToolset,
+    StdioServerParameters,
+    StreamableHTTPConnectionParams,
+)
 from google.genai import types
 
+import tracing
+from contexto import INSTRUCCION, CompactadorContexto
+
 # =========================
 # PATH RELATIVO SEGURO
 # =========================
 BASE_DIR = Path(__file__).resolve().parent
 MCP_SERVER_PATH = BASE_DIR / "licitaciones.py"
+# Si se define (ej: http://localhost:8004/mcp) el agente se conecta por streamable HTTP
+# a un servidor MCP compartido en lugar de lanzar licitaciones.py como subproceso stdio
+MCP_SERVER_URL = os.getenv("LICITACIONES_MCP_URL")
+# Por encima de este tamaño estimado de la petición se compactan los resultados de
+# herramienta antiguos (se conservan intactos los CONTEXT_KEEP más recientes)
+CONTEXT_MAX_TOKENS = int(os.getenv("ADK_CONTEXT_MAX_TOKENS", "12000"))
+CONTEXT_KEEP = int(os.getenv("ADK_CONTEXT_KEEP", "2"))
+# Trazas OpenTelemetry del agente (LICITACIONES_TRACE_EXPORTER, ver tracing.py); con
+# `adk web` se usa el proveedor que ya haya configurado ADK
+tracing.configurar("licitaciones-agent")
+
+
+def mcp_connection_params():
+    if MCP_SERVER_URL:
+        return StreamableHTTPConnectionParams(url=MCP_SERVER_URL)
+    return StdioServerParameters(
+        command="python",
+        args=[str(MCP_SERVER_PATH)],
+        env={
+            "PYTHONUNBUFFERED": "1",
+            "PYTHONIOENCODING": "utf-8",
+            # El subproceso no hereda el entorno: sus trazas se configuran igual que las del agente
+            **tracing.entorno(),
+        },
+    )
+
+
+def cabeceras_llamante(context) -> dict[str, str]:
+    """Identifica al usuario ante el servidor MCP por HTTP, que limita el caudal hacia la API por llamante."""
+    return {"X-Client-Id": context.user_id}
 
 # =========================
 # AGENTE ADK
 # =========================
+compactador = CompactadorContexto(max_tokens=CONTEXT_MAX_TOKENS, conservar=CONTEXT_KEEP)
+
 root_agent = LlmAgent(
     name="licitaciones_assistant",
     model="gemini-3-flash-preview",
-    instruction="Asistente experto en gestión de licitaciones",
+    instruction="Asistente experto en gestión de licitaciones. " + INSTRUCCION,
     tools=[
-        MCPToolset(
-            connection_params=StdioServerParameters(
-                command="python",
-                args=[str(MCP_SERVER_PATH)],
-                env={
-                    "PYTHONUNBUFFERED": "1",
-                    "PYTHONIOENCODING": "utf-8",
-                },
-            )
-        )
+        MCPToolset(connection_params=mcp_connection_params(), header_provider=cabeceras_llamante)
     ],
+    before_model_callback=compactador,
     generate_content_config=types.GenerateContentConfig(
         temperature=0.3,
         max_output_tokens=1500,
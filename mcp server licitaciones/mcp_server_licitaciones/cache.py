@@ -0,0 +1,243 @@
+"""
+Caché con expiración (TTL) y desalojo LRU para las respuestas de la API de licitaciones.
+Las claves son tuplas (endpoint, licitacion_id).
+
+`TTLCache` vive en la memoria del proceso; `SQLiteCache` guarda las entradas en un
+fichero SQLite (modo WAL) para que varios workers compartan las mismas respuestas.
+"""
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any
+
+CacheKey = tuple[str, str]
+
+
+class TTLCache:
+    """Caché acotada por número de entradas, con TTL por entrada y desalojo LRU."""
+
+    def __init__(self, maxsize: int = 1024, default_ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data: OrderedDict[CacheKey, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey) -> Any | None:
+        """Devuelve el valor vigente para `key` o None si no existe o ya expiró."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            # La entrada expirada se conserva (hasta que el LRU la desaloje) para get_stale
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: CacheKey) -> Any | None:
+        """Devuelve el último valor guardado aunque haya expirado (stale-if-error)."""
+        item = self._data.get(key)
+        return None if item is None else item[1]
+
+    def ttl_restante(self, key: CacheKey) -> float | None:
+        """Segundos de vigencia que le quedan a `key` (None si no está); no cuenta como consulta."""
+        item = self._data.get(key)
+        return None if item is None else item[0] - time.monotonic()
+
+    def set(self, key: CacheKey, value: Any, ttl: float | None = None) -> None:
+        """Guarda `value` durante `ttl` segundos, desalojando las entradas menos usadas."""
+        if ttl is None:
+            ttl = self.default_ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: CacheKey) -> bool:
+        """Elimina una entrada concreta. Devuelve True si existía."""
+        if self._data.pop(key, None) is None:
+            return False
+        self.invalidations += 1
+        return True
+
+    def invalidate_licitacion(self, licitacion_id: str) -> int:
+        """Elimina todas las entradas de una licitación. Devuelve cuántas se borraron."""
+        keys = [key for key in self._data if key[1] == licitacion_id]
+        for key in keys:
+            del self._data[key]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Contadores de uso de la caché."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    endpoint TEXT NOT NULL,
+    licitacion_id TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (endpoint, licitacion_id)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at);
+"""
+
+
+class SQLiteCache:
+    """Caché compartida entre procesos sobre un fichero SQLite, con la misma interfaz que `TTLCache`.
+
+    Los valores se guardan como JSON y la expiración usa el reloj de pared para que
+    todos los procesos la interpreten igual. Cada proceso abre su propia conexión
+    (también tras un fork). Los contadores de hits/misses son de este proceso; el
+    tamaño y las entradas son comunes.
+    """
+
+    def __init__(self, path: str, maxsize: int = 1024, default_ttl: float = 60.0):
+        self.path = path
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            # Una conexión heredada de otro proceso no se puede reutilizar
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: CacheKey) -> Any | None:
+        """Devuelve el valor vigente para `key` o None si no existe o ya expiró."""
+        row = self._db.execute(
+            "SELECT expires_at, value FROM cache WHERE endpoint = ? AND licitacion_id = ?", key
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        ahora = time.time()
+        if row[0] <= ahora:
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._db.execute(
+            "UPDATE cache SET accessed_at = ? WHERE endpoint = ? AND licitacion_id = ?", (ahora, *key)
+        )
+        self.hits += 1
+        return json.loads(row[1])
+
+    def get_stale(self, key: CacheKey) -> Any | None:
+        """Devuelve el último valor guardado aunque haya expirado (stale-if-error)."""
+        row = self._db.execute(
+            "SELECT value FROM cache WHERE endpoint = ? AND licitacion_id = ?", key
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def ttl_restante(self, key: CacheKey) -> float | None:
+        """Segundos de vigencia que le quedan a `key` (None si no está); no cuenta como consulta."""
+        row = self._db.execute(
+            "SELECT expires_at FROM cache WHERE endpoint = ? AND licitacion_id = ?", key
+        ).fetchone()
+        return None if row is None else row[0] - time.time()
+
+    def set(self, key: CacheKey, value: Any, ttl: float | None = None) -> None:
+        """Guarda `value` durante `ttl` segundos, desalojando las entradas menos usadas."""
+        if ttl is None:
+            ttl = self.default_ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        ahora = time.time()
+        db = self._db
+        db.execute(
+            "INSERT OR REPLACE INTO cache (endpoint, licitacion_id, expires_at, accessed_at, value) VALUES (?, ?, ?, ?, ?)",
+            (*key, ahora + ttl, ahora, json.dumps(value, ensure_ascii=False)),
+        )
+        sobrantes = db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.maxsize
+        if sobrantes > 0:
+            db.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY accessed_at LIMIT ?)",
+                (sobrantes,),
+            )
+            self.evictions += sobrantes
+
+    def delete(self, key: CacheKey) -> bool:
+        """Elimina una entrada concreta. Devuelve True si existía."""
+        borradas = self._db.execute(
+            "DELETE FROM cache WHERE endpoint = ? AND licitacion_id = ?", key
+        ).rowcount
+        self.invalidations += borradas
+        return borradas > 0
+
+    def invalidate_licitacion(self, licitacion_id: str) -> int:
+        """Elimina todas las entradas de una licitación. Devuelve cuántas se borraron."""
+        borradas = self._db.execute("DELETE FROM cache WHERE licitacion_id = ?", (licitacion_id,)).rowcount
+        self.invalidations += borradas
+        return borradas
+
+    def clear(self) -> None:
+        self._db.execute("DELETE FROM cache")
+
+    def stats(self) -> dict[str, Any]:
+        """Contadores de uso de la caché (los de aciertos son de este proceso)."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "pid": os.getpid(),
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
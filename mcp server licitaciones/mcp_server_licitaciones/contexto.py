@@ -0,0 +1,206 @@
+"""
+Compactación del contexto de conversación para el agente ADK.
+
+Cada resultado de herramienta (a menudo el volcado completo de `/completo`) queda
+en el historial y se reenvía al modelo en todos los turnos siguientes. Este módulo
+define un `before_model_callback` que, cuando la petición supera un umbral de
+tokens estimados, sustituye los resultados de herramienta antiguos por un resumen
+compacto con la referencia para volver a pedirlos (nombre de la herramienta y
+argumentos), que el modelo puede repetir si necesita el detalle.
+
+Solo se modifica la petición al modelo: los resultados compactados van en Parts y
+Contents nuevos que sustituyen a los de `llm_request.contents`, sin tocar los
+originales. Según la versión, ADK construye la petición con copias profundas o
+superficiales de los eventos, así que modificarlos en sitio podría alterar el
+historial guardado en la sesión.
+"""
+import json
+from typing import Any
+
+# Aproximación habitual para texto mezclado español/JSON
+CARACTERES_POR_TOKEN = 4
+
+AVISO = (
+    "Resultado antiguo compactado para ahorrar contexto. Si necesitas el detalle, "
+    "vuelve a llamar a la herramienta con los mismos argumentos."
+)
+
+INSTRUCCION = (
+    "Algunos resultados antiguos de herramientas pueden aparecer compactados "
+    '("compactado": true) con un resumen y la llamada original. Si necesitas datos '
+    "que no están en el resumen, repite esa llamada con los mismos argumentos."
+)
+
+
+def estimar_tokens(contents: list[Any]) -> int:
+    caracteres = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                caracteres += len(part.text)
+            elif part.function_call:
+                caracteres += len(json.dumps(part.function_call.args or {}, ensure_ascii=False, default=str))
+            elif part.function_response:
+                caracteres += len(json.dumps(part.function_response.response or {}, ensure_ascii=False, default=str))
+    return caracteres // CARACTERES_POR_TOKEN
+
+
+def _texto_resultado(response: dict[str, Any]) -> str:
+    """Texto de un resultado de herramienta MCP ({"content": [{"type": "text", ...}]}) u otra."""
+    bloques = response.get("content")
+    if isinstance(bloques, list):
+        textos = [b.get("text", "") for b in bloques if isinstance(b, dict) and b.get("type") == "text"]
+        if textos:
+            return "\n".join(textos)
+    if isinstance(response.get("result"), str):
+        return response["result"]
+    return json.dumps(response, ensure_ascii=False, default=str)
+
+
+def _resumir_valor(valor: Any, caracteres: int) -> Any:
+    if isinstance(valor, str):
+        return valor if len(valor) <= caracteres else valor[:caracteres] + "…"
+    if isinstance(valor, (int, float, bool)) or valor is None:
+        return valor
+    if isinstance(valor, list):
+        return f"[{len(valor)} elementos]"
+    if isinstance(valor, dict):
+        return f"{{{len(valor)} campos}}"
+    return str(valor)[:caracteres]
+
+
+def resumir(texto: str, caracteres: int = 400) -> Any:
+    """Resumen de un resultado: campos escalares del JSON (o de su primer nivel de `data`) o el inicio del texto."""
+    try:
+        datos = json.loads(texto)
+    except ValueError:
+        return texto if len(texto) <= caracteres else texto[:caracteres] + "…"
+    if isinstance(datos, dict) and isinstance(datos.get("data"), (dict, list)):
+        datos = datos["data"]
+    if isinstance(datos, list):
+        muestra = [
+            {k: _resumir_valor(v, 60) for k, v in item.items() if not isinstance(v, (dict, list))}
+            if isinstance(item, dict) else _resumir_valor(item, 60)
+            for item in datos[:5]
+        ]
+        return {"elementos": len(datos), "primeros": muestra}
+    if isinstance(datos, dict):
+        resumen: dict[str, Any] = {}
+        usados = 0
+        for clave, valor in datos.items():
+            corto = _resumir_valor(valor, 120)
+            usados += len(clave) + len(str(corto))
+            if usados > caracteres:
+                resumen["…"] = f"{len(datos) - len(resumen)} campos más"
+                break
+            resumen[clave] = corto
+        return resumen
+    return datos
+
+
+class CompactadorContexto:
+    """`before_model_callback` que compacta los resultados de herramienta antiguos.
+
+    Se activa cuando la petición supera `max_tokens` estimados. Los `conservar`
+    resultados más recientes no se tocan nunca; del resto se compactan primero los
+    más antiguos hasta bajar del umbral.
+    """
+
+    def __init__(self, max_tokens: int = 12000, conservar: int = 2, caracteres_resumen: int = 400):
+        self.max_tokens = max_tokens
+        self.conservar = conservar
+        self.caracteres_resumen = caracteres_resumen
+        self.peticiones = 0
+        self.peticiones_compactadas = 0
+        self.resultados_compactados = 0
+        self.tokens_antes = 0
+        self.tokens_despues = 0
+
+    def __call__(self, callback_context: Any, llm_request: Any) -> None:
+        self.compactar(llm_request.contents)
+
+    def compactar(self, contents: list[Any]) -> int:
+        """Compacta la lista `contents` y devuelve los tokens estimados resultantes.
+
+        Cada Content con algún resultado compactado se sustituye en la lista por una
+        copia con Parts nuevos; los objetos originales no se modifican.
+        """
+        tokens = estimar_tokens(contents)
+        self.peticiones += 1
+        self.tokens_antes += tokens
+        if tokens > self.max_tokens:
+            candidatos = self._resultados(contents)
+            if self.conservar:
+                candidatos = candidatos[: -self.conservar]
+            compactados = 0
+            for i, j, llamada in candidatos:
+                if tokens <= self.max_tokens:
+                    break
+                part = contents[i].parts[j]
+                antes = len(json.dumps(part.function_response.response, ensure_ascii=False, default=str))
+                if antes <= self.caracteres_resumen * 2:
+                    continue
+                respuesta = {
+                    "compactado": True,
+                    "aviso": AVISO,
+                    "llamada": llamada,
+                    "resumen": resumir(_texto_resultado(part.function_response.response), self.caracteres_resumen),
+                }
+                self._sustituir(contents, i, j, part, respuesta)
+                despues = len(json.dumps(respuesta, ensure_ascii=False, default=str))
+                tokens -= (antes - despues) // CARACTERES_POR_TOKEN
+                compactados += 1
+            if compactados:
+                self.peticiones_compactadas += 1
+                self.resultados_compactados += compactados
+        self.tokens_despues += tokens
+        return tokens
+
+    @staticmethod
+    def _sustituir(contents: list[Any], i: int, j: int, part: Any, respuesta: dict[str, Any]) -> None:
+        """Pone en `contents[i]` una copia del Content cuya Part `j` lleva `respuesta` como resultado."""
+        nueva = part.model_copy(update={
+            "function_response": part.function_response.model_copy(update={"response": respuesta}),
+        })
+        partes = list(contents[i].parts)
+        partes[j] = nueva
+        contents[i] = contents[i].model_copy(update={"parts": partes})
+
+    @staticmethod
+    def _resultados(contents: list[Any]) -> list[tuple[int, int, dict[str, Any]]]:
+        """(índice del Content, índice de la Part, {"herramienta", "argumentos"}) de cada resultado
+        aún sin compactar, del más antiguo al más reciente.
+
+        ADK quita a la petición sus propios ids de llamada, así que cada resultado se
+        empareja con la llamada pendiente más antigua del mismo nombre.
+        """
+        pendientes: list[Any] = []
+        resultados = []
+        for i, content in enumerate(contents):
+            for j, part in enumerate(content.parts or []):
+                if part.function_call:
+                    pendientes.append(part.function_call)
+                elif part.function_response:
+                    respuesta = part.function_response
+                    llamada = next(
+                        (c for c in pendientes if respuesta.id and c.id == respuesta.id), None
+                    ) or next((c for c in pendientes if c.name == respuesta.name), None)
+                    if llamada is not None:
+                        pendientes.remove(llamada)
+                    if isinstance(respuesta.response, dict) and respuesta.response.get("compactado"):
+                        continue
+                    resultados.append((i, j, {
+                        "herramienta": respuesta.name,
+                        "argumentos": dict(llamada.args or {}) if llamada is not None else {},
+                    }))
+        return resultados
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_tokens": self.max_tokens,
+            "requests": self.peticiones,
+            "requests_compacted": self.peticiones_compactadas,
+            "results_compacted": self.resultados_compactados,
+            "estimated_tokens_before": self.tokens_antes,
+            "estimated_tokens_after": self.tokens_despues,
+        }
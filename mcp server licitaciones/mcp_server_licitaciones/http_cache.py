@@ -0,0 +1,169 @@
+"""
+Middleware ASGI de caché HTTP y compresión para las respuestas REST de server.py.
+
+- ETag fuerte calculado sobre el cuerpo; si coincide con `If-None-Match` se responde
+  304 sin cuerpo.
+- `Cache-Control` según la plantilla de ruta (tipo de recurso).
+- Compresión brotli (si el paquete está instalado) o gzip por encima de un tamaño
+  mínimo, según `Accept-Encoding`. La ETag lleva el sufijo de la codificación.
+
+Solo se procesan las respuestas GET completas. Las de error (status distinto de 200)
+y las respuestas en streaming llevan `no-store` y no se comprimen ni reciben ETag: un
+cuerpo enviado por trozos puede cortarse a medias y no debe quedar en ninguna caché.
+MCP (`/mcp`) pasa sin tocar.
+"""
+import gzip
+import hashlib
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se usa gzip
+    brotli = None
+
+SUFIJOS = {"br": "-br", "gzip": "-gz"}
+
+not_modified = metrics.registry.counter(
+    "licitaciones_http_not_modified_total", "Respuestas 304 por If-None-Match", ("route",)
+)
+compressed = metrics.registry.counter(
+    "licitaciones_http_compressed_total", "Respuestas comprimidas por codificación", ("encoding",)
+)
+bytes_saved = metrics.registry.counter(
+    "licitaciones_http_bytes_saved_total", "Bytes que no se enviaron gracias a 304 o compresión", ("reason",)
+)
+
+
+def _etag_base(valor: str) -> str:
+    valor = valor.strip()
+    if valor.startswith("W/"):
+        valor = valor[2:]
+    valor = valor.strip('"')
+    for sufijo in SUFIJOS.values():
+        if valor.endswith(sufijo):
+            return valor[: -len(sufijo)]
+    return valor
+
+
+def coincide_etag(if_none_match: str | None, base: str) -> bool:
+    """True si alguna ETag de `If-None-Match` corresponde al mismo contenido (con cualquier codificación)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_etag_base(valor) == base for valor in if_none_match.split(","))
+
+
+def elegir_codificacion(accept_encoding: str) -> str | None:
+    aceptadas = set()
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        if parametros.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        aceptadas.add(nombre.strip())
+    if brotli is not None and "br" in aceptadas:
+        return "br"
+    if "gzip" in aceptadas:
+        return "gzip"
+    return None
+
+
+def comprimir(body: bytes, codificacion: str) -> bytes:
+    if codificacion == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=6)
+
+
+class HTTPCacheMiddleware:
+    def __init__(
+        self,
+        app,
+        cache_control: dict[str, str],
+        default_cache_control: str = "no-cache",
+        minimum_size: int = 1024,
+        excluded_prefixes: tuple[str, ...] = ("/mcp",),
+    ):
+        self.app = app
+        self.cache_control = cache_control
+        self.default_cache_control = default_cache_control
+        self.minimum_size = minimum_size
+        self.excluded_prefixes = excluded_prefixes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or scope["path"].startswith(self.excluded_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        peticion = Headers(scope=scope)
+        inicio: dict[str, Any] | None = None
+        streaming = False
+
+        async def enviar(message) -> None:
+            nonlocal inicio, streaming
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            if message["type"] != "http.response.body" or streaming:
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # Respuesta en streaming: se deja pasar sin comprimir ni guardar en caché
+                streaming = True
+                MutableHeaders(raw=inicio["headers"]).setdefault("Cache-Control", "no-store")
+                await send(inicio)
+                await send(message)
+                return
+            await self._responder(scope, peticion, inicio, message.get("body", b""), send)
+
+        await self.app(scope, receive, enviar)
+
+    async def _responder(self, scope, peticion: Headers, inicio: dict[str, Any], body: bytes, send) -> None:
+        headers = MutableHeaders(raw=inicio["headers"])
+        route = getattr(scope.get("route"), "path", None)
+        if inicio["status"] != 200:
+            headers.setdefault("Cache-Control", "no-store")
+            await send(inicio)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers.setdefault("Cache-Control", self.cache_control.get(route, self.default_cache_control))
+        if "content-encoding" in headers:
+            await send(inicio)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        base = hashlib.blake2b(body, digest_size=16).hexdigest()
+        codificacion = elegir_codificacion(peticion.get("accept-encoding", "")) if len(body) >= self.minimum_size else None
+        headers["ETag"] = f'"{base}{SUFIJOS.get(codificacion, "")}"'
+        headers.append("Vary", "Accept-Encoding")
+
+        if coincide_etag(peticion.get("if-none-match"), base):
+            not_modified.inc(route=route or "otros")
+            bytes_saved.inc(len(body), reason="not_modified")
+            del headers["content-length"]
+            if "content-type" in headers:
+                del headers["content-type"]
+            await send({**inicio, "status": 304})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if codificacion:
+            comprimido = comprimir(body, codificacion)
+            if len(comprimido) < len(body):
+                compressed.inc(encoding=codificacion)
+                bytes_saved.inc(len(body) - len(comprimido), reason="compression")
+                headers["Content-Encoding"] = codificacion
+                body = comprimido
+            else:
+                headers["ETag"] = f'"{base}"'
+        headers["Content-Length"] = str(len(body))
+        await send(inicio)
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,299 @@
+"""
+Índice local de licitaciones con búsqueda de texto completo (SQLite FTS5) y facetas.
+Se alimenta del listado y de los detalles que ya descarga licitaciones.py y se actualiza
+de forma incremental: solo se reescriben las licitaciones cuyo contenido cambió.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from typing import Any
+
+CAMPOS_TITULO = ("titulo", "nombre", "objeto")
+CAMPOS_ENTIDAD = ("entidad", "entidad_nombre", "entidad_contratante")
+CAMPOS_FECHA = ("fecha_publicacion", "fecha", "fecha_cierre", "fecha_creacion", "created_at")
+CAMPOS_MONTO = ("monto", "valor", "presupuesto", "cuantia", "valor_estimado")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS licitaciones (
+    id TEXT PRIMARY KEY,
+    titulo TEXT,
+    entidad TEXT,
+    estado TEXT,
+    fecha TEXT,
+    monto REAL,
+    hash_listado TEXT,
+    hash_detalles TEXT,
+    texto_listado TEXT,
+    texto_detalles TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_licitaciones_estado ON licitaciones(estado);
+CREATE INDEX IF NOT EXISTS idx_licitaciones_monto ON licitaciones(monto);
+CREATE VIRTUAL TABLE IF NOT EXISTS licitaciones_fts USING fts5(
+    id UNINDEXED, titulo, entidad, texto,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def primer_campo(item: dict[str, Any], campos: tuple[str, ...]) -> Any:
+    for campo in campos:
+        if item.get(campo) not in (None, ""):
+            return item[campo]
+    return None
+
+
+def _a_numero(valor: Any) -> float | None:
+    """Convierte montos como 1500000, "1.500.000", "1.500" o "$ 1,500,000.50" a float.
+
+    Un único separador seguido de exactamente tres dígitos es de miles ("1.500" y
+    "1,500" son 1500); con otra cantidad de dígitos es decimal ("1,5", "2.75").
+    """
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    if not isinstance(valor, str):
+        return None
+    limpio = re.sub(r"[^\d.,]", "", valor)
+    if not limpio:
+        return None
+    if "," in limpio and "." in limpio:
+        decimal = "," if limpio.rfind(",") > limpio.rfind(".") else "."
+        miles = "." if decimal == "," else ","
+        limpio = limpio.replace(miles, "").replace(decimal, ".")
+    elif limpio.count(",") > 1 or limpio.count(".") > 1:
+        limpio = limpio.replace(",", "").replace(".", "")
+    else:
+        entero, separador, fraccion = limpio.replace(",", ".").partition(".")
+        # "0.500" no es un monto con miles: es 0,5
+        if separador and len(fraccion) == 3 and entero.strip("0"):
+            limpio = entero + fraccion
+        else:
+            limpio = entero + separador + fraccion
+    try:
+        return float(limpio)
+    except ValueError:
+        return None
+
+
+def _texto_plano(valor: Any) -> str:
+    """Concatena todos los textos de un objeto JSON anidado."""
+    if isinstance(valor, str):
+        return valor
+    if isinstance(valor, dict):
+        return " ".join(_texto_plano(v) for v in valor.values())
+    if isinstance(valor, list):
+        return " ".join(_texto_plano(v) for v in valor)
+    return ""
+
+
+def hash_contenido(valor: Any) -> str:
+    """Huella estable del contenido JSON de un objeto (independiente del orden de las claves)."""
+    return hashlib.sha1(json.dumps(valor, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _escapar_like(texto: str) -> str:
+    """Escapa los comodines de LIKE para buscar `%` y `_` literales (con ESCAPE '\\')."""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _consulta_fts(query: str) -> str:
+    """Convierte texto libre en una consulta FTS5 segura (AND de prefijos)."""
+    tokens = re.findall(r"\w+", query)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+class IndiceLicitaciones:
+    """Índice de búsqueda sobre SQLite; por defecto vive en memoria."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Conexión por proceso: los workers creados con fork abren la suya
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM licitaciones").fetchone()[0]
+
+    def _sync_fts(self, licitacion_id: str) -> None:
+        row = self._db.execute(
+            "SELECT titulo, entidad, texto_listado, texto_detalles FROM licitaciones WHERE id = ?",
+            (licitacion_id,),
+        ).fetchone()
+        self._db.execute("DELETE FROM licitaciones_fts WHERE id = ?", (licitacion_id,))
+        if row is not None:
+            texto = " ".join(filter(None, (row["texto_listado"], row["texto_detalles"])))
+            self._db.execute(
+                "INSERT INTO licitaciones_fts (id, titulo, entidad, texto) VALUES (?, ?, ?, ?)",
+                (licitacion_id, row["titulo"], row["entidad"], texto),
+            )
+
+    def actualizar_listado(
+        self,
+        licitaciones: list[dict[str, Any]],
+        completo: bool = True,
+        hashes: dict[str, str] | None = None,
+    ) -> list[str]:
+        """Inserta o actualiza las licitaciones del listado cuyo contenido cambió.
+
+        Con `completo=True` el listado se toma como el catálogo entero y se eliminan
+        del índice las licitaciones que ya no aparecen. `hashes` permite reutilizar las
+        huellas ya calculadas por el llamador. Devuelve los IDs modificados.
+        """
+        cambiadas = []
+        vistos = set()
+        with self._db:
+            for item in licitaciones:
+                if not isinstance(item, dict) or item.get("id") in (None, ""):
+                    continue
+                licitacion_id = str(item["id"])
+                vistos.add(licitacion_id)
+                nuevo_hash = hashes[licitacion_id] if hashes and licitacion_id in hashes else hash_contenido(item)
+                row = self._db.execute(
+                    "SELECT hash_listado FROM licitaciones WHERE id = ?", (licitacion_id,)
+                ).fetchone()
+                if row is not None and row["hash_listado"] == nuevo_hash:
+                    continue
+
+                self._db.execute(
+                    """
+                    INSERT INTO licitaciones (id, titulo, entidad, estado, fecha, monto, hash_listado, texto_listado)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        titulo = excluded.titulo, entidad = excluded.entidad, estado = excluded.estado,
+                        fecha = excluded.fecha, monto = COALESCE(excluded.monto, licitaciones.monto),
+                        hash_listado = excluded.hash_listado, texto_listado = excluded.texto_listado
+                    """,
+                    (
+                        licitacion_id,
+                        str(primer_campo(item, CAMPOS_TITULO) or ""),
+                        str(primer_campo(item, CAMPOS_ENTIDAD) or ""),
+                        str(item.get("estado") or "").lower(),
+                        str(primer_campo(item, CAMPOS_FECHA) or "")[:10],
+                        _a_numero(primer_campo(item, CAMPOS_MONTO)),
+                        nuevo_hash,
+                        _texto_plano(item),
+                    ),
+                )
+                self._sync_fts(licitacion_id)
+                cambiadas.append(licitacion_id)
+
+            if completo:
+                existentes = [row["id"] for row in self._db.execute("SELECT id FROM licitaciones")]
+                for licitacion_id in existentes:
+                    if licitacion_id not in vistos:
+                        self._db.execute("DELETE FROM licitaciones WHERE id = ?", (licitacion_id,))
+                        self._sync_fts(licitacion_id)
+                        cambiadas.append(licitacion_id)
+        return cambiadas
+
+    def actualizar_detalles(self, licitacion_id: str, detalles: Any) -> bool:
+        """Añade el texto de los detalles de una licitación al índice. Devuelve True si cambió."""
+        nuevo_hash = hash_contenido(detalles)
+        row = self._db.execute(
+            "SELECT hash_detalles FROM licitaciones WHERE id = ?", (licitacion_id,)
+        ).fetchone()
+        if row is not None and row["hash_detalles"] == nuevo_hash:
+            return False
+
+        monto = _a_numero(primer_campo(detalles, CAMPOS_MONTO)) if isinstance(detalles, dict) else None
+        with self._db:
+            self._db.execute(
+                """
+                INSERT INTO licitaciones (id, monto, hash_detalles, texto_detalles) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    monto = COALESCE(excluded.monto, licitaciones.monto),
+                    hash_detalles = excluded.hash_detalles, texto_detalles = excluded.texto_detalles
+                """,
+                (licitacion_id, monto, nuevo_hash, _texto_plano(detalles)),
+            )
+            self._sync_fts(licitacion_id)
+        return True
+
+    def buscar(
+        self,
+        query: str = "",
+        estado: str | None = None,
+        entidad: str | None = None,
+        monto_min: float | None = None,
+        monto_max: float | None = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> dict[str, Any]:
+        """Búsqueda por palabras clave ordenada por relevancia (BM25), con facetas del resultado."""
+        condiciones = []
+        params: list[Any] = []
+        consulta = _consulta_fts(query)
+        if consulta:
+            desde = "licitaciones_fts JOIN licitaciones l ON l.id = licitaciones_fts.id"
+            condiciones.append("licitaciones_fts MATCH ?")
+            params.append(consulta)
+            score = "bm25(licitaciones_fts)"
+        else:
+            desde = "licitaciones l"
+            score = "0.0"
+        if estado:
+            condiciones.append("l.estado = ?")
+            params.append(estado.strip().lower())
+        if entidad:
+            condiciones.append("l.entidad LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escapar_like(entidad.strip())}%")
+        if monto_min is not None:
+            condiciones.append("l.monto >= ?")
+            params.append(monto_min)
+        if monto_max is not None:
+            condiciones.append("l.monto <= ?")
+            params.append(monto_max)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        filas = self._db.execute(
+            f"""
+            SELECT l.id, l.titulo, l.entidad, l.estado, l.fecha, l.monto, {score} AS score
+            FROM {desde} {where}
+            ORDER BY score, l.fecha DESC
+            LIMIT ? OFFSET ?
+            """,
+            (*params, limit, offset),
+        ).fetchall()
+
+        coincidencias = f"SELECT l.id, l.estado, l.entidad, l.monto FROM {desde} {where}"
+        total = self._db.execute(f"SELECT COUNT(*) FROM ({coincidencias})", params).fetchone()[0]
+        por_estado = self._db.execute(
+            f"SELECT estado, COUNT(*) AS n FROM ({coincidencias}) GROUP BY estado ORDER BY n DESC", params
+        ).fetchall()
+        por_entidad = self._db.execute(
+            f"SELECT entidad, COUNT(*) AS n FROM ({coincidencias}) GROUP BY entidad ORDER BY n DESC LIMIT 20", params
+        ).fetchall()
+        montos = self._db.execute(
+            f"SELECT MIN(monto), MAX(monto) FROM ({coincidencias})", params
+        ).fetchone()
+
+        return {
+            "total": total,
+            "resultados": [
+                {
+                    "id": fila["id"],
+                    "titulo": fila["titulo"],
+                    "entidad": fila["entidad"],
+                    "estado": fila["estado"],
+                    "fecha": fila["fecha"],
+                    "monto": fila["monto"],
+                    "score": round(-fila["score"], 4) if consulta else None,
+                }
+                for fila in filas
+            ],
+            "facetas": {
+                "estado": {fila["estado"] or "": fila["n"] for fila in por_estado},
+                "entidad": {fila["entidad"] or "": fila["n"] for fila in por_entidad},
+                "monto": {"min": montos[0], "max": montos[1]},
+            },
+        }
@@ -0,0 +1,435 @@
+"""
+Cola de trabajos asíncronos para cambios de estado masivos.
+
+Un trabajo agrupa varias transiciones (licitación → nuevo estado). Al crearlo se
+devuelve su ID de inmediato; las transiciones se ejecutan en segundo plano con
+concurrencia acotada y el resultado de cada una se consulta por el ID del trabajo.
+
+Si el llamante da una clave de idempotencia, cada transición lleva la suya, derivada
+de ella: reenviar el mismo trabajo (misma clave) devuelve el trabajo existente, y los
+reintentos del POST hacia la API no aplican dos veces el mismo cambio. Reutilizar la
+clave con otras transiciones es un error (`ClaveEnConflicto`), no un reenvío. Sin
+clave las transiciones no llevan ninguna y su POST no se reintenta.
+
+Con `path` el estado de los trabajos se guarda también en SQLite, de modo que con
+varios workers cualquiera puede responder a la consulta de progreso. La ejecución
+sigue en el proceso que creó el trabajo, que renueva un latido en la fila mientras
+lo tiene a medias; si el proceso muere (reinicio, worker caído), otro proceso con el
+mismo fichero reclama el trabajo cuando el latido tiene más de `lease` segundos y lo
+reanuda. Las transiciones sin empezar se encolan de nuevo; las que estaban en curso
+se repiten si tienen clave y, si no, se marcan como error, porque no se sabe si la
+API llegó a aplicarlas.
+
+Las transiciones se ejecutan en el contexto (ContextVars) de la petición que creó el
+trabajo, de modo que el limitador de caudal las atribuye a su llamante.
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+# (licitacion_id, nuevo_estado, idempotency_key) → resultado parseado o mensaje de error (str)
+Accion = Callable[[str, str, str | None], Awaitable[Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    idempotency_key TEXT UNIQUE,
+    created_at REAL NOT NULL,
+    value TEXT NOT NULL,
+    terminado_en REAL,
+    propietario TEXT,
+    latido REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trabajos_created ON trabajos(created_at);
+"""
+
+_INTERRUMPIDO = "Error: el proceso se reinició con el cambio en curso y sin clave de idempotencia; no se repite"
+
+
+class ClaveEnConflicto(Exception):
+    """La clave de idempotencia ya pertenece a un trabajo con otras transiciones."""
+
+    def __init__(self, idempotency_key: str, trabajo_id: str):
+        self.idempotency_key = idempotency_key
+        self.trabajo_id = trabajo_id
+        super().__init__(
+            f"La clave de idempotencia {idempotency_key} ya se usó para el trabajo {trabajo_id} "
+            "con otras licitaciones o estados"
+        )
+
+
+def _huella(cambios: list[tuple[str, str]]) -> str:
+    """Hash de las transiciones de un trabajo, sin depender de su orden."""
+    return hashlib.sha256(json.dumps(sorted(cambios), ensure_ascii=False).encode()).hexdigest()
+
+
+class JobQueue:
+    """Cola con trabajadores asyncio que aplican `accion` a cada transición de cada trabajo."""
+
+    def __init__(
+        self,
+        accion: Accion,
+        concurrency: int = 4,
+        max_items: int = 500,
+        max_jobs: int = 200,
+        retention: float = 24 * 3600,
+        path: str = "",
+        lease: float = 30.0,
+    ):
+        self.accion = accion
+        self.concurrency = concurrency
+        self.max_items = max_items
+        self.max_jobs = max_jobs
+        self.retention = retention
+        self.path = path
+        self.lease = lease
+        # Identifica a este proceso (y a este objeto) como propietario de sus trabajos en SQLite
+        self.instancia = uuid.uuid4().hex
+        self._jobs: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._claves: dict[str, str] = {}
+        self._contextos: dict[str, contextvars.Context] = {}
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tareas: list[asyncio.Task] = []
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self.created = 0
+        self.deduplicated = 0
+        self.conflicts = 0
+        self.items_ok = 0
+        self.items_failed = 0
+        self.resumed = 0
+        self.items_interrupted = 0
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columnas = {row[1] for row in self._conn.execute("PRAGMA table_info(trabajos)")}
+            for columna, tipo in (("terminado_en", "REAL"), ("propietario", "TEXT"), ("latido", "REAL")):
+                if columna not in columnas:
+                    # Ficheros creados antes de reanudar trabajos tras un reinicio
+                    self._conn.execute(f"ALTER TABLE trabajos ADD COLUMN {columna} {tipo}")
+            self._pid = os.getpid()
+        return self._conn
+
+    def _arrancar(self) -> None:
+        """Crea la cola y los trabajadores en el event loop actual (perezoso: sirve también en stdio)."""
+        loop = asyncio.get_running_loop()
+        if self._queue is not None and self._loop is loop and all(not t.done() for t in self._tareas):
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tareas = [asyncio.create_task(self._trabajador()) for _ in range(max(1, self.concurrency))]
+        # Trabajos que quedaron a medias en un loop anterior
+        for job in list(self._jobs.values()):
+            if job["terminado_en"] is None:
+                self._encolar(job, self._recuperar(job))
+        if self.path:
+            self._tareas.append(asyncio.create_task(self._latir()))
+
+    def _recuperar(self, job: dict[str, Any]) -> list[int]:
+        """Prepara un trabajo interrumpido para reanudarlo y devuelve los items que hay que encolar.
+
+        Un item en curso sin clave pudo llegar a aplicarse en la API: se marca como error en
+        lugar de repetir el POST.
+        """
+        pendientes = []
+        for indice, item in enumerate(job["items"]):
+            if item["estado"] == "en_curso" and not item["idempotency_key"]:
+                self._anotar(job, item, _INTERRUMPIDO)
+                self.items_interrupted += 1
+            elif item["estado"] in ("pendiente", "en_curso"):
+                item["estado"] = "pendiente"
+                pendientes.append(indice)
+        self._guardar(job)
+        return pendientes
+
+    def _encolar(self, job: dict[str, Any], indices: list[int]) -> None:
+        for indice in indices:
+            self._queue.put_nowait((job["trabajo_id"], indice))
+
+    async def _latir(self) -> None:
+        """Renueva el latido de los trabajos propios y reclama los de procesos que dejaron de latir."""
+        while True:
+            try:
+                self._db.execute(
+                    "UPDATE trabajos SET latido = ? WHERE propietario = ? AND terminado_en IS NULL",
+                    (time.time(), self.instancia),
+                )
+                self.reanudar()
+            except sqlite3.Error:
+                # Fichero bloqueado por otro worker: se reintenta en el siguiente latido
+                pass
+            await asyncio.sleep(self.lease / 3)
+
+    def reanudar(self) -> int:
+        """Reclama y encola los trabajos sin terminar cuyo proceso dejó de latir; devuelve cuántos.
+
+        El reclamo es un UPDATE condicionado al propietario y latido leídos: si dos procesos
+        arrancan a la vez, solo uno se queda con cada trabajo.
+        """
+        if not self.path or self._queue is None:
+            return 0
+        ahora = time.time()
+        filas = self._db.execute(
+            "SELECT id, propietario, latido, value FROM trabajos "
+            "WHERE terminado_en IS NULL AND (latido IS NULL OR latido < ?) AND propietario IS NOT ?",
+            (ahora - self.lease, self.instancia),
+        ).fetchall()
+        reanudados = 0
+        for trabajo_id, propietario, latido, value in filas:
+            job = json.loads(value)
+            if job["terminado_en"] is not None:
+                # Fila guardada antes de existir la columna terminado_en
+                self._db.execute(
+                    "UPDATE trabajos SET terminado_en = ? WHERE id = ?", (job["terminado_en"], trabajo_id)
+                )
+                continue
+            cursor = self._db.execute(
+                "UPDATE trabajos SET propietario = ?, latido = ? WHERE id = ? AND propietario IS ? AND latido IS ?",
+                (self.instancia, ahora, trabajo_id, propietario, latido),
+            )
+            if cursor.rowcount != 1:
+                continue
+            self._jobs[trabajo_id] = job
+            self._jobs.move_to_end(trabajo_id)
+            if job["idempotency_key"]:
+                self._claves[job["idempotency_key"]] = trabajo_id
+            self._encolar(job, self._recuperar(job))
+            reanudados += 1
+        self.resumed += reanudados
+        return reanudados
+
+    async def detener(self) -> None:
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        self._queue = None
+
+    @asynccontextmanager
+    async def run(self):
+        """Reanuda los trabajos guardados al entrar y detiene los trabajadores al salir (lifespan de server.py)."""
+        if self.path:
+            self._arrancar()
+        try:
+            yield self
+        finally:
+            await self.detener()
+
+    def crear(self, cambios: list[tuple[str, str]], idempotency_key: str | None = None) -> dict[str, Any]:
+        """Encola un trabajo con las transiciones `cambios` y devuelve su resumen (sin items).
+
+        Si ya existe un trabajo con la misma `idempotency_key` y las mismas transiciones se
+        devuelve ese, sin encolar nada; con otras transiciones se lanza `ClaveEnConflicto`.
+        Lanza ValueError si no hay transiciones o superan `max_items`.
+        """
+        # La misma licitación dos veces en un trabajo: vale la última transición
+        cambios = list({licitacion_id: (licitacion_id, estado) for licitacion_id, estado in cambios}.values())
+        huella = _huella(cambios)
+        if idempotency_key:
+            existente = self._por_clave(idempotency_key)
+            if existente is not None:
+                return self._reenvio(existente, idempotency_key, huella)
+        if not cambios:
+            raise ValueError("No se indicaron licitaciones")
+        if len(cambios) > self.max_items:
+            raise ValueError(f"Se admiten como máximo {self.max_items} licitaciones por trabajo")
+
+        trabajo_id = uuid.uuid4().hex
+        job = {
+            "trabajo_id": trabajo_id,
+            "idempotency_key": idempotency_key,
+            "huella": huella,
+            "estado": "pendiente",
+            "creado_en": time.time(),
+            "terminado_en": None,
+            "total": len(cambios),
+            "completados": 0,
+            "fallidos": 0,
+            "items": [
+                {
+                    "licitacion_id": licitacion_id,
+                    "nuevo_estado": nuevo_estado,
+                    # Sin clave del llamante no hay nada que proteja un reintento del POST
+                    "idempotency_key": f"{idempotency_key}:{licitacion_id}:{nuevo_estado}" if idempotency_key else None,
+                    "estado": "pendiente",
+                }
+                for licitacion_id, nuevo_estado in cambios
+            ],
+        }
+        if not self._insertar(job):
+            # Otro worker creó el trabajo con esta clave entre la consulta y el INSERT
+            return self._reenvio(self._por_clave(idempotency_key), idempotency_key, huella)
+
+        self._arrancar()
+        self._jobs[trabajo_id] = job
+        self._contextos[trabajo_id] = contextvars.copy_context()
+        if idempotency_key:
+            self._claves[idempotency_key] = trabajo_id
+        self.created += 1
+        self._purgar()
+        self._encolar(job, list(range(len(cambios))))
+        return self.resumen(job, items=False)
+
+    def obtener(self, trabajo_id: str, items: bool = True) -> dict[str, Any] | None:
+        """Estado de un trabajo (de este proceso o, con SQLite, de cualquier worker)."""
+        job = self._leer(trabajo_id)
+        return self.resumen(job, items) if job is not None else None
+
+    def _leer(self, trabajo_id: str) -> dict[str, Any] | None:
+        job = self._jobs.get(trabajo_id)
+        if job is None and self.path:
+            row = self._db.execute("SELECT value FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+            job = json.loads(row[0]) if row else None
+        return job
+
+    def _por_clave(self, idempotency_key: str) -> dict[str, Any] | None:
+        trabajo_id = self._claves.get(idempotency_key)
+        if trabajo_id is None and self.path:
+            row = self._db.execute(
+                "SELECT id FROM trabajos WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+            trabajo_id = row[0] if row else None
+        return self._leer(trabajo_id) if trabajo_id else None
+
+    def _reenvio(self, existente: dict[str, Any], idempotency_key: str, huella: str) -> dict[str, Any]:
+        """Resumen del trabajo ya creado con esta clave si las transiciones coinciden."""
+        # Los trabajos guardados antes de existir la huella se aceptan como reenvíos
+        if existente.get("huella", huella) != huella:
+            self.conflicts += 1
+            raise ClaveEnConflicto(idempotency_key, existente["trabajo_id"])
+        self.deduplicated += 1
+        return self.resumen(existente, items=False)
+
+    @staticmethod
+    def resumen(job: dict[str, Any], items: bool = True) -> dict[str, Any]:
+        resultado = {clave: valor for clave, valor in job.items() if clave not in ("items", "huella")}
+        resultado["pendientes"] = job["total"] - job["completados"] - job["fallidos"]
+        if items:
+            resultado["items"] = [
+                {clave: valor for clave, valor in item.items() if clave != "idempotency_key"}
+                for item in job["items"]
+            ]
+        return resultado
+
+    def _insertar(self, job: dict[str, Any]) -> bool:
+        """Guarda un trabajo nuevo; False si otro worker ya guardó uno con la misma clave.
+
+        La clave es UNIQUE: el INSERT no sustituye la fila del otro worker, se queda con ella.
+        """
+        if not self.path:
+            return True
+        cursor = self._db.execute(
+            "INSERT INTO trabajos (id, idempotency_key, created_at, value, propietario, latido) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(idempotency_key) DO NOTHING",
+            (
+                job["trabajo_id"], job["idempotency_key"], job["creado_en"],
+                json.dumps(job, ensure_ascii=False), self.instancia, time.time(),
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def _guardar(self, job: dict[str, Any]) -> None:
+        if self.path:
+            self._db.execute(
+                "INSERT INTO trabajos (id, idempotency_key, created_at, value, terminado_en, propietario, latido) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "value = excluded.value, terminado_en = excluded.terminado_en, latido = excluded.latido",
+                (
+                    job["trabajo_id"], job["idempotency_key"], job["creado_en"], json.dumps(job, ensure_ascii=False),
+                    job["terminado_en"], self.instancia, time.time(),
+                ),
+            )
+
+    def _purgar(self) -> None:
+        """Olvida los trabajos terminados más antiguos (por número y por antigüedad)."""
+        limite = time.time() - self.retention
+        for trabajo_id in list(self._jobs):
+            job = self._jobs[trabajo_id]
+            if job["terminado_en"] is None:
+                continue
+            if len(self._jobs) <= self.max_jobs and job["creado_en"] >= limite:
+                break
+            del self._jobs[trabajo_id]
+            if job["idempotency_key"]:
+                self._claves.pop(job["idempotency_key"], None)
+        if self.path:
+            self._db.execute("DELETE FROM trabajos WHERE created_at < ?", (limite,))
+
+    async def _trabajador(self) -> None:
+        while True:
+            trabajo_id, indice = await self._queue.get()
+            try:
+                job = self._jobs.get(trabajo_id)
+                contexto = self._contextos.get(trabajo_id)
+                if job is not None and contexto is not None:
+                    # La tarea copia el contexto activo al crearse: el del trabajo
+                    await contexto.run(asyncio.ensure_future, self._ejecutar(job, job["items"][indice]))
+                elif job is not None:
+                    await self._ejecutar(job, job["items"][indice])
+            finally:
+                self._queue.task_done()
+
+    async def _ejecutar(self, job: dict[str, Any], item: dict[str, Any]) -> None:
+        if item["estado"] != "pendiente":
+            return
+        if job["estado"] == "pendiente":
+            job["estado"] = "en_curso"
+        item["estado"] = "en_curso"
+        try:
+            resultado = await self.accion(item["licitacion_id"], item["nuevo_estado"], item["idempotency_key"])
+        except Exception as e:
+            resultado = f"Error: {e}"
+        self._anotar(job, item, resultado)
+        self._guardar(job)
+
+    def _anotar(self, job: dict[str, Any], item: dict[str, Any], resultado: Any) -> None:
+        """Registra el resultado de un item (str = error) y cierra el trabajo si era el último."""
+        if isinstance(resultado, str):
+            item["estado"] = "error"
+            item["error"] = resultado
+            job["fallidos"] += 1
+            self.items_failed += 1
+        else:
+            item["estado"] = "ok"
+            item["resultado"] = resultado
+            job["completados"] += 1
+            self.items_ok += 1
+        if job["completados"] + job["fallidos"] == job["total"]:
+            job["estado"] = "completado" if not job["fallidos"] else "completado_con_errores"
+            job["terminado_en"] = time.time()
+            self._contextos.pop(job["trabajo_id"], None)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": bool(self._tareas),
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue_depth(),
+            "jobs": len(self._jobs),
+            "active_jobs": sum(1 for job in self._jobs.values() if job["terminado_en"] is None),
+            "created": self.created,
+            "deduplicated": self.deduplicated,
+            "conflicts": self.conflicts,
+            "items_ok": self.items_ok,
+            "items_failed": self.items_failed,
+            "resumed": self.resumed,
+            "items_interrupted": self.items_interrupted,
+            "persistent": bool(self.path),
+        }
@@ -1,103 +1,1166 @@
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from typing import Any
+import asyncio
 import httpx
+import hashlib
 import json
-from mcp.server.fastmcp import FastMCP
-
-# Initialize FastMCP server
-mcp = FastMCP("licitaciones")
+import os
+import sys
+import tempfile
+import time
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.transport_security import TransportSecuritySettings
+from cache import SQLiteCache, TTLCache
+from indice import CAMPOS_ENTIDAD, CAMPOS_FECHA, IndiceLicitaciones, hash_contenido, primer_campo
+from jobs import ClaveEnConflicto, JobQueue
+from render import dumps, render_json
+from ratelimit import (
+    LimiteExcedido,
+    PrioridadCompartida,
+    UpstreamRateLimiter,
+    compartida_actual,
+    con_prioridad,
+    prioridad_actual,
+)
+from resilience import RETRYABLE_STATUS, RetryPolicy, UpstreamResilience
+from snapshot import SnapshotStore
+import metrics
+import tracing
+from metrics import instrument_tool
 
 # Constants
-LICITACIONES_API_BASE = "https://dev.lumacloud.co/apilic"
+LICITACIONES_API_BASE = os.getenv("LICITACIONES_API_BASE", "https://dev.lumacloud.co/apilic")
 USER_AGENT = "licitaciones-app/1.0"
 
+# Pool de conexiones HTTP compartido (configurable por variables de entorno)
+HTTP_TIMEOUT = float(os.getenv("LICITACIONES_HTTP_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("LICITACIONES_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("LICITACIONES_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LICITACIONES_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("LICITACIONES_HTTP2", "0") == "1"
 
-async def make_licitaciones_request(url: str, method: str = "GET", data: dict = None) -> dict[str, Any] | None:
-    """Make a request to the Licitaciones API with proper error handling."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
-    
-    async with httpx.AsyncClient() as client:
+# Resiliencia: timeouts por endpoint (connect/read), reintentos de GET y circuit breaker
+HTTP_CONNECT_TIMEOUT = float(os.getenv("LICITACIONES_HTTP_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUTS = {
+    "listado": 15,
+    "completo": 20,
+    "correo": 20,
+    "resumen_ia": 30,
+    "estado": 15,
+}
+READ_TIMEOUT_DEFAULT = float(os.getenv("LICITACIONES_HTTP_READ_TIMEOUT", "10"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("LICITACIONES_RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF_BASE = float(os.getenv("LICITACIONES_RETRY_BACKOFF_BASE", "0.2"))
+RETRY_BACKOFF_MAX = float(os.getenv("LICITACIONES_RETRY_BACKOFF_MAX", "2"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LICITACIONES_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("LICITACIONES_BREAKER_RESET_TIMEOUT", "30"))
+
+upstream_resilience = UpstreamResilience(
+    timeouts={
+        endpoint: httpx.Timeout(read, connect=HTTP_CONNECT_TIMEOUT)
+        for endpoint, read in READ_TIMEOUTS.items()
+    },
+    default_timeout=httpx.Timeout(READ_TIMEOUT_DEFAULT, connect=HTTP_CONNECT_TIMEOUT),
+    retry_policy=RetryPolicy(RETRY_MAX_ATTEMPTS, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX),
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=BREAKER_RESET_TIMEOUT,
+)
+
+# Procesos worker de server.py; con más de uno la caché y las sesiones MCP se comparten
+SERVER_WORKERS = int(os.getenv("LICITACIONES_WORKERS", "1"))
+
+# Límite de peticiones por segundo hacia la API (0 lo desactiva): global, repartido entre
+# los workers, y por llamante (cliente REST, sesión MCP o usuario del agente)
+RATE_GLOBAL = float(os.getenv("LICITACIONES_RATE_GLOBAL", "20"))
+RATE_GLOBAL_BURST = float(os.getenv("LICITACIONES_RATE_GLOBAL_BURST", str(RATE_GLOBAL * 2)))
+RATE_PER_CALLER = float(os.getenv("LICITACIONES_RATE_PER_CALLER", "5"))
+RATE_PER_CALLER_BURST = float(os.getenv("LICITACIONES_RATE_PER_CALLER_BURST", str(RATE_PER_CALLER * 4)))
+# Espera máxima por prioridad antes de rechazar la petición (429 en la API REST)
+RATE_MAX_WAIT = {
+    "interactiva": float(os.getenv("LICITACIONES_RATE_MAX_WAIT", "5")),
+    "bulk": float(os.getenv("LICITACIONES_RATE_BULK_MAX_WAIT", "60")),
+    "prefetch": float(os.getenv("LICITACIONES_RATE_PREFETCH_MAX_WAIT", "10")),
+}
+
+upstream_limiter = UpstreamRateLimiter(
+    rate=RATE_GLOBAL / max(1, SERVER_WORKERS),
+    burst=RATE_GLOBAL_BURST / max(1, SERVER_WORKERS),
+    per_caller_rate=RATE_PER_CALLER,
+    per_caller_burst=RATE_PER_CALLER_BURST,
+    max_wait=RATE_MAX_WAIT,
+)
+
+# Caché de respuestas de las secciones de cada licitación.
+# "memory" es por proceso; "sqlite" la comparten todos los workers a través de un fichero.
+CACHE_BACKEND = os.getenv("LICITACIONES_CACHE_BACKEND", "sqlite" if SERVER_WORKERS > 1 else "memory")
+CACHE_PATH = os.getenv("LICITACIONES_CACHE_PATH", "/tmp/licitaciones_cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.getenv("LICITACIONES_CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL_DEFAULT = float(os.getenv("LICITACIONES_CACHE_TTL", "120"))
+
+# TTL en segundos por endpoint: lo que cambia poco (correo, requisitos) vive más
+CACHE_TTLS = {
+    "completo": 60,
+    "correo": 1800,
+    "detalles": 120,
+    "documentos_requeridos": 600,
+    "experiencia": 600,
+    "financiero": 600,
+    "hv": 600,
+    "resumen_ia": 900,
+    "tecnicos": 600,
+    "puntaje": 600,
+}
+
+SECCIONES_LICITACION = tuple(CACHE_TTLS)
+
+# Expediente: secciones por defecto ("completo" ya las agrupa, se pide solo explícitamente)
+SECCIONES_EXPEDIENTE = tuple(seccion for seccion in SECCIONES_LICITACION if seccion != "completo")
+EXPEDIENTE_MAX_CONCURRENCY = int(os.getenv("LICITACIONES_EXPEDIENTE_MAX_CONCURRENCY", "4"))
+EXPEDIENTE_SECTION_TIMEOUT = float(os.getenv("LICITACIONES_EXPEDIENTE_SECTION_TIMEOUT", "15"))
+
+# Listado: snapshot local del catálogo sobre el que se filtra y pagina
+LISTADO_CACHE_KEY = ("licitaciones", "*")
+LISTADO_TTL = float(os.getenv("LICITACIONES_LISTADO_TTL", "60"))
+LISTADO_DEFAULT_LIMIT = int(os.getenv("LICITACIONES_LISTADO_DEFAULT_LIMIT", "20"))
+LISTADO_MAX_LIMIT = int(os.getenv("LICITACIONES_LISTADO_MAX_LIMIT", "100"))
+
+# Consultas masivas: una sección para muchas licitaciones
+BULK_MAX_IDS = int(os.getenv("LICITACIONES_BULK_MAX_IDS", "500"))
+BULK_MAX_CONCURRENCY = int(os.getenv("LICITACIONES_BULK_MAX_CONCURRENCY", "8"))
+
+# Cambios de estado masivos: trabajos en segundo plano consultables por ID
+ESTADO_BULK_CONCURRENCY = int(os.getenv("LICITACIONES_ESTADO_BULK_CONCURRENCY", "4"))
+JOBS_MAX = int(os.getenv("LICITACIONES_JOBS_MAX", "200"))
+JOBS_RETENTION = float(os.getenv("LICITACIONES_JOBS_RETENTION", str(24 * 3600)))
+
+# Formato de las respuestas de las herramientas MCP (~4 caracteres por token).
+# "compact" omite la indentación; 0 desactiva cada límite.
+OUTPUT_MODE = os.getenv("LICITACIONES_OUTPUT_MODE", "compact")
+OUTPUT_MAX_CHARS = int(os.getenv("LICITACIONES_OUTPUT_MAX_CHARS", "16000"))
+OUTPUT_MAX_TEXT_CHARS = int(os.getenv("LICITACIONES_OUTPUT_MAX_TEXT_CHARS", "2000"))
+
+# Streaming de respuestas grandes (correo, completo) hacia los clientes REST sin cargarlas en memoria
+STREAM_MAX_BYTES = int(os.getenv("LICITACIONES_STREAM_MAX_MB", "50")) * 1024 * 1024
+STREAM_CHUNK_BYTES = int(os.getenv("LICITACIONES_STREAM_CHUNK_BYTES", str(64 * 1024)))
+
+# Lectura paginada del correo para el LLM: caracteres del cuerpo por página
+CORREO_PAGINA_CHARS = int(os.getenv("LICITACIONES_CORREO_PAGINA_CHARS", "8000"))
+CORREO_PAGINA_MAX_CHARS = int(os.getenv("LICITACIONES_CORREO_PAGINA_MAX_CHARS", "32000"))
+CAMPOS_CUERPO_CORREO = ("cuerpo", "contenido", "body", "html", "texto", "mensaje")
+
+if CACHE_BACKEND == "sqlite":
+    response_cache = SQLiteCache(CACHE_PATH, maxsize=CACHE_MAX_ENTRIES, default_ttl=CACHE_TTL_DEFAULT)
+else:
+    response_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, default_ttl=CACHE_TTL_DEFAULT)
+
+# Con la caché en SQLite el estado de los trabajos va al mismo fichero, visible desde todos los workers
+JOBS_PATH = os.getenv("LICITACIONES_JOBS_PATH", CACHE_PATH if CACHE_BACKEND == "sqlite" else "")
+
+# Copia persistente en disco para arranques en caliente y lecturas con la API caída ("" la desactiva).
+# El fichero por defecto es distinto para cada LICITACIONES_API_BASE
+SNAPSHOT_PATH = os.getenv(
+    "LICITACIONES_SNAPSHOT_PATH",
+    os.path.join(
+        tempfile.gettempdir(),
+        f"licitaciones_snapshot_{hashlib.sha1(LICITACIONES_API_BASE.encode()).hexdigest()[:12]}.sqlite3",
+    ),
+)
+SNAPSHOT_MAX_BYTES = int(os.getenv("LICITACIONES_SNAPSHOT_MAX_MB", "256")) * 1024 * 1024
+SNAPSHOT_MAX_AGE = float(os.getenv("LICITACIONES_SNAPSHOT_MAX_AGE", str(7 * 24 * 3600)))
+# Margen tras el TTL en el que una copia en disco se sirve mientras se revalida en segundo plano
+SNAPSHOT_SWR = float(os.getenv("LICITACIONES_SNAPSHOT_SWR", "600"))
+
+snapshot_store = SnapshotStore(
+    SNAPSHOT_PATH, LICITACIONES_API_BASE, max_bytes=SNAPSHOT_MAX_BYTES, max_age=SNAPSHOT_MAX_AGE
+)
+
+cache_entries = metrics.registry.gauge("licitaciones_cache_entries", "Entradas en la caché de respuestas")
+cache_lookups = metrics.registry.counter(
+    "licitaciones_cache_lookups_total", "Consultas acumuladas a la caché por resultado", ("result",)
+)
+breaker_open = metrics.registry.gauge(
+    "licitaciones_upstream_breaker_open", "1 si el circuit breaker del endpoint no está cerrado", ("endpoint",)
+)
+upstream_retries = metrics.registry.counter(
+    "licitaciones_upstream_retries_total", "Reintentos acumulados por endpoint", ("endpoint",)
+)
+ratelimit_queue = metrics.registry.gauge(
+    "licitaciones_ratelimit_queue_depth", "Peticiones esperando turno del límite global por prioridad", ("priority",)
+)
+ratelimit_requests = metrics.registry.counter(
+    "licitaciones_ratelimit_requests_total",
+    "Peticiones a la API acumuladas por prioridad y resultado del limitador (admitted, delayed, rejected, promoted)",
+    ("priority", "result"),
+)
+
+
+def _collect_metrics() -> None:
+    cache_entries.set(len(response_cache))
+    for resultado in ("hits", "misses", "evictions"):
+        cache_lookups.set_total(getattr(response_cache, resultado), result=resultado)
+    for endpoint, breaker in upstream_resilience.breakers.items():
+        breaker_open.set(0 if breaker.state == "closed" else 1, endpoint=endpoint)
+    for endpoint, reintentos in upstream_resilience.retries.items():
+        upstream_retries.set_total(reintentos, endpoint=endpoint)
+    for prioridad, profundidad in upstream_limiter.queue_depth().items():
+        ratelimit_queue.set(profundidad, priority=prioridad)
+        ratelimit_requests.set_total(upstream_limiter.admitted[prioridad], priority=prioridad, result="admitted")
+        ratelimit_requests.set_total(upstream_limiter.delayed[prioridad], priority=prioridad, result="delayed")
+        rechazadas = sum(n for (p, _), n in upstream_limiter.rejected.items() if p == prioridad)
+        ratelimit_requests.set_total(rechazadas, priority=prioridad, result="rejected")
+        ratelimit_requests.set_total(upstream_limiter.promoted[prioridad], priority=prioridad, result="promoted")
+
+
+metrics.registry.add_collector(_collect_metrics)
+
+# Índice de búsqueda local (en memoria salvo que se indique un fichero SQLite)
+indice_licitaciones = IndiceLicitaciones(os.getenv("LICITACIONES_INDICE_PATH", ":memory:"))
+
+# Transporte MCP: stdio (por defecto), "streamable-http" o "sse"
+MCP_TRANSPORT = os.getenv("LICITACIONES_MCP_TRANSPORT", "stdio")
+MCP_HOST = os.getenv("LICITACIONES_MCP_HOST", "127.0.0.1")
+MCP_PORT = int(os.getenv("LICITACIONES_MCP_PORT", "8005"))
+# Hosts aceptados por los transportes HTTP (protección DNS rebinding); "*" la desactiva
+MCP_ALLOWED_HOSTS = [h.strip() for h in os.getenv("LICITACIONES_MCP_ALLOWED_HOSTS", "").split(",") if h.strip()]
+# Sin estado de sesión en el servidor: cualquier worker puede atender cualquier petición MCP
+MCP_STATELESS_HTTP = os.getenv("LICITACIONES_MCP_STATELESS", "1" if SERVER_WORKERS > 1 else "0") == "1"
+
+_http_client: httpx.AsyncClient | None = None
+_http_client_loop: asyncio.AbstractEventLoop | None = None
+_http_client_users = 0
+
+# Peticiones GET en curso por URL y tipo (normal o condicional) (single-flight)
+_inflight_requests: dict[tuple[str, bool], tuple[asyncio.Future, PrioridadCompartida]] = {}
+
+# Validadores HTTP (ETag, Last-Modified) de la última respuesta 200 de cada URL
+Validadores = tuple[str | None, str | None]
+validadores_url: dict[str, Validadores] = {}
+VALIDADORES_MAX = CACHE_MAX_ENTRIES * 2
+
+# Respuesta de `make_licitaciones_request` a un GET condicional cuando la API contesta 304
+NO_MODIFICADO: dict[str, Any] = {"no_modificado": True}
+
+# Revalidaciones en segundo plano de copias en disco servidas caducadas
+_revalidaciones: dict[tuple[str, str], asyncio.Task] = {}
+
+# Huella del contenido del último listado registrado, global y por licitación
+listado_hash: str | None = None
+hashes_listado: dict[str, str] = {}
+
+upstream_not_modified = metrics.registry.counter(
+    "licitaciones_upstream_not_modified_total", "Respuestas 304 de la API a GET condicionales", ("endpoint",)
+)
+
+# Consultas interactivas por licitación (herramientas y REST); el prefetch prioriza con ellas
+accesos_licitacion: Counter[str] = Counter()
+
+
+def _http2_disponible() -> bool:
+    """HTTP/2 es opcional: requiere el paquete `h2` (pip install "httpx[http2]")."""
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Devuelve el cliente HTTP compartido del proceso, creándolo si no existe.
+
+    Todas las herramientas MCP y los endpoints REST de server.py reutilizan este
+    cliente, de modo que las conexiones TCP/TLS hacia la API se mantienen vivas
+    entre llamadas.
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    # Las conexiones del pool pertenecen a un event loop: si cambia, se crea otro cliente
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client_loop = loop
+        _http_client = httpx.AsyncClient(
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "application/json",
+                "Content-Type": "application/json"
+            },
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            http2=_http2_disponible(),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Cierra el cliente HTTP compartido y libera las conexiones del pool."""
+    global _http_client
+    if _http_client is not None and _http_client_loop is asyncio.get_running_loop():
+        await _http_client.aclose()
+    _http_client = None
+
+
+@asynccontextmanager
+async def http_client_lifespan(_server: Any = None):
+    """Ciclo de vida del pool HTTP, usado por FastMCP y por el lifespan de FastAPI.
+
+    Con transporte HTTP, FastMCP entra en este lifespan una vez por sesión, así que
+    se cuentan los usuarios y el pool solo se cierra cuando termina el último.
+    """
+    global _http_client_users
+    _http_client_users += 1
+    get_http_client()
+    try:
+        yield
+    finally:
+        _http_client_users -= 1
+        if _http_client_users == 0:
+            await close_http_client()
+
+
+def _transport_security() -> TransportSecuritySettings | None:
+    if not MCP_ALLOWED_HOSTS:
+        return None
+    if MCP_ALLOWED_HOSTS == ["*"]:
+        return TransportSecuritySettings(enable_dns_rebinding_protection=False)
+    return TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=MCP_ALLOWED_HOSTS,
+        allowed_origins=[f"{scheme}://{host}" for host in MCP_ALLOWED_HOSTS for scheme in ("http", "https")],
+    )
+
+
+# Initialize FastMCP server
+mcp = FastMCP(
+    "licitaciones",
+    lifespan=http_client_lifespan,
+    host=MCP_HOST,
+    port=MCP_PORT,
+    transport_security=_transport_security(),
+    stateless_http=MCP_STATELESS_HTTP,
+)
+
+
+def endpoint_de_url(url: str) -> str:
+    """Nombre corto del endpoint de la API ("listado", "detalles", "estado", ...)."""
+    ruta = url.split("/api/licitaciones", 1)[-1].split("?", 1)[0].strip("/")
+    if not ruta:
+        return "listado"
+    partes = ruta.split("/")
+    return partes[1] if len(partes) > 1 else "licitacion"
+
+
+def _guardar_validadores(url: str, response: httpx.Response) -> None:
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag is None and last_modified is None:
+        validadores_url.pop(url, None)
+        return
+    validadores_url.pop(url, None)
+    validadores_url[url] = (etag, last_modified)
+    if len(validadores_url) > VALIDADORES_MAX:
+        validadores_url.pop(next(iter(validadores_url)))
+
+
+def _cabeceras_condicionales(validadores: Validadores) -> dict[str, str]:
+    etag, last_modified = validadores
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+async def _send_licitaciones_request(
+    url: str,
+    method: str = "GET",
+    data: dict = None,
+    idempotency_key: str | None = None,
+    validadores: Validadores | None = None,
+) -> dict[str, Any] | None:
+    """Envía la petición a la API usando el pool compartido.
+
+    Los GET (y los POST con clave de idempotencia) se reintentan ante errores de red
+    y respuestas 429/5xx transitorias. Si el circuit breaker del endpoint está
+    abierto se falla de inmediato, sin tocar la API. Con `validadores` el GET es
+    condicional y un 304 devuelve `NO_MODIFICADO`. Cada intento espera turno en
+    `upstream_limiter` y lanza `LimiteExcedido` si la espera sería excesiva.
+    """
+    if method not in ("GET", "POST"):
+        return None
+
+    endpoint = endpoint_de_url(url)
+    breaker = upstream_resilience.breaker(endpoint)
+    if not breaker.allow():
+        upstream_resilience.short_circuits[endpoint] += 1
+        return {"error": f"API de licitaciones no disponible temporalmente ({endpoint}); circuito abierto"}
+
+    client = get_http_client()
+    timeout = upstream_resilience.timeout(endpoint)
+    headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+    if method == "GET" and validadores:
+        headers = _cabeceras_condicionales(validadores)
+    politica = upstream_resilience.retry_policy
+    intentos = politica.max_attempts if method == "GET" or idempotency_key else 1
+
+    for intento in range(intentos):
+        ultimo = intento == intentos - 1
         try:
-            if method == "GET":
-                response = await client.get(url, headers=headers, timeout=30.0)
-            elif method == "POST":
-                response = await client.post(url, headers=headers, json=data, timeout=30.0)
-            else:
-                return None
-                
+            # Cada intento cuenta para el límite del llamante y el global
+            esperado = await upstream_limiter.adquirir()
+            with tracing.span(method, kind="client", **{
+                "http.request.method": method,
+                "url.full": url,
+                "licitaciones.endpoint": endpoint,
+                "http.request.resend_count": intento or None,
+                "licitaciones.ratelimit.wait_s": round(esperado, 3) if esperado > 0.001 else None,
+            }) as span:
+                metrics.upstream_in_flight.inc(endpoint=endpoint)
+                inicio = time.perf_counter()
+                try:
+                    cabeceras = tracing.inyectar(dict(headers or {})) if tracing.activo else headers
+                    if method == "GET":
+                        response = await client.get(url, headers=cabeceras, timeout=timeout)
+                    else:
+                        response = await client.post(url, json=data, headers=cabeceras, timeout=timeout)
+                except httpx.TransportError as e:
+                    metrics.upstream_requests.inc(endpoint=endpoint, method=method, status=type(e).__name__)
+                    raise
+                finally:
+                    metrics.upstream_duration.observe(time.perf_counter() - inicio, endpoint=endpoint, method=method)
+                    metrics.upstream_in_flight.dec(endpoint=endpoint)
+                tracing.anotar(span, **{"http.response.status_code": response.status_code})
+                if response.status_code >= 400:
+                    tracing.error(span, str(response.status_code))
+            metrics.upstream_requests.inc(endpoint=endpoint, method=method, status=response.status_code)
+            metrics.upstream_response_bytes.observe(len(response.content), endpoint=endpoint)
+
+            if response.status_code in RETRYABLE_STATUS and not ultimo:
+                upstream_resilience.retries[endpoint] += 1
+                await asyncio.sleep(politica.delay(intento, response.headers.get("Retry-After")))
+                continue
+
+            if response.status_code == 304 and validadores:
+                breaker.record_success()
+                return NO_MODIFICADO
+
             response.raise_for_status()
+            breaker.record_success()
+            if method == "GET":
+                _guardar_validadores(url, response)
             return response.json()
+        except httpx.HTTPStatusError as e:
+            # Un 4xx es un error de la petición, no de disponibilidad de la API
+            if e.response.status_code >= 500 or e.response.status_code == 429:
+                upstream_resilience.failures[endpoint] += 1
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return {"error": str(e)}
+        except httpx.TransportError as e:
+            if not ultimo:
+                upstream_resilience.retries[endpoint] += 1
+                await asyncio.sleep(politica.delay(intento))
+                continue
+            upstream_resilience.failures[endpoint] += 1
+            breaker.record_failure()
+            return {"error": str(e) or type(e).__name__}
+        except (asyncio.CancelledError, LimiteExcedido):
+            # Liberar la petición de prueba del half_open para no bloquear el breaker
+            breaker.trial_in_flight = False
+            raise
         except Exception as e:
+            breaker.record_success()
             return {"error": str(e)}
 
 
-@mcp.tool()
-async def listar_licitaciones() -> str:
-    """Listar todas las licitaciones disponibles.
-    
-    Returns:
-        Lista de todas las licitaciones en el sistema
+async def make_licitaciones_request(
+    url: str,
+    method: str = "GET",
+    data: dict = None,
+    idempotency_key: str | None = None,
+    validadores: Validadores | None = None,
+) -> dict[str, Any] | None:
+    """Make a request to the Licitaciones API with proper error handling.
+
+    GETs concurrentes a la misma URL se agrupan (single-flight): solo la primera
+    llamada sale hacia la API y las demás esperan y comparten su resultado.
+    Un GET con `validadores` solo debe hacerlo quien tenga una copia que reutilizar
+    si la respuesta es `NO_MODIFICADO`. Solo la petición real consume turno del
+    limitador, a cuenta de quien la lanzó y con la prioridad del más urgente de
+    quienes la esperan: una consulta interactiva que se une a una descarga de la
+    precarga no espera como precarga.
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones"
-    data = await make_licitaciones_request(url)
-    
+    with tracing.span(f"licitaciones {method} {endpoint_de_url(url)}") as span:
+        if method != "GET":
+            resultado = await _send_licitaciones_request(url, method, data, idempotency_key)
+        else:
+            clave = (url, validadores is not None)
+            en_curso = _inflight_requests.get(clave)
+            tracing.anotar(span, **{"licitaciones.singleflight": "joined" if en_curso else "leader"})
+            if en_curso is None:
+                compartida = PrioridadCompartida(prioridad_actual.get())
+                task = asyncio.ensure_future(_enviar_compartida(compartida, url, validadores))
+                _inflight_requests[clave] = (task, compartida)
+                task.add_done_callback(lambda _: _inflight_requests.pop(clave, None))
+            else:
+                task, compartida = en_curso
+                compartida.elevar(prioridad_actual.get())
+            # shield: si un llamador se cancela, la petición sigue viva para el resto
+            resultado = await asyncio.shield(task)
+        if isinstance(resultado, dict) and "error" in resultado:
+            tracing.error(span, str(resultado["error"])[:200])
+        return resultado
+
+
+async def _enviar_compartida(
+    compartida: PrioridadCompartida, url: str, validadores: Validadores | None,
+) -> dict[str, Any] | None:
+    """GET de single-flight: corre en su propia tarea, así que la ContextVar solo la ve esta petición."""
+    compartida_actual.set(compartida)
+    return await _send_licitaciones_request(url, validadores=validadores)
+
+
+def _revalidar(key: tuple[str, str], descargar: Callable[[], Awaitable[Any]]) -> None:
+    """Lanza (una sola vez por clave) la descarga que sustituirá a una copia servida caducada."""
+    if key in _revalidaciones:
+        return
+    task = asyncio.ensure_future(descargar())
+    _revalidaciones[key] = task
+    task.add_done_callback(lambda t: _fin_revalidacion(key, t))
+
+
+def _fin_revalidacion(key: tuple[str, str], task: asyncio.Task) -> None:
+    _revalidaciones.pop(key, None)
+    # Si falló (p. ej. LimiteExcedido) la copia servida sigue valiendo hasta la próxima consulta
+    if not task.cancelled():
+        task.exception()
+
+
+async def _desde_snapshot(
+    key: tuple[str, str], ttl: float, descargar: Callable[[], Awaitable[Any]]
+) -> Any | None:
+    """Consulta la copia en disco cuando la caché en memoria no tiene la entrada.
+
+    Si la copia sigue dentro del TTL calienta la caché con el tiempo que le queda;
+    si caducó hace menos de `SNAPSHOT_SWR` segundos se sirve y se revalida en segundo plano.
+    Las operaciones con el fichero SQLite se hacen en un hilo, fuera del event loop.
+    """
+    guardado = await asyncio.to_thread(snapshot_store.leer, key)
+    if guardado is None:
+        return None
+    data, edad = guardado
+    if edad < ttl:
+        response_cache.set(key, data, ttl=ttl - edad)
+        return data
+    if edad < ttl + SNAPSHOT_SWR:
+        snapshot_store.swr_served += 1
+        _revalidar(key, descargar)
+        return data
+    return None
+
+
+async def _stale(key: tuple[str, str], endpoint: str) -> Any | None:
+    """Stale-if-error: última copia en memoria o, si no hay, en disco (hasta `SNAPSHOT_MAX_AGE`)."""
+    stale = response_cache.get_stale(key)
+    if stale is None:
+        guardado = await asyncio.to_thread(snapshot_store.leer, key)
+        stale = guardado[0] if guardado else None
+    if stale is not None:
+        upstream_resilience.stale_served[endpoint] += 1
+    return stale
+
+
+async def _copia_previa(key: tuple[str, str], url: str) -> tuple[Any, Validadores | None]:
+    """Copia guardada de `key` y los validadores con que se descargó, para un GET condicional.
+
+    Solo se devuelven validadores si hay una copia que reutilizar ante un 304.
+    """
+    validadores = validadores_url.get(url)
+    previa = response_cache.get_stale(key) if validadores else None
+    if previa is None:
+        validadores, guardado = await asyncio.to_thread(_validadores_y_copia, key)
+        previa = guardado[0] if guardado else None
+    return (previa, validadores) if previa is not None else (None, None)
+
+
+def _validadores_y_copia(key: tuple[str, str]) -> tuple[Validadores | None, tuple[Any, float] | None]:
+    validadores = snapshot_store.validadores(key)
+    return validadores, snapshot_store.leer(key) if validadores else None
+
+
+async def _no_modificado(key: tuple[str, str], previa: Any, ttl: float, endpoint: str) -> Any:
+    """La API confirmó (304) que la copia sigue vigente: se renueva su TTL sin descargarla."""
+    upstream_not_modified.inc(endpoint=endpoint)
+    response_cache.set(key, previa, ttl=ttl)
+    await asyncio.to_thread(snapshot_store.renovar, key)
+    return previa
+
+
+async def _descargar_seccion(licitacion_id: str, endpoint: str) -> dict[str, Any] | None:
+    """Pide la sección a la API y, si es correcta, la guarda en caché, en disco y en el índice.
+
+    Si ya hay una copia con ETag/Last-Modified la petición es condicional y un 304
+    reutiliza la copia.
+    """
+    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/{endpoint}"
+    key = (endpoint, licitacion_id)
+    ttl = CACHE_TTLS.get(endpoint, CACHE_TTL_DEFAULT)
+    previa, validadores = await _copia_previa(key, url)
+    data = await make_licitaciones_request(url, validadores=validadores)
+    if data is NO_MODIFICADO:
+        return await _no_modificado(key, previa, ttl, endpoint)
+    if data and "error" not in data:
+        response_cache.set(key, data, ttl=ttl)
+        await asyncio.to_thread(snapshot_store.guardar, key, data, validadores_url.get(url))
+        if endpoint == "detalles":
+            indice_licitaciones.actualizar_detalles(licitacion_id, data)
+    return data
+
+
+async def fetch_licitacion_seccion(
+    licitacion_id: str, endpoint: str, refrescar: bool = False
+) -> dict[str, Any] | None:
+    """Obtiene una sección de una licitación pasando por la caché de respuestas y la copia en disco.
+
+    Solo se cachean las respuestas correctas; los errores siempre se reintentan.
+    Con `refrescar=True` (precarga) se ignoran las copias vigentes y se pide a la API.
+    Si el limitador rechaza la petición se sirve la última copia o se propaga `LimiteExcedido`.
+    """
+    key = (endpoint, licitacion_id)
+    if not refrescar:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+        ttl = CACHE_TTLS.get(endpoint, CACHE_TTL_DEFAULT)
+        guardado = await _desde_snapshot(key, ttl, lambda: _descargar_seccion(licitacion_id, endpoint))
+        if guardado is not None:
+            return guardado
+
+    try:
+        data = await _descargar_seccion(licitacion_id, endpoint)
+    except LimiteExcedido:
+        stale = await _stale(key, endpoint)
+        if stale is None:
+            raise
+        return stale
+    if data and "error" not in data:
+        return data
+
+    # Si la API falla (o el circuito está abierto) se sirve la última copia
+    stale = await _stale(key, endpoint)
+    return stale if stale is not None else data
+
+
+# Mensajes para el usuario cuando una sección no devuelve datos
+MENSAJES_SIN_DATOS = {
+    "completo": "No se pudo obtener la licitación con ID {licitacion_id}.",
+    "correo": "No se pudo obtener el correo de la licitación {licitacion_id}.",
+    "detalles": "No se pudieron obtener los detalles de la licitación {licitacion_id}.",
+    "documentos_requeridos": "No se pudieron obtener los documentos requeridos para la licitación {licitacion_id}.",
+    "experiencia": "No se pudieron obtener los requisitos de experiencia para la licitación {licitacion_id}.",
+    "financiero": "No se pudieron obtener los requisitos financieros para la licitación {licitacion_id}.",
+    "hv": "No se pudieron obtener los requisitos de HV para la licitación {licitacion_id}.",
+    "resumen_ia": "No se pudo obtener el resumen IA para la licitación {licitacion_id}.",
+    "tecnicos": "No se pudieron obtener los requisitos técnicos para la licitación {licitacion_id}.",
+    "puntaje": "No se pudieron obtener los criterios de evaluación para la licitación {licitacion_id}.",
+}
+
+
+def _resultado(data: Any, mensaje_sin_datos: str) -> Any:
+    """Devuelve los datos parseados o el mensaje que se muestra cuando la consulta falla."""
     if not data:
-        return "No se pudieron obtener las licitaciones."
+        return mensaje_sin_datos
     
     if "error" in data:
         return f"Error: {data['error']}"
     
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return data
+
+
+def _extraer_licitaciones(data: Any) -> list[dict[str, Any]]:
+    """Normaliza la respuesta del listado a una lista de licitaciones."""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for clave in ("licitaciones", "data", "items", "results"):
+            if isinstance(data.get(clave), list):
+                return data[clave]
+    return [data]
+
+
+def _registrar_listado(licitaciones: list[dict[str, Any]]) -> bool:
+    """Calcula la huella de cada licitación y del listado; si cambió, actualiza el índice.
+
+    Devuelve True si el contenido del listado es distinto del último registrado.
+    """
+    global listado_hash
+    hashes = {
+        str(item["id"]): hash_contenido(item)
+        for item in licitaciones
+        if isinstance(item, dict) and item.get("id") not in (None, "")
+    }
+    nuevo_hash = hash_contenido(sorted(hashes.items()))
+    if nuevo_hash == listado_hash and len(indice_licitaciones):
+        return False
+    listado_hash = nuevo_hash
+    hashes_listado.clear()
+    hashes_listado.update(hashes)
+    # El índice solo reescribe las licitaciones cuya huella cambió
+    indice_licitaciones.actualizar_listado(licitaciones, hashes=hashes)
+    return True
+
+
+async def _descargar_listado() -> list[dict[str, Any]] | str:
+    """Pide el catálogo a la API y, si es correcto, lo guarda en caché, en disco y en el índice.
+
+    La petición es condicional si ya hay una copia: con un 304 no se descarga ni se reindexa nada.
+    """
+    url = f"{LICITACIONES_API_BASE}/api/licitaciones"
+    previa, validadores = await _copia_previa(LISTADO_CACHE_KEY, url)
+    data = await make_licitaciones_request(url, validadores=validadores)
+    if data is NO_MODIFICADO:
+        licitaciones = await _no_modificado(LISTADO_CACHE_KEY, previa, LISTADO_TTL, "listado")
+        if not hashes_listado:
+            _registrar_listado(licitaciones)
+        return licitaciones
+
+    resultado = _resultado(data, "No se pudieron obtener las licitaciones.")
+    if isinstance(resultado, str):
+        return resultado
+
+    licitaciones = _extraer_licitaciones(resultado)
+    response_cache.set(LISTADO_CACHE_KEY, licitaciones, ttl=LISTADO_TTL)
+    await asyncio.to_thread(snapshot_store.guardar, LISTADO_CACHE_KEY, licitaciones, validadores_url.get(url))
+    _registrar_listado(licitaciones)
+    return licitaciones
+
+
+async def obtener_listado_licitaciones(refrescar: bool = False) -> list[dict[str, Any]] | str:
+    """Snapshot del catálogo completo (cacheado `LISTADO_TTL` segundos), o mensaje de error.
+
+    Con `refrescar=True` se consulta a la API aunque haya una copia vigente.
+    """
+    if not refrescar:
+        cached = response_cache.get(LISTADO_CACHE_KEY)
+        if cached is not None:
+            return cached
+
+        guardado = await _desde_snapshot(LISTADO_CACHE_KEY, LISTADO_TTL, _descargar_listado)
+        if guardado is not None:
+            if not hashes_listado:
+                _registrar_listado(guardado)
+            return guardado
+
+    try:
+        resultado = await _descargar_listado()
+    except LimiteExcedido:
+        stale = await _stale(LISTADO_CACHE_KEY, "listado")
+        if stale is None:
+            raise
+        return stale
+    if isinstance(resultado, str):
+        stale = await _stale(LISTADO_CACHE_KEY, "listado")
+        return stale if stale is not None else resultado
+    return resultado
+
+
+def filtrar_licitaciones(
+    licitaciones: list[dict[str, Any]],
+    estado: str | None = None,
+    entidad: str | None = None,
+    fecha_desde: str | None = None,
+    fecha_hasta: str | None = None,
+) -> list[dict[str, Any]]:
+    """Filtra localmente por estado (exacto), entidad (contiene) y rango de fechas ISO (YYYY-MM-DD)."""
+    estado = estado.strip().lower() if estado else None
+    entidad = entidad.strip().lower() if entidad else None
+
+    filtradas = []
+    for item in licitaciones:
+        if not isinstance(item, dict):
+            continue
+        if estado and str(item.get("estado", "")).lower() != estado:
+            continue
+        if entidad and entidad not in str(primer_campo(item, CAMPOS_ENTIDAD) or "").lower():
+            continue
+        if fecha_desde or fecha_hasta:
+            fecha = str(primer_campo(item, CAMPOS_FECHA) or "")[:10]
+            if not fecha:
+                continue
+            if fecha_desde and fecha < fecha_desde[:10]:
+                continue
+            if fecha_hasta and fecha > fecha_hasta[:10]:
+                continue
+        filtradas.append(item)
+    return filtradas
+
+
+async def consultar_licitaciones(
+    estado: str | None = None,
+    entidad: str | None = None,
+    fecha_desde: str | None = None,
+    fecha_hasta: str | None = None,
+    fields: list[str] | None = None,
+    limit: int = LISTADO_DEFAULT_LIMIT,
+    offset: int = 0,
+) -> dict[str, Any] | str:
+    """Página del catálogo filtrada y proyectada; el tamaño queda acotado por `LISTADO_MAX_LIMIT`."""
+    licitaciones = await obtener_listado_licitaciones()
+    if isinstance(licitaciones, str):
+        return licitaciones
+
+    filtradas = filtrar_licitaciones(licitaciones, estado, entidad, fecha_desde, fecha_hasta)
+    limit = max(1, min(limit, LISTADO_MAX_LIMIT))
+    offset = max(0, offset)
+    pagina = filtradas[offset:offset + limit]
+
+    if fields:
+        campos = ["id", *(campo for campo in fields if campo != "id")]
+        pagina = [{campo: item[campo] for campo in campos if campo in item} for item in pagina]
+
+    siguiente = offset + limit
+    return {
+        "total": len(filtradas),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": siguiente if siguiente < len(filtradas) else None,
+        "licitaciones": pagina,
+    }
+
+
+async def obtener_datos_seccion(licitacion_id: str, seccion: str) -> Any:
+    """Sección de una licitación ya parseada (o mensaje de error)."""
+    accesos_licitacion[licitacion_id] += 1
+    data = await fetch_licitacion_seccion(licitacion_id, seccion)
+    return _resultado(data, MENSAJES_SIN_DATOS[seccion].format(licitacion_id=licitacion_id))
+
+
+async def seccion_tras_error(licitacion_id: str, seccion: str, error: dict[str, Any]) -> Any:
+    """Resultado de una sección cuya descarga falló: la última copia (memoria o disco) o el error.
+
+    No vuelve a pedirla a la API ni cuenta otro acceso: es la salida de `abrir_seccion_stream`.
+    """
+    stale = await _stale((seccion, licitacion_id), seccion)
+    return _resultado(stale if stale is not None else error, MENSAJES_SIN_DATOS[seccion].format(licitacion_id=licitacion_id))
+
+
+async def abrir_seccion_stream(
+    licitacion_id: str, endpoint: str, max_bytes: int = STREAM_MAX_BYTES
+) -> httpx.Response | dict[str, Any]:
+    """Abre la descarga de una sección sin leer el cuerpo, para reenviarlo por trozos.
+
+    Devuelve la respuesta abierta (hay que cerrarla: `iterar_stream` lo hace al terminar)
+    o un dict con `error` (ver `seccion_tras_error`).
+    Lanza ValueError si la API anuncia más de `max_bytes`.
+    No pasa por la caché ni reintenta, pero respeta el circuit breaker, el limitador
+    (`LimiteExcedido`) y las métricas.
+    """
+    accesos_licitacion[licitacion_id] += 1
+    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/{endpoint}"
+    breaker = upstream_resilience.breaker(endpoint)
+    if not breaker.allow():
+        upstream_resilience.short_circuits[endpoint] += 1
+        return {"error": f"API de licitaciones no disponible temporalmente ({endpoint}); circuito abierto"}
+    try:
+        await upstream_limiter.adquirir()
+
+        client = get_http_client()
+        request = client.build_request("GET", url, timeout=upstream_resilience.timeout(endpoint))
+        metrics.upstream_in_flight.inc(endpoint=endpoint)
+        inicio = time.perf_counter()
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.TransportError as e:
+            metrics.upstream_requests.inc(endpoint=endpoint, method="GET", status=type(e).__name__)
+            upstream_resilience.failures[endpoint] += 1
+            breaker.record_failure()
+            return {"error": str(e) or type(e).__name__}
+        finally:
+            metrics.upstream_duration.observe(time.perf_counter() - inicio, endpoint=endpoint, method="GET")
+            metrics.upstream_in_flight.dec(endpoint=endpoint)
+        metrics.upstream_requests.inc(endpoint=endpoint, method="GET", status=response.status_code)
+
+        if response.status_code >= 400:
+            await response.aclose()
+            if response.status_code >= 500 or response.status_code == 429:
+                upstream_resilience.failures[endpoint] += 1
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return {"error": f"La API respondió {response.status_code} para {url}"}
+
+        breaker.record_success()
+        anunciado = response.headers.get("Content-Length")
+        if anunciado and anunciado.isdigit() and int(anunciado) > max_bytes:
+            await response.aclose()
+            raise ValueError(f"La respuesta de la API ({anunciado} bytes) supera el máximo de {max_bytes} bytes")
+        return response
+    finally:
+        # Cualquier salida (limitador, cancelación, error inesperado) libera la petición de
+        # prueba del half_open; record_success/record_failure ya la habían liberado si llegaron
+        breaker.trial_in_flight = False
+
+
+async def iterar_stream(response: httpx.Response, max_bytes: int = STREAM_MAX_BYTES) -> AsyncIterator[bytes]:
+    """Entrega el cuerpo de una respuesta abierta por trozos y la cierra al terminar.
+
+    Si el cuerpo supera `max_bytes` (la API no siempre envía Content-Length) se corta
+    la descarga con ValueError: el cliente recibe una respuesta incompleta.
+    """
+    endpoint = endpoint_de_url(str(response.url))
+    recibidos = 0
+    try:
+        async for trozo in response.aiter_bytes(STREAM_CHUNK_BYTES):
+            recibidos += len(trozo)
+            if recibidos > max_bytes:
+                raise ValueError(f"La respuesta de la API supera el máximo de {max_bytes} bytes")
+            yield trozo
+    finally:
+        metrics.upstream_response_bytes.observe(recibidos, endpoint=endpoint)
+        await response.aclose()
+
+
+def _cuerpo_correo(correo: Any) -> tuple[str | None, str]:
+    """(campo, texto) del cuerpo del correo: el primer campo conocido o, si no, el texto más largo."""
+    if not isinstance(correo, dict):
+        return None, ""
+    for campo in CAMPOS_CUERPO_CORREO:
+        if isinstance(correo.get(campo), str):
+            return campo, correo[campo]
+    textos = [(campo, valor) for campo, valor in correo.items() if isinstance(valor, str)]
+    return max(textos, key=lambda t: len(t[1]), default=(None, ""))
+
+
+def paginar_correo(
+    licitacion_id: str, correo: Any, pagina: int = 1, caracteres: int = CORREO_PAGINA_CHARS
+) -> dict[str, Any]:
+    """Página `pagina` (desde 1) del cuerpo del correo; la primera incluye además los demás campos."""
+    caracteres = max(500, min(caracteres, CORREO_PAGINA_MAX_CHARS))
+    campo, cuerpo = _cuerpo_correo(correo)
+    total_paginas = max(1, -(-len(cuerpo) // caracteres))
+    pagina = max(1, min(pagina, total_paginas))
+    resultado: dict[str, Any] = {
+        "licitacion_id": licitacion_id,
+        "pagina": pagina,
+        "total_paginas": total_paginas,
+        "caracteres_totales": len(cuerpo),
+        "siguiente_pagina": pagina + 1 if pagina < total_paginas else None,
+    }
+    if pagina == 1 and isinstance(correo, dict):
+        resultado["cabecera"] = {clave: valor for clave, valor in correo.items() if clave != campo}
+    resultado["contenido"] = cuerpo[(pagina - 1) * caracteres:pagina * caracteres]
+    return resultado
+
+
+async def buscar(
+    query: str = "",
+    estado: str | None = None,
+    entidad: str | None = None,
+    monto_min: float | None = None,
+    monto_max: float | None = None,
+    limit: int = LISTADO_DEFAULT_LIMIT,
+    offset: int = 0,
+) -> dict[str, Any] | str:
+    """Búsqueda en el índice local; antes refresca el listado si su snapshot expiró."""
+    licitaciones = await obtener_listado_licitaciones()
+    if isinstance(licitaciones, str) and not len(indice_licitaciones):
+        return licitaciones
+
+    limit = max(1, min(limit, LISTADO_MAX_LIMIT))
+    return indice_licitaciones.buscar(query, estado, entidad, monto_min, monto_max, limit, max(0, offset))
+
+
+async def cambiar_estado(licitacion_id: str, nuevo_estado: str, idempotency_key: str | None = None) -> Any:
+    """Cambia el estado en la API e invalida la caché de la licitación si tuvo éxito.
+
+    El POST solo se reintenta si se proporciona `idempotency_key`.
+    """
+    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/estado"
+    payload = {"estado": nuevo_estado}
+    data = await make_licitaciones_request(url, method="POST", data=payload, idempotency_key=idempotency_key)
+    
+    if data and "error" not in data:
+        # El estado cambió: las secciones cacheadas de la licitación y el listado ya no son válidos
+        response_cache.invalidate_licitacion(licitacion_id)
+        response_cache.delete(LISTADO_CACHE_KEY)
+        await asyncio.to_thread(snapshot_store.borrar_licitacion, licitacion_id)
+        await asyncio.to_thread(snapshot_store.borrar, LISTADO_CACHE_KEY)
+    
+    return _resultado(data, f"No se pudo cambiar el estado de la licitación {licitacion_id}.")
+
+
+async def _cambiar_estado_en_lote(licitacion_id: str, nuevo_estado: str, idempotency_key: str | None) -> Any:
+    with con_prioridad("bulk"):
+        return await cambiar_estado(licitacion_id, nuevo_estado, idempotency_key)
+
+
+# Cola de cambios de estado masivos; cada transición usa `cambiar_estado` (con clave si el trabajo la tiene)
+cola_estados = JobQueue(
+    _cambiar_estado_en_lote,
+    concurrency=ESTADO_BULK_CONCURRENCY,
+    max_items=BULK_MAX_IDS,
+    max_jobs=JOBS_MAX,
+    retention=JOBS_RETENTION,
+    path=JOBS_PATH,
+)
+
+jobs_queue_depth = metrics.registry.gauge(
+    "licitaciones_jobs_queue_depth", "Cambios de estado masivos pendientes en la cola"
+)
+jobs_items = metrics.registry.counter(
+    "licitaciones_jobs_items_total", "Cambios de estado masivos acumulados por resultado", ("result",)
+)
+
+
+def _collect_jobs_metrics() -> None:
+    jobs_queue_depth.set(cola_estados.queue_depth())
+    jobs_items.set_total(cola_estados.items_ok, result="ok")
+    jobs_items.set_total(cola_estados.items_failed, result="error")
+
+
+metrics.registry.add_collector(_collect_jobs_metrics)
+
+
+def render_mcp(resultado: Any, fields: list[str] | None = None, max_chars: int | None = None) -> str:
+    """Convierte un resultado en el texto que recibe el LLM.
+
+    Es la única capa que serializa a texto: los endpoints REST de server.py usan
+    directamente el objeto parseado. Aplica el modo y el presupuesto de salida
+    configurados; si la herramienta recibe `max_chars`, ese presupuesto sustituye
+    a los límites por defecto.
+    """
+    if isinstance(resultado, str):
+        return resultado
+    if max_chars:
+        return render_json(resultado, OUTPUT_MODE, fields, max_chars)
+    return render_json(resultado, OUTPUT_MODE, fields, OUTPUT_MAX_CHARS or None, OUTPUT_MAX_TEXT_CHARS or None)
 
 
 @mcp.tool()
-async def obtener_licitacion_completa(licitacion_id: str) -> str:
-    """Obtener información completa de una licitación específica.
+@instrument_tool
+async def listar_licitaciones(
+    estado: str | None = None,
+    entidad: str | None = None,
+    fecha_desde: str | None = None,
+    fecha_hasta: str | None = None,
+    fields: list[str] | None = None,
+    limit: int = LISTADO_DEFAULT_LIMIT,
+    offset: int = 0,
+) -> str:
+    """Listar las licitaciones disponibles, con filtros y paginación.
     
     Args:
-        licitacion_id: ID de la licitación a consultar
+        estado: Filtrar por estado (ej: "abierta", "cerrada", "en_evaluacion", "adjudicada")
+        entidad: Filtrar por entidad (coincidencia parcial, sin distinguir mayúsculas)
+        fecha_desde: Fecha mínima en formato YYYY-MM-DD
+        fecha_hasta: Fecha máxima en formato YYYY-MM-DD
+        fields: Campos a incluir de cada licitación (el "id" siempre se incluye)
+        limit: Número máximo de licitaciones a devolver (máximo 100)
+        offset: Posición desde la que empezar; usar "next_offset" para pedir la siguiente página
         
     Returns:
-        Información completa de la licitación
+        Página de licitaciones con el total de resultados y el offset de la página siguiente
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/completo"
-    data = await make_licitaciones_request(url)
+    return render_mcp(await consultar_licitaciones(
+        estado, entidad, fecha_desde, fecha_hasta, fields, limit, offset
+    ))
+
+
+@mcp.tool()
+@instrument_tool
+async def buscar_licitaciones(
+    query: str = "",
+    estado: str | None = None,
+    entidad: str | None = None,
+    monto_min: float | None = None,
+    monto_max: float | None = None,
+    limit: int = LISTADO_DEFAULT_LIMIT,
+    offset: int = 0,
+) -> str:
+    """Buscar licitaciones por palabras clave, ordenadas por relevancia.
     
-    if not data:
-        return f"No se pudo obtener la licitación con ID {licitacion_id}."
+    Preferir esta herramienta a listar_licitaciones cuando se busca algo concreto.
     
-    if "error" in data:
-        return f"Error: {data['error']}"
+    Args:
+        query: Palabras clave (título, entidad, descripción y detalles ya consultados)
+        estado: Filtrar por estado (ej: "abierta", "cerrada", "en_evaluacion", "adjudicada")
+        entidad: Filtrar por entidad (coincidencia parcial)
+        monto_min: Monto mínimo
+        monto_max: Monto máximo
+        limit: Número máximo de resultados (máximo 100)
+        offset: Posición desde la que empezar
+        
+    Returns:
+        Resultados con su puntuación y facetas (conteos por estado y entidad, rango de montos)
+    """
+    return render_mcp(await buscar(query, estado, entidad, monto_min, monto_max, limit, offset))
+
+
+@mcp.tool()
+@instrument_tool
+async def obtener_licitacion_completa(
+    licitacion_id: str, fields: list[str] | None = None, max_chars: int | None = None
+) -> str:
+    """Obtener información completa de una licitación específica.
     
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    Args:
+        licitacion_id: ID de la licitación a consultar
+        fields: Campos a incluir (opcional); reduce el tamaño de la respuesta
+        max_chars: Tamaño máximo de la respuesta; aumentarlo para ver los textos recortados
+        
+    Returns:
+        Información completa de la licitación
+    """
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "completo"), fields, max_chars)
 
 
 @mcp.tool()
-async def ver_correo_licitacion(licitacion_id: str) -> str:
+@instrument_tool
+async def ver_correo_licitacion(licitacion_id: str, max_chars: int | None = None) -> str:
     """Ver el correo original de una licitación.
     
     Args:
         licitacion_id: ID de la licitación
+        max_chars: Tamaño máximo de la respuesta; aumentarlo para ver el correo completo
         
     Returns:
         Contenido del correo original de la licitación
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/correo"
-    data = await make_licitaciones_request(url)
-    
-    if not data:
-        return f"No se pudo obtener el correo de la licitación {licitacion_id}."
-    
-    if "error" in data:
-        return f"Error: {data['error']}"
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "correo"), max_chars=max_chars)
+
+
+@mcp.tool()
+@instrument_tool
+async def leer_correo_licitacion(
+    licitacion_id: str, pagina: int = 1, caracteres_por_pagina: int = CORREO_PAGINA_CHARS
+) -> str:
+    """Leer por páginas el correo original de una licitación (para correos largos).
     
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    Args:
+        licitacion_id: ID de la licitación
+        pagina: Número de página del cuerpo del correo, empezando en 1
+        caracteres_por_pagina: Caracteres del cuerpo por página (máximo 32000)
+        
+    Returns:
+        Fragmento del cuerpo con el total de páginas y la siguiente página; la primera
+        página incluye también remitente, asunto y demás datos del correo
+    """
+    correo = await obtener_datos_seccion(licitacion_id, "correo")
+    if isinstance(correo, str):
+        return correo
+    return dumps(paginar_correo(licitacion_id, correo, pagina, caracteres_por_pagina))
 
 
 @mcp.tool()
+@instrument_tool
 async def obtener_detalles_licitacion(licitacion_id: str) -> str:
     """Obtener detalles específicos de una licitación.
     
@@ -107,19 +1170,11 @@ async def obtener_detalles_licitacion(licitacion_id: str) -> str:
     Returns:
         Detalles de la licitación
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/detalles"
-    data = await make_licitaciones_request(url)
-    
-    if not data:
-        return f"No se pudieron obtener los detalles de la licitación {licitacion_id}."
-    
-    if "error" in data:
-        return f"Error: {data['error']}"
-    
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "detalles"))
 
 
 @mcp.tool()
+@instrument_tool
 async def obtener_documentos_requeridos(licitacion_id: str) -> str:
     """Obtener la lista de documentos requeridos para una licitación.
     
@@ -129,19 +1184,11 @@ async def obtener_documentos_requeridos(licitacion_id: str) -> str:
     Returns:
         Lista de documentos requeridos
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/documentos_requeridos"
-    data = await make_licitaciones_request(url)
-    
-    if not data:
-        return f"No se pudieron obtener los documentos requeridos para la licitación {licitacion_id}."
-    
-    if "error" in data:
-        return f"Error: {data['error']}"
-    
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "documentos_requeridos"))
 
 
 @mcp.tool()
+@instrument_tool
 async def cambiar_estado_licitacion(licitacion_id: str, nuevo_estado: str) -> str:
     """Cambiar el estado de una licitación.
     
@@ -152,20 +1199,60 @@ async def cambiar_estado_licitacion(licitacion_id: str, nuevo_estado: str) -> st
     Returns:
         Confirmación del cambio de estado
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/estado"
-    payload = {"estado": nuevo_estado}
-    data = await make_licitaciones_request(url, method="POST", data=payload)
+    return render_mcp(await cambiar_estado(licitacion_id, nuevo_estado))
+
+
+@mcp.tool()
+@instrument_tool
+async def cambiar_estado_licitaciones(
+    licitacion_ids: list[str], nuevo_estado: str, idempotency_key: str | None = None
+) -> str:
+    """Cambiar el estado de varias licitaciones a la vez, en segundo plano.
     
-    if not data:
-        return f"No se pudo cambiar el estado de la licitación {licitacion_id}."
+    Devuelve de inmediato un trabajo_id; usar consultar_trabajo para ver el progreso
+    y el resultado de cada licitación.
     
-    if "error" in data:
-        return f"Error: {data['error']}"
+    Args:
+        licitacion_ids: IDs de las licitaciones a cambiar
+        nuevo_estado: Nuevo estado para todas ellas (ej: "cerrada", "adjudicada")
+        idempotency_key: Clave opcional; repetir la llamada con la misma clave devuelve
+            el mismo trabajo en lugar de crear otro (con otras licitaciones o estado es un error)
+        
+    Returns:
+        Trabajo creado con su trabajo_id y el número de licitaciones pendientes
+    """
+    try:
+        trabajo = cola_estados.crear(
+            [(licitacion_id, nuevo_estado) for licitacion_id in licitacion_ids], idempotency_key
+        )
+    except ClaveEnConflicto as e:
+        return dumps({"error": str(e), "trabajo_id": e.trabajo_id})
+    except ValueError as e:
+        return f"Error: {e}"
+    return dumps(trabajo)
+
+
+@mcp.tool()
+@instrument_tool
+async def consultar_trabajo(trabajo_id: str, incluir_items: bool = True) -> str:
+    """Consultar el progreso de un cambio de estado masivo.
     
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    Args:
+        trabajo_id: ID devuelto por cambiar_estado_licitaciones
+        incluir_items: Incluir el resultado de cada licitación
+        
+    Returns:
+        Estado del trabajo (pendiente, en_curso, completado, completado_con_errores),
+        contadores y el resultado por licitación
+    """
+    trabajo = cola_estados.obtener(trabajo_id, incluir_items)
+    if trabajo is None:
+        return f"No existe el trabajo {trabajo_id}."
+    return render_mcp(trabajo)
 
 
 @mcp.tool()
+@instrument_tool
 async def obtener_requisitos_experiencia(licitacion_id: str) -> str:
     """Obtener los requisitos de experiencia para una licitación.
     
@@ -175,19 +1262,11 @@ async def obtener_requisitos_experiencia(licitacion_id: str) -> str:
     Returns:
         Requisitos de experiencia solicitados
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/experiencia"
-    data = await make_licitaciones_request(url)
-    
-    if not data:
-        return f"No se pudieron obtener los requisitos de experiencia para la licitación {licitacion_id}."
-    
-    if "error" in data:
-        return f"Error: {data['error']}"
-    
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "experiencia"))
 
 
 @mcp.tool()
+@instrument_tool
 async def obtener_requisitos_financieros(licitacion_id: str) -> str:
     """Obtener los requisitos financieros para una licitación.
     
@@ -197,19 +1276,11 @@ async def obtener_requisitos_financieros(licitacion_id: str) -> str:
     Returns:
         Requisitos financieros solicitados
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/financiero"
-    data = await make_licitaciones_request(url)
-    
-    if not data:
-        return f"No se pudieron obtener los requisitos financieros para la licitación {licitacion_id}."
-    
-    if "error" in data:
-        return f"Error: {data['error']}"
-    
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "financiero"))
 
 
 @mcp.tool()
+@instrument_tool
 async def obtener_requisitos_hv(licitacion_id: str) -> str:
     """Obtener los requisitos de hojas de vida para una licitación.
     
@@ -219,19 +1290,11 @@ async def obtener_requisitos_hv(licitacion_id: str) -> str:
     Returns:
         Requisitos de hojas de vida del equipo de trabajo
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/hv"
-    data = await make_licitaciones_request(url)
-    
-    if not data:
-        return f"No se pudieron obtener los requisitos de HV para la licitación {licitacion_id}."
-    
-    if "error" in data:
-        return f"Error: {data['error']}"
-    
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "hv"))
 
 
 @mcp.tool()
+@instrument_tool
 async def obtener_resumen_ia(licitacion_id: str) -> str:
     """Obtener un resumen generado por IA de una licitación.
     
@@ -241,19 +1304,11 @@ async def obtener_resumen_ia(licitacion_id: str) -> str:
     Returns:
         Resumen inteligente de la licitación
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/resumen_ia"
-    data = await make_licitaciones_request(url)
-    
-    if not data:
-        return f"No se pudo obtener el resumen IA para la licitación {licitacion_id}."
-    
-    if "error" in data:
-        return f"Error: {data['error']}"
-    
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "resumen_ia"))
 
 
 @mcp.tool()
+@instrument_tool
 async def obtener_requisitos_tecnicos(licitacion_id: str) -> str:
     """Obtener los requisitos técnicos de una licitación.
     
@@ -263,19 +1318,11 @@ async def obtener_requisitos_tecnicos(licitacion_id: str) -> str:
     Returns:
         Especificaciones y requisitos técnicos
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/tecnicos"
-    data = await make_licitaciones_request(url)
-    
-    if not data:
-        return f"No se pudieron obtener los requisitos técnicos para la licitación {licitacion_id}."
-    
-    if "error" in data:
-        return f"Error: {data['error']}"
-    
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "tecnicos"))
 
 
 @mcp.tool()
+@instrument_tool
 async def obtener_criterios_puntaje(licitacion_id: str) -> str:
     """Obtener los criterios de evaluación y puntaje de una licitación.
     
@@ -285,21 +1332,220 @@ async def obtener_criterios_puntaje(licitacion_id: str) -> str:
     Returns:
         Criterios de evaluación y distribución de puntaje
     """
-    url = f"{LICITACIONES_API_BASE}/api/licitaciones/{licitacion_id}/puntaje"
-    data = await make_licitaciones_request(url)
+    return render_mcp(await obtener_datos_seccion(licitacion_id, "puntaje"))
+
+
+# (avance, total, mensaje): se llama cada vez que termina una parte de una consulta larga
+Progreso = Callable[[float, float | None, str | None], Awaitable[None]]
+
+
+def progreso_mcp(ctx: Context | None) -> Progreso | None:
+    """Envía notificaciones MCP de progreso por `ctx` (solo si el cliente las pidió con un progressToken).
+
+    Un fallo al notificar (cliente desconectado, llamada fuera de una petición MCP) nunca
+    interrumpe la herramienta.
+    """
+    if ctx is None:
+        return None
+
+    async def progreso(avance: float, total: float | None, mensaje: str | None) -> None:
+        try:
+            await ctx.report_progress(avance, total, mensaje)
+        except Exception:
+            pass
+
+    return progreso
+
+
+async def obtener_expediente(
+    licitacion_id: str, secciones: list[str] | None = None, progreso: Progreso | None = None
+) -> dict[str, Any]:
+    """Descarga en paralelo varias secciones de una licitación y las combina.
+
+    La concurrencia está acotada por un semáforo y cada sección tiene su propio
+    timeout; un fallo en una sección se reporta en `errores` sin invalidar el resto.
+    Si ninguna sección llega y alguna la rechazó el limitador, se lanza `LimiteExcedido`.
+    Con `progreso` se notifica cada sección según va llegando.
+    """
+    accesos_licitacion[licitacion_id] += 1
+    secciones = list(dict.fromkeys(secciones or SECCIONES_EXPEDIENTE))
+    semaforo = asyncio.Semaphore(EXPEDIENTE_MAX_CONCURRENCY)
+    completadas = 0
+    limitadas: list[LimiteExcedido] = []
+
+    async def _descargar_seccion(seccion: str) -> tuple[str, Any, str | None]:
+        if seccion not in SECCIONES_LICITACION:
+            return seccion, None, f"Sección desconocida. Opciones: {', '.join(SECCIONES_LICITACION)}"
+        async with semaforo:
+            try:
+                data = await asyncio.wait_for(
+                    fetch_licitacion_seccion(licitacion_id, seccion),
+                    timeout=EXPEDIENTE_SECTION_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                return seccion, None, f"Timeout tras {EXPEDIENTE_SECTION_TIMEOUT:g}s"
+            except LimiteExcedido as e:
+                limitadas.append(e)
+                return seccion, None, str(e)
+        if not data:
+            return seccion, None, "Sin datos"
+        if "error" in data:
+            return seccion, None, str(data["error"])
+        return seccion, data, None
+
+    async def _obtener_seccion(seccion: str) -> tuple[str, Any, str | None]:
+        nonlocal completadas
+        resultado = await _descargar_seccion(seccion)
+        completadas += 1
+        if progreso is not None:
+            estado = "error" if resultado[2] else "ok"
+            await progreso(completadas, len(secciones), f"Sección {seccion}: {estado}")
+        return resultado
+
+    resultados = await asyncio.gather(*(_obtener_seccion(seccion) for seccion in secciones))
+
+    expediente: dict[str, Any] = {"licitacion_id": licitacion_id, "secciones": {}, "errores": {}}
+    for seccion, data, error in resultados:
+        if error is None:
+            expediente["secciones"][seccion] = data
+        else:
+            expediente["errores"][seccion] = error
+    if limitadas and not expediente["secciones"]:
+        raise max(limitadas, key=lambda e: e.retry_after)
+    return expediente
+
+
+@mcp.tool()
+@instrument_tool
+async def obtener_expediente_licitacion(
+    licitacion_id: str,
+    secciones: list[str] | None = None,
+    fields: list[str] | None = None,
+    max_chars: int | None = None,
+    ctx: Context | None = None,
+) -> str:
+    """Obtener en una sola llamada varias secciones de una licitación.
     
-    if not data:
-        return f"No se pudieron obtener los criterios de evaluación para la licitación {licitacion_id}."
+    Usar en lugar de llamar una por una a las herramientas de detalles, documentos,
+    requisitos, puntaje, resumen IA y correo.
     
-    if "error" in data:
-        return f"Error: {data['error']}"
+    Args:
+        licitacion_id: ID de la licitación
+        secciones: Secciones a incluir (por defecto todas salvo "completo"). Opciones:
+            "detalles", "documentos_requeridos", "experiencia", "financiero", "hv",
+            "tecnicos", "puntaje", "resumen_ia", "correo", "completo"
+        fields: Campos a incluir de cada sección (opcional)
+        max_chars: Tamaño máximo de la respuesta; aumentarlo para ver los textos recortados
+        
+    Returns:
+        Expediente con una entrada por sección y los errores de las secciones que fallaron
+    """
+    expediente = await obtener_expediente(licitacion_id, secciones, progreso_mcp(ctx))
+    
+    if not expediente["secciones"] and expediente["errores"]:
+        return f"No se pudo obtener el expediente de la licitación {licitacion_id}: " + json.dumps(
+            expediente["errores"], ensure_ascii=False
+        )
     
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return render_mcp(expediente, fields, max_chars)
+
+
+async def iterar_seccion_licitaciones(
+    licitacion_ids: list[str], seccion: str, max_concurrency: int = BULK_MAX_CONCURRENCY
+) -> AsyncIterator[dict[str, Any]]:
+    """Obtiene la misma sección para varias licitaciones y entrega cada resultado al completarse.
+
+    Los resultados llegan en orden de finalización, no de entrada, y cada uno lleva
+    su `licitacion_id`. Si el consumidor deja de iterar, las descargas pendientes se cancelan.
+    Las peticiones a la API van con prioridad "bulk", por detrás de las consultas interactivas;
+    las que rechaza el limitador llevan `retry_after`.
+    """
+    if seccion not in SECCIONES_LICITACION:
+        raise ValueError(f"Sección desconocida: {seccion}. Opciones: {', '.join(SECCIONES_LICITACION)}")
+    if len(licitacion_ids) > BULK_MAX_IDS:
+        raise ValueError(f"Se admiten como máximo {BULK_MAX_IDS} licitaciones por consulta")
+
+    semaforo = asyncio.Semaphore(max(1, min(max_concurrency, BULK_MAX_CONCURRENCY)))
+
+    async def _obtener(licitacion_id: str) -> dict[str, Any]:
+        try:
+            async with semaforo:
+                with con_prioridad("bulk"):
+                    data = await fetch_licitacion_seccion(licitacion_id, seccion)
+        except LimiteExcedido as e:
+            return {"licitacion_id": licitacion_id, "seccion": seccion, "error": str(e), "retry_after": round(e.retry_after, 2)}
+        if not data:
+            return {"licitacion_id": licitacion_id, "seccion": seccion, "error": "Sin datos"}
+        if "error" in data:
+            return {"licitacion_id": licitacion_id, "seccion": seccion, "error": str(data["error"])}
+        return {"licitacion_id": licitacion_id, "seccion": seccion, "data": data}
+
+    tasks = [asyncio.ensure_future(_obtener(licitacion_id)) for licitacion_id in dict.fromkeys(licitacion_ids)]
+    try:
+        for siguiente in asyncio.as_completed(tasks):
+            yield await siguiente
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@mcp.tool()
+@instrument_tool
+async def obtener_seccion_licitaciones(
+    licitacion_ids: list[str], seccion: str, max_chars: int | None = None, ctx: Context | None = None
+) -> str:
+    """Obtener la misma sección para varias licitaciones a la vez (para compararlas).
+    
+    Args:
+        licitacion_ids: IDs de las licitaciones a consultar
+        seccion: Sección a obtener: "detalles", "documentos_requeridos", "experiencia",
+            "financiero", "hv", "tecnicos", "puntaje", "resumen_ia", "correo" o "completo"
+        max_chars: Tamaño máximo de la respuesta; aumentarlo para ver más licitaciones
+        
+    Returns:
+        Una línea JSON por licitación (NDJSON), en el orden en que se completaron
+    """
+    presupuesto = max_chars or OUTPUT_MAX_CHARS or None
+    progreso = progreso_mcp(ctx)
+    total = len(dict.fromkeys(licitacion_ids))
+    lineas = []
+    usados = 0
+    omitidas = 0
+    try:
+        async for resultado in iterar_seccion_licitaciones(licitacion_ids, seccion):
+            if progreso is not None:
+                estado = "error" if "error" in resultado else "ok"
+                await progreso(len(lineas) + omitidas + 1, total, f"Licitación {resultado['licitacion_id']}: {estado}")
+            linea = render_json(resultado, "compact", max_text_chars=OUTPUT_MAX_TEXT_CHARS or None)
+            if presupuesto and usados + len(linea) > presupuesto:
+                omitidas += 1
+                continue
+            lineas.append(linea)
+            usados += len(linea) + 1
+    except ValueError as e:
+        return f"Error: {e}"
+    
+    if not lineas and not omitidas:
+        return "No se indicaron licitaciones."
+    
+    if omitidas:
+        lineas.append(dumps({"omitidas": omitidas, "detalle": "Aumenta max_chars o consulta menos licitaciones"}))
+    
+    return "\n".join(lineas)
 
 
 def main():
-    """Initialize and run the MCP server."""
-    mcp.run(transport="stdio")
+    """Initialize and run the MCP server.
+
+    El transporte se elige con el primer argumento o con LICITACIONES_MCP_TRANSPORT:
+    `python licitaciones.py streamable-http` sirve MCP en http://HOST:PORT/mcp para que
+    varios agentes compartan un único proceso con la caché y el pool ya calientes.
+    """
+    transport = sys.argv[1] if len(sys.argv) > 1 else MCP_TRANSPORT
+    if transport not in ("stdio", "sse", "streamable-http"):
+        raise SystemExit(f"Transporte no soportado: {transport} (stdio, sse, streamable-http)")
+    tracing.configurar("licitaciones-mcp")
+    mcp.run(transport=transport)
 
 
 if __name__ == "__main__":
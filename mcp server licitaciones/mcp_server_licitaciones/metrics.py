@@ -0,0 +1,249 @@
+"""
+Métricas en formato de exposición de Prometheus, sin dependencias externas.
+Contadores, gauges e histogramas con etiquetas, pensados para estar siempre activos:
+cada observación es un par de operaciones sobre diccionarios.
+"""
+import functools
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from typing import Any
+
+import tracing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _etiquetas(nombres: tuple[str, ...], valores: tuple[str, ...], extra: str = "") -> str:
+    partes = [f'{nombre}="{_escape(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(valor)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple([str(labels.get(nombre, "")) for nombre in self.labelnames])
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lineas.extend(self._samples())
+        return "\n".join(lineas)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def set_total(self, valor: float, **labels: Any) -> None:
+        """Copia un total que ya acumula otro objeto (p. ej. los aciertos de la caché), desde un collector."""
+        self._values[self._key(labels)] = valor
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_etiquetas(self.labelnames, key)} {_numero(valor)}"
+            for key, valor in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, valor: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = valor
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por serie: [conteos por bucket (+Inf al final), suma]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, valor: float, **labels: Any) -> None:
+        key = self._key(labels)
+        serie = self._series.get(key)
+        if serie is None:
+            serie = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        serie[0][bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+
+    def count(self, **labels: Any) -> int:
+        serie = self._series.get(self._key(labels))
+        return sum(serie[0]) if serie else 0
+
+    def _samples(self) -> list[str]:
+        lineas = []
+        for key, (conteos, suma) in self._series.items():
+            acumulado = 0
+            for limite, conteo in zip((*self.buckets, float("inf")), conteos):
+                acumulado += conteo
+                le = "+Inf" if limite == float("inf") else _numero(limite)
+                etiquetas = _etiquetas(self.labelnames, key, f'le="{le}"')
+                lineas.append(f"{self.name}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.name}_sum{_etiquetas(self.labelnames, key)} {_numero(suma)}")
+            lineas.append(f"{self.name}_count{_etiquetas(self.labelnames, key)} {acumulado}")
+        return lineas
+
+
+class Registry:
+    """Conjunto de métricas; los collectors actualizan gauges y totales justo antes de exportar."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+# Herramientas MCP
+tool_calls = registry.counter(
+    "licitaciones_tool_calls_total", "Llamadas a herramientas MCP", ("tool", "status")
+)
+tool_duration = registry.histogram(
+    "licitaciones_tool_duration_seconds", "Duración de las herramientas MCP", ("tool",)
+)
+tool_in_flight = registry.gauge(
+    "licitaciones_tool_in_flight", "Herramientas MCP en ejecución", ("tool",)
+)
+tool_response_bytes = registry.histogram(
+    "licitaciones_tool_response_bytes", "Tamaño de la respuesta de las herramientas MCP", ("tool",), SIZE_BUCKETS
+)
+
+# API de licitaciones (upstream)
+upstream_requests = registry.counter(
+    "licitaciones_upstream_requests_total", "Peticiones a la API de licitaciones", ("endpoint", "method", "status")
+)
+upstream_duration = registry.histogram(
+    "licitaciones_upstream_request_duration_seconds", "Duración de las peticiones a la API", ("endpoint", "method")
+)
+upstream_in_flight = registry.gauge(
+    "licitaciones_upstream_in_flight", "Peticiones a la API en curso", ("endpoint",)
+)
+upstream_response_bytes = registry.histogram(
+    "licitaciones_upstream_response_bytes", "Tamaño de las respuestas de la API", ("endpoint",), SIZE_BUCKETS
+)
+
+# Endpoints REST de server.py
+http_requests = registry.counter(
+    "licitaciones_http_requests_total", "Peticiones a la API REST", ("method", "route", "status")
+)
+http_duration = registry.histogram(
+    "licitaciones_http_request_duration_seconds", "Duración de las peticiones REST", ("method", "route")
+)
+http_in_flight = registry.gauge(
+    "licitaciones_http_in_flight", "Peticiones REST en curso", ()
+)
+http_response_bytes = registry.histogram(
+    "licitaciones_http_response_bytes", "Tamaño de las respuestas REST", ("route",), SIZE_BUCKETS
+)
+
+
+def _estado_resultado(resultado: Any) -> str:
+    if isinstance(resultado, str) and (resultado.startswith("Error") or resultado.startswith("No se pud")):
+        return "error"
+    return "ok"
+
+
+def instrument_tool(fn: Callable) -> Callable:
+    """Decorador para herramientas MCP: cuenta llamadas, mide duración, tamaño y concurrencia.
+
+    Se aplica debajo de `@mcp.tool()`; `functools.wraps` conserva la firma, así que
+    FastMCP genera el mismo esquema de parámetros. Con las trazas activas cada llamada
+    abre un span hijo del `traceparent` que envía el cliente MCP.
+    """
+    nombre = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        tool_in_flight.inc(tool=nombre)
+        inicio = time.perf_counter()
+        estado = "exception"
+        try:
+            with tracing.span(
+                f"tools/call {nombre}",
+                kind="server",
+                contexto=tracing.contexto_mcp(),
+                **{"mcp.method.name": "tools/call", "gen_ai.tool.name": nombre},
+            ) as span:
+                resultado = await fn(*args, **kwargs)
+                estado = _estado_resultado(resultado)
+                tracing.anotar(span, **{"licitaciones.tool.status": estado})
+                if estado == "error":
+                    tracing.error(span, resultado[:200])
+            if isinstance(resultado, str):
+                tool_response_bytes.observe(len(resultado.encode()), tool=nombre)
+            return resultado
+        finally:
+            tool_duration.observe(time.perf_counter() - inicio, tool=nombre)
+            tool_calls.inc(tool=nombre, status=estado)
+            tool_in_flight.dec(tool=nombre)
+
+    return wrapper
@@ -0,0 +1,258 @@
+"""
+Precarga en segundo plano de las licitaciones que los agentes van a abrir.
+
+Cada `PREFETCH_INTERVAL` segundos se consulta el listado y se encolan las secciones
+de las licitaciones nuevas o modificadas, además de las más consultadas cuya entrada
+en caché está a punto de caducar. Un número acotado de tareas descarga la cola a un
+ritmo máximo de `PREFETCH_RATE` peticiones por segundo, de modo que las llamadas
+interactivas encuentran la respuesta ya en caché.
+
+La cola se ordena por frecuencia de acceso (las consultas interactivas de cada
+licitación, con decaimiento a la mitad en cada ciclo). Frente al limitador de caudal
+de la API la precarga es un llamante más ("prefetch") con la prioridad más baja.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any
+
+import metrics
+from licitaciones import (
+    CACHE_TTLS,
+    accesos_licitacion,
+    fetch_licitacion_seccion,
+    hashes_listado,
+    obtener_listado_licitaciones,
+    response_cache,
+)
+from ratelimit import LimiteExcedido, llamante_actual, prioridad_actual
+
+PREFETCH_ENABLED = os.getenv("LICITACIONES_PREFETCH", "1") == "1"
+PREFETCH_INTERVAL = float(os.getenv("LICITACIONES_PREFETCH_INTERVAL", "60"))
+PREFETCH_RATE = float(os.getenv("LICITACIONES_PREFETCH_RATE", "2"))
+PREFETCH_CONCURRENCY = int(os.getenv("LICITACIONES_PREFETCH_CONCURRENCY", "2"))
+PREFETCH_SECCIONES = tuple(
+    s.strip()
+    for s in os.getenv("LICITACIONES_PREFETCH_SECCIONES", "detalles,puntaje,tecnicos,resumen_ia").split(",")
+    if s.strip() in CACHE_TTLS
+)
+# Licitaciones más consultadas que se mantienen siempre frescas
+PREFETCH_HOT = int(os.getenv("LICITACIONES_PREFETCH_HOT", "20"))
+# Se refresca una entrada caliente si le quedan menos de estos segundos de vigencia
+PREFETCH_REFRESH_AHEAD = float(os.getenv("LICITACIONES_PREFETCH_REFRESH_AHEAD", str(PREFETCH_INTERVAL)))
+PREFETCH_MAX_QUEUE = int(os.getenv("LICITACIONES_PREFETCH_MAX_QUEUE", "1000"))
+
+
+class PrefetchScheduler:
+    """Cola con prioridad de secciones a descargar, alimentada por el sondeo del listado."""
+
+    def __init__(
+        self,
+        secciones: tuple[str, ...] = PREFETCH_SECCIONES,
+        interval: float = PREFETCH_INTERVAL,
+        rate: float = PREFETCH_RATE,
+        concurrency: int = PREFETCH_CONCURRENCY,
+        hot: int = PREFETCH_HOT,
+        refresh_ahead: float = PREFETCH_REFRESH_AHEAD,
+        max_queue: int = PREFETCH_MAX_QUEUE,
+    ):
+        self.secciones = secciones
+        self.interval = interval
+        self.rate = rate
+        self.concurrency = concurrency
+        self.hot = hot
+        self.refresh_ahead = refresh_ahead
+        self.max_queue = max_queue
+        self._queue: asyncio.PriorityQueue | None = None
+        # (licitacion_id, seccion) → instante en que se encoló
+        self._pendientes: dict[tuple[str, str], float] = {}
+        self._hashes: dict[str, str] = {}
+        self._secuencia = 0
+        self._siguiente_turno = 0.0
+        self.running = False
+        self.polls = 0
+        self.poll_errors = 0
+        self.last_poll_at: float | None = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+        self.throttled = 0
+        self.last_wait: float | None = None
+
+    def encolar(self, licitacion_id: str, seccion: str, prioridad: float, forzar: bool = True) -> bool:
+        """Añade una descarga a la cola; con `forzar=False` se aprovecha una copia vigente si la hay."""
+        key = (licitacion_id, seccion)
+        if self._queue is None or key in self._pendientes:
+            return False
+        if len(self._pendientes) >= self.max_queue:
+            self.dropped += 1
+            return False
+        ahora = time.monotonic()
+        self._secuencia += 1
+        self._pendientes[key] = ahora
+        self._queue.put_nowait((-prioridad, self._secuencia, licitacion_id, seccion, forzar))
+        self.enqueued += 1
+        return True
+
+    def _candidatos(self) -> list[tuple[float, str, str, bool]]:
+        """(prioridad, id, sección, forzar) de lo que hay que descargar en este ciclo.
+
+        En el primer sondeo todo parece nuevo: solo se completa lo que falte en caché o en
+        disco. Después, lo modificado y lo caliente a punto de caducar se pide a la API.
+        """
+        primer_sondeo = not self._hashes
+        # Huellas calculadas por licitaciones.py al registrar el listado
+        hashes = dict(hashes_listado)
+        cambiadas = [licitacion_id for licitacion_id, h in hashes.items() if self._hashes.get(licitacion_id) != h]
+        self._hashes = hashes
+
+        candidatos = []
+        for licitacion_id in cambiadas:
+            # +1 para que una licitación nueva o modificada entre aunque nadie la haya consultado
+            prioridad = accesos_licitacion[licitacion_id] + 1
+            candidatos.extend(
+                (prioridad, licitacion_id, seccion, not primer_sondeo) for seccion in self.secciones
+            )
+
+        for licitacion_id, accesos in accesos_licitacion.most_common(self.hot):
+            for seccion in self.secciones:
+                restante = response_cache.ttl_restante((seccion, licitacion_id))
+                if restante is None or restante < self.refresh_ahead:
+                    candidatos.append((accesos + 1, licitacion_id, seccion, True))
+
+        candidatos.sort(key=lambda c: c[0], reverse=True)
+        return candidatos
+
+    def _decaer_accesos(self) -> None:
+        for licitacion_id in list(accesos_licitacion):
+            accesos_licitacion[licitacion_id] //= 2
+            if not accesos_licitacion[licitacion_id]:
+                del accesos_licitacion[licitacion_id]
+
+    async def sondear(self) -> int:
+        """Consulta el listado y encola lo que haya que precargar. Devuelve cuántos trabajos añadió."""
+        self.polls += 1
+        self.last_poll_at = time.monotonic()
+        listado = await obtener_listado_licitaciones()
+        if isinstance(listado, str):
+            self.poll_errors += 1
+            return 0
+        nuevos = sum(
+            self.encolar(licitacion_id, seccion, prioridad, forzar)
+            for prioridad, licitacion_id, seccion, forzar in self._candidatos()
+        )
+        self._decaer_accesos()
+        return nuevos
+
+    async def _esperar_turno(self) -> None:
+        """Limita el ritmo global de descargas a `rate` por segundo."""
+        if self.rate <= 0:
+            return
+        ahora = time.monotonic()
+        turno = max(ahora, self._siguiente_turno)
+        self._siguiente_turno = turno + 1 / self.rate
+        if turno > ahora:
+            await asyncio.sleep(turno - ahora)
+
+    @staticmethod
+    def _marcar_tarea() -> None:
+        """Cada trabajador es una tarea propia: esto solo afecta a las peticiones de la precarga."""
+        llamante_actual.set("prefetch")
+        prioridad_actual.set("prefetch")
+
+    async def _trabajador(self) -> None:
+        self._marcar_tarea()
+        while True:
+            _, _, licitacion_id, seccion, forzar = await self._queue.get()
+            try:
+                encolado = self._pendientes.pop((licitacion_id, seccion), time.monotonic())
+                await self._esperar_turno()
+                self.last_wait = time.monotonic() - encolado
+                data = await fetch_licitacion_seccion(licitacion_id, seccion, refrescar=forzar)
+                if data and "error" not in data:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            except LimiteExcedido:
+                self.throttled += 1
+            except Exception:
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    async def _bucle_sondeo(self) -> None:
+        self._marcar_tarea()
+        while True:
+            try:
+                await self.sondear()
+            except Exception:
+                self.poll_errors += 1
+            await asyncio.sleep(self.interval)
+
+    @asynccontextmanager
+    async def run(self):
+        """Arranca el sondeo y los trabajadores mientras dure el contexto (lifespan de server.py)."""
+        self._queue = asyncio.PriorityQueue()
+        self._pendientes.clear()
+        tareas = [asyncio.create_task(self._bucle_sondeo())]
+        tareas += [asyncio.create_task(self._trabajador()) for _ in range(max(1, self.concurrency))]
+        self.running = True
+        try:
+            yield self
+        finally:
+            self.running = False
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+            self._queue = None
+
+    def lag(self) -> float:
+        """Segundos que lleva esperando el trabajo más antiguo de la cola."""
+        if not self._pendientes:
+            return 0.0
+        return time.monotonic() - min(self._pendientes.values())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "secciones": list(self.secciones),
+            "interval": self.interval,
+            "rate": self.rate,
+            "queue_depth": len(self._pendientes),
+            "lag_seconds": round(self.lag(), 3),
+            "last_wait_seconds": round(self.last_wait, 3) if self.last_wait is not None else None,
+            "last_poll_age_seconds": (
+                round(time.monotonic() - self.last_poll_at, 3) if self.last_poll_at is not None else None
+            ),
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "throttled": self.throttled,
+            "tracked_licitaciones": len(accesos_licitacion),
+        }
+
+
+prefetch_scheduler = PrefetchScheduler()
+
+queue_depth = metrics.registry.gauge("licitaciones_prefetch_queue_depth", "Trabajos de precarga pendientes")
+queue_lag = metrics.registry.gauge(
+    "licitaciones_prefetch_lag_seconds", "Antigüedad del trabajo de precarga más antiguo en cola"
+)
+jobs = metrics.registry.counter(
+    "licitaciones_prefetch_jobs_total", "Trabajos de precarga acumulados por resultado", ("result",)
+)
+
+
+def _collect_metrics() -> None:
+    queue_depth.set(len(prefetch_scheduler._pendientes))
+    queue_lag.set(prefetch_scheduler.lag())
+    for resultado in ("enqueued", "completed", "failed", "throttled", "dropped"):
+        jobs.set_total(getattr(prefetch_scheduler, resultado), result=resultado)
+
+
+metrics.registry.add_collector(_collect_metrics)
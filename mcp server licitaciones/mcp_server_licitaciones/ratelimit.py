@@ -0,0 +1,315 @@
+"""
+Limitación de caudal y planificación de las peticiones a la API de licitaciones.
+
+Cada petición que sale hacia la API (también cada reintento) consume un token de
+dos token buckets: el del llamante (cliente REST, sesión MCP o usuario del agente)
+y el global del proceso. Si el del llamante está vacío se espera a que se recargue;
+los tokens del global se reparten entre quienes esperan por prioridad: primero las
+consultas interactivas, después las masivas (varias licitaciones, cambios de estado
+en lote) y por último la precarga. Dentro de una prioridad se atiende por turnos a
+cada llamante, así que uno con cientos de peticiones en cola no retrasa a los demás.
+
+Si la espera estimada supera el máximo de su prioridad se lanza `LimiteExcedido`
+con los segundos tras los que conviene reintentar (server.py responde 429 con
+Retry-After). El llamante y la prioridad viajan en ContextVars: server.py fija el
+llamante de cada petición y las rutas masivas y la precarga fijan su prioridad.
+
+Una petición compartida por single-flight lleva una `PrioridadCompartida`: si se une
+a ella alguien más urgente (una consulta interactiva a una descarga de la precarga)
+la petición sube de prioridad, también si ya estaba esperando en la cola.
+"""
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+# De mayor a menor prioridad
+PRIORIDADES = ("interactiva", "bulk", "prefetch")
+
+llamante_actual: ContextVar[str] = ContextVar("llamante", default="local")
+prioridad_actual: ContextVar[str] = ContextVar("prioridad", default="interactiva")
+compartida_actual: ContextVar["PrioridadCompartida | None"] = ContextVar("prioridad_compartida", default=None)
+
+
+@contextmanager
+def con_prioridad(prioridad: str) -> Iterator[None]:
+    """Las peticiones a la API hechas dentro del bloque se planifican con `prioridad`."""
+    token = prioridad_actual.set(prioridad)
+    try:
+        yield
+    finally:
+        prioridad_actual.reset(token)
+
+
+class PrioridadCompartida:
+    """Prioridad de una petición de la que esperan varios llamantes: la del más urgente."""
+
+    def __init__(self, prioridad: str):
+        self.valor = prioridad
+        # (limitador, llamante, futuro) mientras la petición espera en la cola global
+        self.en_cola: tuple["UpstreamRateLimiter", str, asyncio.Future] | None = None
+        self.elevaciones = 0
+
+    def elevar(self, prioridad: str) -> None:
+        """Sube a `prioridad` si es más urgente que la actual (nunca baja)."""
+        if PRIORIDADES.index(prioridad) >= PRIORIDADES.index(self.valor):
+            return
+        anterior, self.valor = self.valor, prioridad
+        self.elevaciones += 1
+        if self.en_cola is not None:
+            limitador, llamante, futuro = self.en_cola
+            limitador._mover(futuro, llamante, anterior, prioridad)
+
+
+class LimiteExcedido(Exception):
+    """La petición tendría que esperar más de lo que admite su prioridad."""
+
+    def __init__(self, ambito: str, retry_after: float):
+        self.ambito = ambito
+        self.retry_after = retry_after
+        super().__init__(
+            f"Límite de peticiones a la API de licitaciones alcanzado ({ambito}); "
+            f"reintenta en {math.ceil(retry_after)} s"
+        )
+
+
+class TokenBucket:
+    """`rate` tokens por segundo acumulables hasta `burst`.
+
+    `reservar` puede dejar el saldo en negativo: cada reserva queda en la cola
+    virtual del bucket y devuelve cuánto debe esperar antes de usar su token.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.actualizado = time.monotonic()
+
+    def _recargar(self, ahora: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (ahora - self.actualizado) * self.rate)
+        self.actualizado = ahora
+
+    def espera(self, n: float = 1.0) -> float:
+        """Segundos hasta que haya `n` tokens (0 si ya los hay)."""
+        self._recargar(time.monotonic())
+        return max(0.0, (n - self.tokens) / self.rate)
+
+    def reservar(self) -> float:
+        """Toma un token (aunque todavía no exista) y devuelve los segundos que hay que esperar."""
+        self._recargar(time.monotonic())
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def devolver(self) -> None:
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class UpstreamRateLimiter:
+    """Token bucket global y por llamante, con cola por prioridad y turnos entre llamantes.
+
+    Con `rate` o `per_caller_rate` a 0 se desactiva el límite correspondiente.
+    `max_wait` es la espera máxima admitida para cada prioridad.
+    """
+
+    def __init__(
+        self,
+        rate: float = 20.0,
+        burst: float = 40.0,
+        per_caller_rate: float = 5.0,
+        per_caller_burst: float = 20.0,
+        max_wait: dict[str, float] | None = None,
+        max_callers: int = 10000,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.per_caller_rate = per_caller_rate
+        self.per_caller_burst = per_caller_burst
+        self.max_wait = {"interactiva": 5.0, "bulk": 60.0, "prefetch": 10.0, **(max_wait or {})}
+        self.max_callers = max_callers
+        self.global_bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        # prioridad → llamante → futuros en espera; el OrderedDict da el turno rotatorio
+        self._colas: dict[str, OrderedDict[str, deque[asyncio.Future]]] = {p: OrderedDict() for p in PRIORIDADES}
+        self._en_cola = 0
+        self._temporizador: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.admitted: Counter[str] = Counter()
+        self.delayed: Counter[str] = Counter()
+        self.rejected: Counter[tuple[str, str]] = Counter()
+        self.wait_seconds: Counter[str] = Counter()
+        self.promoted: Counter[str] = Counter()
+
+    def _bucket(self, llamante: str) -> TokenBucket:
+        bucket = self._buckets.get(llamante)
+        if bucket is None:
+            bucket = self._buckets[llamante] = TokenBucket(self.per_caller_rate, self.per_caller_burst)
+            while len(self._buckets) > self.max_callers:
+                # Se olvida el menos reciente; si estaba lleno no se pierde nada
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(llamante)
+        return bucket
+
+    def _comprobar_loop(self) -> None:
+        """Los futuros en espera son de un event loop: si cambia (otro asyncio.run) se descartan."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._temporizador = None
+            self._en_cola = 0
+            for cola in self._colas.values():
+                cola.clear()
+
+    async def adquirir(self, llamante: str | None = None, prioridad: str | None = None) -> float:
+        """Espera turno para una petición a la API y devuelve los segundos esperados.
+
+        Lanza `LimiteExcedido` (sin consumir nada) si la espera superaría el máximo de la prioridad.
+        Dentro de una petición compartida la prioridad es la de su `PrioridadCompartida`.
+        """
+        llamante = llamante or llamante_actual.get()
+        compartida = compartida_actual.get()
+        prioridad = prioridad or (compartida.valor if compartida is not None else prioridad_actual.get())
+        if prioridad not in self.max_wait:
+            prioridad = "interactiva"
+        max_espera = self.max_wait[prioridad]
+        inicio = time.monotonic()
+
+        bucket = None
+        if self.per_caller_rate > 0:
+            bucket = self._bucket(llamante)
+            espera = bucket.reservar()
+            if espera > max_espera:
+                bucket.devolver()
+                self.rejected[(prioridad, "llamante")] += 1
+                raise LimiteExcedido("llamante", espera)
+            if espera > 0:
+                await asyncio.sleep(espera)
+
+        if self.global_bucket is not None:
+            self._comprobar_loop()
+            if self._en_cola or self.global_bucket.espera() > 0:
+                try:
+                    await self._esperar_turno(llamante, prioridad, max_espera - (time.monotonic() - inicio), compartida)
+                except LimiteExcedido:
+                    if bucket is not None:
+                        bucket.devolver()
+                    raise
+            else:
+                self.global_bucket.reservar()
+
+        esperado = time.monotonic() - inicio
+        if compartida is not None:
+            # Si subió mientras esperaba se cuenta con la prioridad con la que salió
+            prioridad = compartida.valor
+        self.admitted[prioridad] += 1
+        if esperado > 0.001:
+            self.delayed[prioridad] += 1
+            self.wait_seconds[prioridad] += esperado
+        return esperado
+
+    def _por_delante(self, prioridad: str) -> int:
+        """Peticiones en cola que se atenderán antes que una nueva de `prioridad`."""
+        rango = PRIORIDADES.index(prioridad)
+        return sum(len(espera) for p in PRIORIDADES[: rango + 1] for espera in self._colas[p].values())
+
+    async def _esperar_turno(
+        self, llamante: str, prioridad: str, max_espera: float, compartida: PrioridadCompartida | None = None,
+    ) -> None:
+        estimada = self.global_bucket.espera(self._por_delante(prioridad) + 1)
+        if estimada > max_espera:
+            self.rejected[(prioridad, "global")] += 1
+            raise LimiteExcedido("global", estimada)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._colas[prioridad].setdefault(llamante, deque()).append(futuro)
+        self._en_cola += 1
+        if compartida is not None:
+            compartida.en_cola = (self, llamante, futuro)
+        if self._temporizador is None:
+            self._despachar()
+        try:
+            await asyncio.wait_for(futuro, max(0.0, max_espera))
+        except asyncio.TimeoutError:
+            # Llegaron antes peticiones de más prioridad: la estimación inicial se quedó corta
+            self.rejected[(prioridad, "global")] += 1
+            raise LimiteExcedido("global", self.global_bucket.espera(self._por_delante(prioridad) + 1)) from None
+        finally:
+            if compartida is not None:
+                prioridad = compartida.valor
+                compartida.en_cola = None
+            if not futuro.done() or futuro.cancelled():
+                self._retirar(prioridad, llamante, futuro)
+
+    def _retirar(self, prioridad: str, llamante: str, futuro: asyncio.Future) -> bool:
+        espera = self._colas[prioridad].get(llamante)
+        if espera is None or futuro not in espera:
+            return False
+        espera.remove(futuro)
+        self._en_cola -= 1
+        if not espera:
+            del self._colas[prioridad][llamante]
+        return True
+
+    def _mover(self, futuro: asyncio.Future, llamante: str, anterior: str, prioridad: str) -> None:
+        """Pasa una petición en espera a la cola de otra prioridad (al final del turno de su llamante)."""
+        if futuro.done() or not self._retirar(anterior, llamante, futuro):
+            return
+        self._colas[prioridad].setdefault(llamante, deque()).append(futuro)
+        self._en_cola += 1
+        self.promoted[anterior] += 1
+
+    def _siguiente(self) -> asyncio.Future | None:
+        """Primer futuro de la prioridad más alta con espera, rotando entre sus llamantes."""
+        for prioridad in PRIORIDADES:
+            cola = self._colas[prioridad]
+            while cola:
+                llamante, espera = next(iter(cola.items()))
+                futuro = espera.popleft()
+                self._en_cola -= 1
+                if espera:
+                    cola.move_to_end(llamante)
+                else:
+                    del cola[llamante]
+                if not futuro.done():
+                    return futuro
+        return None
+
+    def _despachar(self) -> None:
+        """Entrega los tokens disponibles y, si queda cola, se reprograma para el siguiente."""
+        self._temporizador = None
+        while self._en_cola:
+            espera = self.global_bucket.espera()
+            if espera > 0:
+                self._temporizador = asyncio.get_running_loop().call_later(espera, self._despachar)
+                return
+            futuro = self._siguiente()
+            if futuro is None:
+                return
+            self.global_bucket.reservar()
+            futuro.set_result(None)
+
+    def queue_depth(self) -> dict[str, int]:
+        return {p: sum(len(espera) for espera in self._colas[p].values()) for p in PRIORIDADES}
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "per_caller_rate": self.per_caller_rate,
+            "per_caller_burst": self.per_caller_burst,
+            "max_wait": self.max_wait,
+            "global_tokens": round(self.global_bucket.tokens, 2) if self.global_bucket else None,
+            "tracked_callers": len(self._buckets),
+            "throttled_callers": sum(1 for bucket in self._buckets.values() if bucket.tokens < 1),
+            "queue_depth": self.queue_depth(),
+            "admitted": dict(self.admitted),
+            "delayed": dict(self.delayed),
+            "wait_seconds": {p: round(s, 3) for p, s in self.wait_seconds.items()},
+            "rejected": {f"{p}:{ambito}": n for (p, ambito), n in self.rejected.items()},
+            "promoted": dict(self.promoted),
+        }
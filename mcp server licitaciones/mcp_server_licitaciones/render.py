@@ -0,0 +1,89 @@
+"""
+Renderizado de resultados para el LLM con presupuesto de caracteres.
+Permite JSON compacto o indentado, proyección de campos y recorte de textos y listas
+largas con una marca de "hay más" para que el modelo sepa que puede pedir el resto.
+"""
+import json
+from typing import Any
+
+MODOS = ("compact", "pretty")
+
+
+def dumps(valor: Any, modo: str = "compact") -> str:
+    if modo == "pretty":
+        return json.dumps(valor, indent=2, ensure_ascii=False)
+    return json.dumps(valor, separators=(",", ":"), ensure_ascii=False)
+
+
+def proyectar(valor: Any, campos: list[str]) -> Any:
+    """Conserva solo `campos` en los objetos; los contenedores sin esos campos se recorren."""
+    if isinstance(valor, list):
+        return [proyectar(item, campos) for item in valor]
+    if isinstance(valor, dict):
+        if any(campo in valor for campo in campos):
+            return {campo: valor[campo] for campo in campos if campo in valor}
+        return {clave: proyectar(item, campos) for clave, item in valor.items()}
+    return valor
+
+
+def truncar_textos(valor: Any, max_text_chars: int) -> Any:
+    """Recorta cada texto a `max_text_chars` caracteres indicando cuántos se omitieron."""
+    if isinstance(valor, str):
+        if len(valor) <= max_text_chars:
+            return valor
+        return f"{valor[:max_text_chars]}… [+{len(valor) - max_text_chars} caracteres más]"
+    if isinstance(valor, list):
+        return [truncar_textos(item, max_text_chars) for item in valor]
+    if isinstance(valor, dict):
+        return {clave: truncar_textos(item, max_text_chars) for clave, item in valor.items()}
+    return valor
+
+
+def recortar_listas(valor: Any, max_items: int) -> Any:
+    """Deja como mucho `max_items` elementos por lista, con una marca de los omitidos."""
+    if isinstance(valor, list):
+        items = [recortar_listas(item, max_items) for item in valor[:max_items]]
+        if len(valor) > max_items:
+            items.append(f"… [+{len(valor) - max_items} elementos más]")
+        return items
+    if isinstance(valor, dict):
+        return {clave: recortar_listas(item, max_items) for clave, item in valor.items()}
+    return valor
+
+
+def render_json(
+    valor: Any,
+    modo: str = "compact",
+    campos: list[str] | None = None,
+    max_chars: int | None = None,
+    max_text_chars: int | None = None,
+) -> str:
+    """Serializa `valor` sin superar `max_chars` (si se indica).
+
+    Primero recorta los textos largos y, si no basta, reduce progresivamente el
+    límite de texto y el número de elementos por lista. Como último recurso corta
+    el JSON resultante y lo marca como incompleto.
+    """
+    if campos:
+        valor = proyectar(valor, campos)
+    if max_text_chars:
+        valor = truncar_textos(valor, max_text_chars)
+
+    texto = dumps(valor, modo)
+    if not max_chars or len(texto) <= max_chars:
+        return texto
+
+    limite = max_text_chars or max(len(texto), 1)
+    while limite > 80:
+        limite //= 2
+        texto = dumps(truncar_textos(valor, limite), modo)
+        if len(texto) <= max_chars:
+            return texto
+
+    valor = truncar_textos(valor, 80)
+    for max_items in (50, 20, 10, 5, 3, 1):
+        texto = dumps(recortar_listas(valor, max_items), modo)
+        if len(texto) <= max_chars:
+            return texto
+
+    return f"{texto[:max_chars]}… [respuesta recortada: {len(texto) - max_chars} caracteres más]"
@@ -0,0 +1,129 @@
+"""
+Resiliencia frente a la API de licitaciones: timeouts por endpoint, reintentos con
+backoff exponencial y jitter, y un circuit breaker por endpoint que falla rápido
+mientras la API está caída.
+"""
+import random
+import time
+from collections import Counter
+from typing import Any
+
+import httpx
+
+# Códigos HTTP que indican un fallo transitorio y se pueden reintentar
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class RetryPolicy:
+    """Backoff exponencial con jitter completo: espera aleatoria en [0, min(max, base * 2^intento)]."""
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.2, backoff_max: float = 2.0):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def delay(self, intento: int, retry_after: str | None = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+
+
+class CircuitBreaker:
+    """Circuit breaker clásico: closed → open tras N fallos seguidos → half_open tras `reset_timeout`.
+
+    En half_open se deja pasar una única petición de prueba: si funciona se cierra,
+    si falla se vuelve a abrir.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+        }
+
+
+class UpstreamResilience:
+    """Registro de breakers, timeouts y contadores por endpoint."""
+
+    def __init__(
+        self,
+        timeouts: dict[str, httpx.Timeout],
+        default_timeout: httpx.Timeout,
+        retry_policy: RetryPolicy,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        self.retry_policy = retry_policy
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.retries: Counter[str] = Counter()
+        self.failures: Counter[str] = Counter()
+        self.short_circuits: Counter[str] = Counter()
+        self.stale_served: Counter[str] = Counter()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self.breakers:
+            self.breakers[endpoint] = CircuitBreaker(endpoint, self.failure_threshold, self.reset_timeout)
+        return self.breakers[endpoint]
+
+    def timeout(self, endpoint: str) -> httpx.Timeout:
+        return self.timeouts.get(endpoint, self.default_timeout)
+
+    def stats(self) -> dict[str, Any]:
+        endpoints = sorted(set(self.breakers) | set(self.retries) | set(self.stale_served))
+        return {
+            endpoint: {
+                **self.breaker(endpoint).stats(),
+                "retries": self.retries[endpoint],
+                "failures": self.failures[endpoint],
+                "short_circuits": self.short_circuits[endpoint],
+                "stale_served": self.stale_served[endpoint],
+            }
+            for endpoint in endpoints
+        }
@@ -2,31 +2,89 @@
 Servidor HTTP para exponer el servidor MCP de licitaciones en Coolify.
 El puerto se configura mediante la variable de entorno PORT (Coolify lo maneja automáticamente).
 """
+import asyncio
+import ipaddress
 import os
 import json
-from fastapi import FastAPI, HTTPException
+import math
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import uvicorn
+import metrics
+import tracing
 from licitaciones import (
-    listar_licitaciones,
-    obtener_licitacion_completa,
-    ver_correo_licitacion,
-    obtener_detalles_licitacion,
-    obtener_documentos_requeridos,
-    cambiar_estado_licitacion,
-    obtener_requisitos_experiencia,
-    obtener_requisitos_financieros,
-    obtener_requisitos_hv,
-    obtener_resumen_ia,
-    obtener_requisitos_tecnicos,
-    obtener_criterios_puntaje,
+    mcp,
+    get_http_client,
+    http_client_lifespan,
+    response_cache,
+    snapshot_store,
+    upstream_resilience,
+    upstream_limiter,
+    iterar_seccion_licitaciones,
+    consultar_licitaciones,
+    buscar,
+    obtener_datos_seccion,
+    abrir_seccion_stream,
+    iterar_stream,
+    seccion_tras_error,
+    obtener_expediente,
+    cambiar_estado,
+    cola_estados,
+    SECCIONES_LICITACION,
+    BULK_MAX_IDS,
+    BULK_MAX_CONCURRENCY,
+    LISTADO_DEFAULT_LIMIT,
+    LISTADO_MAX_LIMIT,
+    SERVER_WORKERS,
+    STREAM_MAX_BYTES,
 )
+from http_cache import HTTPCacheMiddleware
+from jobs import ClaveEnConflicto
+from prefetch import PREFETCH_ENABLED, prefetch_scheduler
+from ratelimit import LimiteExcedido, llamante_actual
+from workers import serve_prefork
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el json de la stdlib
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """Respuesta JSON serializada con orjson cuando está disponible."""
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
+
+# Servir también el protocolo MCP (streamable HTTP) en /mcp, para que los agentes
+# compartan este proceso en lugar de lanzar licitaciones.py por stdio
+MCP_HTTP_ENABLED = os.getenv("LICITACIONES_MCP_HTTP", "1") == "1"
+mcp_http_app = mcp.streamable_http_app() if MCP_HTTP_ENABLED else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Abre el pool HTTP compartido (y las sesiones MCP) al arrancar y los cierra al apagar."""
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(http_client_lifespan())
+        await stack.enter_async_context(cola_estados.run())
+        app.state.http_client = get_http_client()
+        if MCP_HTTP_ENABLED:
+            await stack.enter_async_context(mcp.session_manager.run())
+        # Con varios workers la caché es compartida: basta con que precargue uno
+        if PREFETCH_ENABLED and os.getenv("LICITACIONES_WORKER_INDEX", "0") == "0":
+            await stack.enter_async_context(prefetch_scheduler.run())
+        yield
 
 app = FastAPI(
     title="MCP Server - Licitaciones",
     description="Servidor MCP para gestión de licitaciones",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configurar CORS para permitir peticiones desde cualquier origen
@@ -38,9 +96,145 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cache-Control por tipo de recurso (plantilla de ruta). El cliente puede reutilizar la
+# respuesta durante max-age y después revalidarla con If-None-Match (304 si no cambió).
+HTTP_MAX_AGE = int(os.getenv("LICITACIONES_HTTP_MAX_AGE", "30"))
+HTTP_MAX_AGE_REQUISITOS = int(os.getenv("LICITACIONES_HTTP_MAX_AGE_REQUISITOS", "300"))
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv("LICITACIONES_HTTP_COMPRESS_MIN_BYTES", "1024"))
+
+_CACHE_CORTA = f"private, max-age={HTTP_MAX_AGE}"
+_CACHE_LARGA = f"private, max-age={HTTP_MAX_AGE_REQUISITOS}"
+CACHE_CONTROL_RUTAS = {
+    "/api/licitaciones": _CACHE_CORTA,
+    "/api/licitaciones/buscar": _CACHE_CORTA,
+    "/api/licitaciones/{licitacion_id}": _CACHE_CORTA,
+    "/api/licitaciones/{licitacion_id}/detalles": _CACHE_CORTA,
+    "/api/licitaciones/{licitacion_id}/expediente": _CACHE_CORTA,
+    # Correo, requisitos y resumen cambian poco
+    "/api/licitaciones/{licitacion_id}/correo": _CACHE_LARGA,
+    "/api/licitaciones/{licitacion_id}/documentos": _CACHE_LARGA,
+    "/api/licitaciones/{licitacion_id}/experiencia": _CACHE_LARGA,
+    "/api/licitaciones/{licitacion_id}/financiero": _CACHE_LARGA,
+    "/api/licitaciones/{licitacion_id}/hv": _CACHE_LARGA,
+    "/api/licitaciones/{licitacion_id}/resumen-ia": _CACHE_LARGA,
+    "/api/licitaciones/{licitacion_id}/tecnicos": _CACHE_LARGA,
+    "/api/licitaciones/{licitacion_id}/puntaje": _CACHE_LARGA,
+    # Estado del servidor: siempre actual
+    "/health": "no-store",
+    "/metrics": "no-store",
+    "/api/cache/stats": "no-store",
+    "/api/upstream/stats": "no-store",
+    "/api/prefetch/stats": "no-store",
+    "/api/ratelimit/stats": "no-store",
+    "/api/trabajos/{trabajo_id}": "no-store",
+}
+
+app.add_middleware(
+    HTTPCacheMiddleware,
+    cache_control=CACHE_CONTROL_RUTAS,
+    minimum_size=HTTP_COMPRESS_MIN_BYTES,
+)
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Mide cada petición REST, etiquetada por la plantilla de ruta (no por la URL concreta)."""
+    metrics.http_in_flight.inc()
+    inicio = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        ruta = getattr(route, "path", None) or ("/mcp" if request.url.path.startswith("/mcp") else "otros")
+        metrics.http_duration.observe(time.perf_counter() - inicio, method=request.method, route=ruta)
+        metrics.http_requests.inc(method=request.method, route=ruta, status=status)
+        metrics.http_in_flight.dec()
+        if status < 400 and "content-length" in response.headers:
+            metrics.http_response_bytes.observe(int(response.headers["content-length"]), route=ruta)
+
+# Identidad del llamante para el límite de caudal por llamante: la IP del cliente o, si la
+# petición llega desde una dirección de confianza (el agente o un proxy que autentica),
+# la cabecera con el usuario que envía. Cualquier otro cliente podría cambiarla en cada
+# petición para saltarse su límite. Las sesiones MCP por HTTP conservan la identidad de
+# la petición que las abrió.
+CALLER_HEADER = os.getenv("LICITACIONES_CALLER_HEADER", "X-Client-Id")
+CALLER_TRUSTED = tuple(
+    ipaddress.ip_network(red.strip(), strict=False)
+    for red in os.getenv("LICITACIONES_CALLER_TRUSTED", "").split(",")
+    if red.strip()
+)
+
+def llamante_de_confianza(host: str | None) -> bool:
+    if not host or not CALLER_TRUSTED:
+        return False
+    try:
+        direccion = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(direccion in red for red in CALLER_TRUSTED)
+
+def identidad_llamante(request: Request) -> str:
+    host = request.client.host if request.client else None
+    cliente = request.headers.get(CALLER_HEADER)
+    if cliente and llamante_de_confianza(host):
+        return f"cliente:{cliente}"
+    return f"ip:{host}" if host else "desconocido"
+
+@app.middleware("http")
+async def llamante_middleware(request: Request, call_next):
+    """Fija el llamante de la petición para el limitador de caudal hacia la API."""
+    token = llamante_actual.set(identidad_llamante(request))
+    try:
+        return await call_next(request)
+    finally:
+        llamante_actual.reset(token)
+
+# Trazas: un span SERVER por petición REST, hijo del `traceparent` que envíe el cliente.
+# /mcp no lo abre aquí: cada herramienta abre el suyo con el contexto de la llamada MCP.
+tracing.configurar("licitaciones-api")
+
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    """Abre el span de la petición y lo nombra con la plantilla de ruta al terminar."""
+    if not tracing.activo or request.url.path.startswith("/mcp"):
+        return await call_next(request)
+    with tracing.span(
+        request.method,
+        kind="server",
+        contexto=tracing.extraer(request.headers),
+        **{"http.request.method": request.method, "url.path": request.url.path},
+    ) as span:
+        response = await call_next(request)
+        route = getattr(request.scope.get("route"), "path", None)
+        if span is not None and route:
+            span.update_name(f"{request.method} {route}")
+        tracing.anotar(span, **{"http.route": route, "http.response.status_code": response.status_code})
+        if response.status_code >= 500:
+            tracing.error(span, str(response.status_code))
+        return response
+
 # Modelos Pydantic para requests
 class CambioEstadoRequest(BaseModel):
     nuevo_estado: str
+    idempotency_key: str | None = None
+
+class CambioEstadoItem(BaseModel):
+    licitacion_id: str
+    nuevo_estado: str
+
+class CambioEstadoBulkRequest(BaseModel):
+    # Todas las licitaciones al mismo estado, o una transición por licitación en `cambios`
+    licitacion_ids: list[str] = []
+    nuevo_estado: str | None = None
+    cambios: list[CambioEstadoItem] = []
+    idempotency_key: str | None = None
+
+class SeccionBulkRequest(BaseModel):
+    licitacion_ids: list[str]
+    seccion: str
+    max_concurrency: int = BULK_MAX_CONCURRENCY
 
 @app.get("/")
 async def root():
@@ -53,9 +247,20 @@ async def root():
         "port": port,
         "endpoints": {
             "health": "/health",
+            "mcp": "/mcp",
             "tools": "/api/tools",
+            "cache_stats": "/api/cache/stats",
+            "upstream_stats": "/api/upstream/stats",
+            "prefetch_stats": "/api/prefetch/stats",
+            "ratelimit_stats": "/api/ratelimit/stats",
+            "metrics": "/metrics",
             "listar_licitaciones": "/api/licitaciones",
+            "buscar_licitaciones": "/api/licitaciones/buscar",
             "obtener_licitacion": "/api/licitaciones/{licitacion_id}",
+            "expediente": "/api/licitaciones/{licitacion_id}/expediente",
+            "bulk": "/api/licitaciones/bulk",
+            "estado_bulk": "/api/licitaciones/estado/bulk",
+            "trabajo": "/api/trabajos/{trabajo_id}",
         }
     }
 
@@ -64,144 +269,324 @@ async def health():
     """Endpoint de health check para Coolify."""
     return {"status": "healthy", "service": "mcp-licitaciones"}
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Contadores de la caché de respuestas (hits, misses, desalojos) y de la copia en disco."""
+    return {**response_cache.stats(), "snapshot": await asyncio.to_thread(snapshot_store.stats)}
+
+@app.get("/api/upstream/stats")
+async def upstream_stats():
+    """Estado del circuit breaker y contadores de reintentos por endpoint de la API."""
+    return upstream_resilience.stats()
+
+@app.get("/api/prefetch/stats")
+async def prefetch_stats():
+    """Estado de la precarga en segundo plano: profundidad de la cola, retraso y contadores."""
+    return prefetch_scheduler.stats()
+
+@app.get("/api/ratelimit/stats")
+async def ratelimit_stats():
+    """Límite de caudal hacia la API: tokens, colas por prioridad, esperas y rechazos."""
+    return upstream_limiter.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Métricas en formato Prometheus (herramientas, API upstream, REST y caché)."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/tools")
 async def list_tools():
     """Lista todas las herramientas disponibles."""
     return {
         "tools": [
             "listar_licitaciones",
+            "buscar_licitaciones",
             "obtener_licitacion_completa",
             "ver_correo_licitacion",
+            "leer_correo_licitacion",
             "obtener_detalles_licitacion",
             "obtener_documentos_requeridos",
             "cambiar_estado_licitacion",
+            "cambiar_estado_licitaciones",
+            "consultar_trabajo",
             "obtener_requisitos_experiencia",
             "obtener_requisitos_financieros",
             "obtener_requisitos_hv",
             "obtener_resumen_ia",
             "obtener_requisitos_tecnicos",
             "obtener_criterios_puntaje",
+            "obtener_expediente_licitacion",
+            "obtener_seccion_licitaciones",
         ]
     }
 
 # Endpoints HTTP para las herramientas MCP
-def parse_mcp_result(result_str: str):
-    """Parsea el resultado de una función MCP que devuelve JSON string."""
+def respuesta(data) -> FastJSONResponse:
+    """Envuelve el resultado ya parseado; se serializa una sola vez, sin pasar por texto.
+
+    Un texto es el mensaje de una consulta fallida ("Error: ..." o sin datos de la API): se
+    responde 502 para que ni el cliente ni los proxies guarden el fallo en caché.
+    """
+    if isinstance(data, str):
+        return FastJSONResponse({"success": False, "error": data}, status_code=502)
+    return FastJSONResponse({"success": True, "data": data})
+
+def error_http(e: Exception) -> HTTPException:
+    """429 con Retry-After si el limitador rechazó la petición a la API; 500 en otro caso."""
+    if isinstance(e, LimiteExcedido):
+        return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    return HTTPException(status_code=500, detail=str(e))
+
+# Envoltorio {"success": true, "data": ...} alrededor del cuerpo de la API reenviado tal cual
+_STREAM_INICIO = b'{"success":true,"data":'
+_STREAM_FIN = b"}"
+
+class StreamingAPIResponse(StreamingResponse):
+    """StreamingResponse que reenvía una respuesta abierta de la API y la cierra siempre.
+
+    El generador del cuerpo la cierra al terminar, pero si el cliente se desconecta antes
+    de que empiece (o entre trozos) solo este `finally` devuelve la conexión al pool.
+    """
+
+    def __init__(self, contenido, upstream, **kwargs):
+        super().__init__(contenido, **kwargs)
+        self.upstream = upstream
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.upstream.aclose()
+
+async def respuesta_seccion(licitacion_id: str, seccion: str, stream: bool):
+    """Respuesta de una sección; con `stream` y sin copia en caché el cuerpo de la API se reenvía por trozos.
+
+    El modo streaming no carga el cuerpo en memoria ni lo guarda en caché. Si la API anuncia
+    más de STREAM_MAX_BYTES se responde 413; si lo supera sin anunciarlo se corta la conexión.
+    """
+    restante = response_cache.ttl_restante((seccion, licitacion_id))
+    if not stream or (restante is not None and restante > 0):
+        return respuesta(await obtener_datos_seccion(licitacion_id, seccion))
     try:
-        return json.loads(result_str)
-    except json.JSONDecodeError:
-        return result_str
+        upstream = await abrir_seccion_stream(licitacion_id, seccion, STREAM_MAX_BYTES)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if isinstance(upstream, dict):
+        # Error de la API: la última copia conocida si la hay, sin volver a pedirla
+        return respuesta(await seccion_tras_error(licitacion_id, seccion, upstream))
+
+    async def cuerpo():
+        try:
+            yield _STREAM_INICIO
+            async for trozo in iterar_stream(upstream, STREAM_MAX_BYTES):
+                yield trozo
+            yield _STREAM_FIN
+        finally:
+            await upstream.aclose()
+
+    return StreamingAPIResponse(cuerpo(), upstream, media_type="application/json")
 
 @app.get("/api/licitaciones")
-async def api_listar_licitaciones():
-    """Lista todas las licitaciones disponibles."""
+async def api_listar_licitaciones(
+    estado: str | None = None,
+    entidad: str | None = None,
+    fecha_desde: str | None = None,
+    fecha_hasta: str | None = None,
+    fields: list[str] | None = Query(None),
+    limit: int = Query(LISTADO_DEFAULT_LIMIT, ge=1, le=LISTADO_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+):
+    """Lista las licitaciones con filtros, proyección de campos y paginación."""
     try:
-        result_str = await listar_licitaciones()
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await consultar_licitaciones(
+            estado, entidad, fecha_desde, fecha_hasta, fields, limit, offset
+        ))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
+
+@app.get("/api/licitaciones/buscar")
+async def api_buscar_licitaciones(
+    q: str = "",
+    estado: str | None = None,
+    entidad: str | None = None,
+    monto_min: float | None = None,
+    monto_max: float | None = None,
+    limit: int = Query(LISTADO_DEFAULT_LIMIT, ge=1, le=LISTADO_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+):
+    """Búsqueda por palabras clave en el índice local, con facetas."""
+    try:
+        return respuesta(await buscar(q, estado, entidad, monto_min, monto_max, limit, offset))
+    except Exception as e:
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}")
-async def api_obtener_licitacion_completa(licitacion_id: str):
-    """Obtiene información completa de una licitación."""
+async def api_obtener_licitacion_completa(licitacion_id: str, stream: bool = False):
+    """Obtiene información completa de una licitación (?stream=true la reenvía por trozos)."""
     try:
-        result_str = await obtener_licitacion_completa(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return await respuesta_seccion(licitacion_id, "completo", stream)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/correo")
-async def api_ver_correo(licitacion_id: str):
-    """Obtiene el correo original de una licitación."""
+async def api_ver_correo(licitacion_id: str, stream: bool = False):
+    """Obtiene el correo original de una licitación (?stream=true lo reenvía por trozos)."""
     try:
-        result_str = await ver_correo_licitacion(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return await respuesta_seccion(licitacion_id, "correo", stream)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/detalles")
 async def api_obtener_detalles(licitacion_id: str):
     """Obtiene detalles específicos de una licitación."""
     try:
-        result_str = await obtener_detalles_licitacion(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await obtener_datos_seccion(licitacion_id, "detalles"))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/documentos")
 async def api_obtener_documentos(licitacion_id: str):
     """Obtiene los documentos requeridos para una licitación."""
     try:
-        result_str = await obtener_documentos_requeridos(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await obtener_datos_seccion(licitacion_id, "documentos_requeridos"))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.post("/api/licitaciones/{licitacion_id}/estado")
-async def api_cambiar_estado(licitacion_id: str, request: CambioEstadoRequest):
+async def api_cambiar_estado(licitacion_id: str, request: CambioEstadoRequest, http_request: Request):
     """Cambia el estado de una licitación."""
     try:
-        result_str = await cambiar_estado_licitacion(licitacion_id, request.nuevo_estado)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        idempotency_key = request.idempotency_key or http_request.headers.get("Idempotency-Key")
+        return respuesta(await cambiar_estado(licitacion_id, request.nuevo_estado, idempotency_key))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/experiencia")
 async def api_obtener_experiencia(licitacion_id: str):
     """Obtiene los requisitos de experiencia."""
     try:
-        result_str = await obtener_requisitos_experiencia(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await obtener_datos_seccion(licitacion_id, "experiencia"))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/financiero")
 async def api_obtener_financiero(licitacion_id: str):
     """Obtiene los requisitos financieros."""
     try:
-        result_str = await obtener_requisitos_financieros(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await obtener_datos_seccion(licitacion_id, "financiero"))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/hv")
 async def api_obtener_hv(licitacion_id: str):
     """Obtiene los requisitos de hojas de vida."""
     try:
-        result_str = await obtener_requisitos_hv(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await obtener_datos_seccion(licitacion_id, "hv"))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/resumen-ia")
 async def api_obtener_resumen_ia(licitacion_id: str):
     """Obtiene el resumen generado por IA."""
     try:
-        result_str = await obtener_resumen_ia(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await obtener_datos_seccion(licitacion_id, "resumen_ia"))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/tecnicos")
 async def api_obtener_tecnicos(licitacion_id: str):
     """Obtiene los requisitos técnicos."""
     try:
-        result_str = await obtener_requisitos_tecnicos(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await obtener_datos_seccion(licitacion_id, "tecnicos"))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
 
 @app.get("/api/licitaciones/{licitacion_id}/puntaje")
 async def api_obtener_puntaje(licitacion_id: str):
     """Obtiene los criterios de evaluación y puntaje."""
     try:
-        result_str = await obtener_criterios_puntaje(licitacion_id)
-        return {"success": True, "data": parse_mcp_result(result_str)}
+        return respuesta(await obtener_datos_seccion(licitacion_id, "puntaje"))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise error_http(e)
+
+@app.get("/api/licitaciones/{licitacion_id}/expediente")
+async def api_obtener_expediente(licitacion_id: str, secciones: list[str] | None = Query(None)):
+    """Obtiene varias secciones de una licitación en paralelo (?secciones=detalles&secciones=hv)."""
+    try:
+        return respuesta(await obtener_expediente(licitacion_id, secciones))
+    except Exception as e:
+        raise error_http(e)
+
+@app.post("/api/licitaciones/bulk")
+async def api_seccion_bulk(request: SeccionBulkRequest):
+    """Obtiene una sección para varias licitaciones y la transmite como NDJSON según se completa."""
+    if request.seccion not in SECCIONES_LICITACION:
+        raise HTTPException(status_code=400, detail=f"Sección desconocida. Opciones: {', '.join(SECCIONES_LICITACION)}")
+    if len(request.licitacion_ids) > BULK_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Se admiten como máximo {BULK_MAX_IDS} licitaciones")
+
+    async def ndjson():
+        async for resultado in iterar_seccion_licitaciones(
+            request.licitacion_ids, request.seccion, request.max_concurrency
+        ):
+            if orjson is not None:
+                yield orjson.dumps(resultado) + b"\n"
+            else:
+                yield json.dumps(resultado, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/api/licitaciones/estado/bulk", status_code=202)
+async def api_cambiar_estado_bulk(request: CambioEstadoBulkRequest, http_request: Request):
+    """Encola cambios de estado masivos y devuelve el trabajo; el progreso se consulta en /api/trabajos/{id}."""
+    cambios = [(item.licitacion_id, item.nuevo_estado) for item in request.cambios]
+    if request.licitacion_ids:
+        if not request.nuevo_estado:
+            raise HTTPException(status_code=400, detail="Falta nuevo_estado para licitacion_ids")
+        cambios += [(licitacion_id, request.nuevo_estado) for licitacion_id in request.licitacion_ids]
+    idempotency_key = request.idempotency_key or http_request.headers.get("Idempotency-Key")
+    try:
+        trabajo = cola_estados.crear(cambios, idempotency_key)
+    except ClaveEnConflicto as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(
+        {"success": True, "data": trabajo},
+        status_code=202,
+        headers={"Location": f"/api/trabajos/{trabajo['trabajo_id']}"},
+    )
+
+@app.get("/api/trabajos/{trabajo_id}")
+async def api_consultar_trabajo(trabajo_id: str, items: bool = True):
+    """Progreso de un cambio de estado masivo y resultado por licitación."""
+    trabajo = cola_estados.obtener(trabajo_id, items)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"No existe el trabajo {trabajo_id}")
+    return respuesta(trabajo)
+
+# Debe ir después de todas las rutas: el montaje en "/" solo recibe lo que no coincide
+# con los endpoints REST (es decir, /mcp)
+if MCP_HTTP_ENABLED:
+    app.mount("/", mcp_http_app)
 
 if __name__ == "__main__":
     # Leer el puerto de la variable de entorno PORT (Coolify lo configura automáticamente)
     port = int(os.getenv("PORT", 8004))
     host = os.getenv("HOST", "0.0.0.0")
-    uvicorn.run(app, host=host, port=port)
+    # LICITACIONES_WORKERS > 1 arranca varios procesos que comparten socket y caché (ver workers.py)
+    graceful_timeout = float(os.getenv("LICITACIONES_GRACEFUL_TIMEOUT", "30"))
+    serve_prefork(
+        app,
+        host=host,
+        port=port,
+        workers=SERVER_WORKERS,
+        graceful_timeout=graceful_timeout,
+        min_uptime=float(os.getenv("LICITACIONES_WORKER_MIN_UPTIME", "10")),
+        backoff_max=float(os.getenv("LICITACIONES_WORKER_BACKOFF_MAX", "60")),
+        max_fallos=int(os.getenv("LICITACIONES_WORKER_MAX_FAILURES", "5")),
+    )
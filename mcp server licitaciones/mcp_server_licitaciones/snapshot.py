@@ -0,0 +1,225 @@
+"""
+Copia persistente en disco (SQLite) de las respuestas de la API de licitaciones.
+
+Cada sección descargada se guarda con la hora en que se obtuvo. Tras un reinicio la
+caché en memoria se calienta de forma perezosa desde aquí, y si la API falla se
+sirve la última copia conocida. El almacén está acotado por antigüedad y tamaño
+total; la compactación elimina lo que sobra y devuelve el espacio al sistema.
+
+Las copias pertenecen a una API (`origen`): si el fichero se abre con otra, se vacía
+en lugar de responder con datos de otro servidor (p. ej. un stub o staging).
+"""
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+SnapshotKey = tuple[str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot (
+    endpoint TEXT NOT NULL,
+    licitacion_id TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    PRIMARY KEY (endpoint, licitacion_id)
+);
+CREATE INDEX IF NOT EXISTS idx_snapshot_fetched ON snapshot(fetched_at);
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+"""
+
+
+def _con_bloqueo(metodo):
+    """Serializa el acceso a la conexión: el servidor usa el almacén desde hilos (`asyncio.to_thread`)."""
+
+    @functools.wraps(metodo)
+    def envoltorio(self, *args, **kwargs):
+        with self._lock:
+            return metodo(self, *args, **kwargs)
+
+    return envoltorio
+
+
+class SnapshotStore:
+    """Almacén clave → (valor, hora de descarga) en un fichero SQLite. Con `path` vacío no hace nada."""
+
+    def __init__(
+        self,
+        path: str,
+        origen: str = "",
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 7 * 24 * 3600,
+        compact_every: int = 500,
+    ):
+        self.path = path
+        self.origen = origen
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compact_every = compact_every
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self._lock = threading.RLock()
+        self._escrituras = 0
+        self.reads = 0
+        self.swr_served = 0
+        self.writes = 0
+        self.compactions = 0
+        self.removed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            directorio = os.path.dirname(self.path)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            # auto_vacuum solo tiene efecto en un fichero nuevo, antes de crear tablas
+            self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columnas = {row[1] for row in self._conn.execute("PRAGMA table_info(snapshot)")}
+            for columna in ("etag", "last_modified"):
+                if columna not in columnas:
+                    # Ficheros creados antes de guardar validadores HTTP
+                    self._conn.execute(f"ALTER TABLE snapshot ADD COLUMN {columna} TEXT")
+            self._comprobar_origen()
+            self._pid = os.getpid()
+            # Al abrir (arranque o nuevo worker) se descarta lo caducado
+            self.compactar()
+        return self._conn
+
+    def _comprobar_origen(self) -> None:
+        """Vacía el fichero si sus copias se descargaron de otra API (o de una desconocida)."""
+        if not self.origen:
+            return
+        row = self._conn.execute("SELECT valor FROM meta WHERE clave = 'origen'").fetchone()
+        if row is not None and row[0] == self.origen:
+            return
+        self._conn.execute("DELETE FROM snapshot")
+        self._conn.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('origen', ?)", (self.origen,))
+
+    @_con_bloqueo
+    def leer(self, key: SnapshotKey) -> tuple[Any, float] | None:
+        """Devuelve (valor, antigüedad en segundos) o None si no hay copia o supera `max_age`."""
+        if not self.enabled:
+            return None
+        row = self._db.execute(
+            "SELECT fetched_at, value FROM snapshot WHERE endpoint = ? AND licitacion_id = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        edad = max(0.0, time.time() - row[0])
+        if edad > self.max_age:
+            return None
+        self.reads += 1
+        return json.loads(row[1]), edad
+
+    @_con_bloqueo
+    def validadores(self, key: SnapshotKey) -> tuple[str | None, str | None] | None:
+        """(ETag, Last-Modified) con que la API sirvió la copia guardada, si los envió."""
+        if not self.enabled:
+            return None
+        row = self._db.execute(
+            "SELECT etag, last_modified FROM snapshot WHERE endpoint = ? AND licitacion_id = ?", key
+        ).fetchone()
+        if row is None or (row[0] is None and row[1] is None):
+            return None
+        return row[0], row[1]
+
+    @_con_bloqueo
+    def guardar(
+        self, key: SnapshotKey, value: Any, validadores: tuple[str | None, str | None] | None = None
+    ) -> None:
+        if not self.enabled:
+            return
+        etag, last_modified = validadores or (None, None)
+        texto = json.dumps(value, ensure_ascii=False)
+        self._db.execute(
+            """
+            INSERT OR REPLACE INTO snapshot (endpoint, licitacion_id, fetched_at, size, value, etag, last_modified)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (*key, time.time(), len(texto.encode()), texto, etag, last_modified),
+        )
+        self.writes += 1
+        self._escrituras += 1
+        if self._escrituras >= self.compact_every:
+            self.compactar()
+
+    @_con_bloqueo
+    def renovar(self, key: SnapshotKey) -> None:
+        """Marca la copia como recién comprobada (la API respondió 304 Not Modified)."""
+        if self.enabled:
+            self._db.execute(
+                "UPDATE snapshot SET fetched_at = ? WHERE endpoint = ? AND licitacion_id = ?", (time.time(), *key)
+            )
+
+    @_con_bloqueo
+    def borrar(self, key: SnapshotKey) -> None:
+        if self.enabled:
+            self._db.execute("DELETE FROM snapshot WHERE endpoint = ? AND licitacion_id = ?", key)
+
+    @_con_bloqueo
+    def borrar_licitacion(self, licitacion_id: str) -> None:
+        if self.enabled:
+            self._db.execute("DELETE FROM snapshot WHERE licitacion_id = ?", (licitacion_id,))
+
+    @_con_bloqueo
+    def compactar(self) -> dict[str, int]:
+        """Elimina las copias más viejas que `max_age` y, si se supera `max_bytes`, las más antiguas."""
+        if not self.enabled:
+            return {"por_edad": 0, "por_tamano": 0}
+        db = self._db
+        self._escrituras = 0
+        por_edad = db.execute("DELETE FROM snapshot WHERE fetched_at < ?", (time.time() - self.max_age,)).rowcount
+
+        por_tamano = 0
+        sobrante = (db.execute("SELECT COALESCE(SUM(size), 0) FROM snapshot").fetchone()[0]) - self.max_bytes
+        if sobrante > 0:
+            borrar = []
+            for rowid, size in db.execute("SELECT rowid, size FROM snapshot ORDER BY fetched_at"):
+                if sobrante <= 0:
+                    break
+                borrar.append((rowid,))
+                sobrante -= size
+            db.executemany("DELETE FROM snapshot WHERE rowid = ?", borrar)
+            por_tamano = len(borrar)
+
+        if por_edad or por_tamano:
+            db.execute("PRAGMA incremental_vacuum")
+        self.compactions += 1
+        self.removed += por_edad + por_tamano
+        return {"por_edad": por_edad, "por_tamano": por_tamano}
+
+    @_con_bloqueo
+    def stats(self) -> dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        entradas, bytes_totales = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM snapshot"
+        ).fetchone()
+        return {
+            "enabled": True,
+            "path": self.path,
+            "origen": self.origen,
+            "entries": entradas,
+            "bytes": bytes_totales,
+            "max_bytes": self.max_bytes,
+            "max_age": self.max_age,
+            "reads": self.reads,
+            "swr_served": self.swr_served,
+            "writes": self.writes,
+            "compactions": self.compactions,
+            "removed": self.removed,
+        }
@@ -0,0 +1,172 @@
+"""
+Trazas distribuidas compatibles con OpenTelemetry: agente → herramienta MCP → API de licitaciones.
+
+Desactivadas por defecto. `configurar(servicio)` instala el TracerProvider del
+proceso con el exportador de `LICITACIONES_TRACE_EXPORTER`:
+
+- "console": un JSON por span en stderr (stdout es del protocolo MCP por stdio);
+- "file": una línea JSON por span en `LICITACIONES_TRACE_FILE`;
+- "otlp": OTLP/HTTP según las variables estándar `OTEL_EXPORTER_OTLP_*`
+  (requiere `opentelemetry-exporter-otlp-proto-http`, que ya instala google-adk).
+
+El muestreo lo decide la raíz de la traza (`LICITACIONES_TRACE_SAMPLE_RATIO`) y lo
+heredan los demás servicios. El contexto viaja en `traceparent`: como cabecera HTTP
+(REST y API de licitaciones) y en `_meta` de las llamadas MCP, también por stdio.
+
+Sin opentelemetry instalado, o con las trazas desactivadas, `span` no hace nada.
+Este módulo es el mismo en el servidor MCP y en el agente de frontend/my-agent.
+"""
+import os
+import sys
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # opentelemetry es opcional: sin él las trazas no hacen nada
+    trace = None
+
+try:
+    from mcp.server.lowlevel.server import request_ctx
+except ImportError:  # en el agente no hay servidor MCP
+    request_ctx = None
+
+TRACE_EXPORTER = os.getenv("LICITACIONES_TRACE_EXPORTER", "none")
+TRACE_FILE = os.getenv("LICITACIONES_TRACE_FILE", "/tmp/licitaciones_traces.jsonl")
+TRACE_SAMPLE_RATIO = float(os.getenv("LICITACIONES_TRACE_SAMPLE_RATIO", "0.1"))
+
+# Variables que el agente pasa al servidor MCP que lanza por stdio
+VARIABLES_ENTORNO = ("LICITACIONES_TRACE_", "OTEL_")
+
+activo = False
+tracer = trace.get_tracer("licitaciones") if trace is not None else None
+_KINDS = (
+    {"internal": SpanKind.INTERNAL, "server": SpanKind.SERVER, "client": SpanKind.CLIENT}
+    if trace is not None else {}
+)
+
+
+def _provider_sdk() -> bool:
+    """True si ya hay un TracerProvider del SDK (p. ej. el que instala `adk web`)."""
+    return hasattr(trace.get_tracer_provider(), "add_span_processor")
+
+
+def _exportador() -> Any:
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if TRACE_EXPORTER == "console":
+        return ConsoleSpanExporter(out=sys.stderr)
+    if TRACE_EXPORTER == "file":
+        fichero = open(TRACE_FILE, "a", encoding="utf-8", buffering=1)
+        return ConsoleSpanExporter(out=fichero, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if TRACE_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    raise ValueError(f"Exportador de trazas desconocido: {TRACE_EXPORTER} (console, file, otlp)")
+
+
+def configurar(servicio: str) -> bool:
+    """Instala el TracerProvider del proceso una sola vez y devuelve si las trazas quedan activas.
+
+    Si otro componente ya configuró OpenTelemetry se usan sus exportadores.
+    """
+    global activo
+    if trace is None or activo:
+        return activo
+    if _provider_sdk():
+        activo = True
+        return activo
+    if TRACE_EXPORTER in ("", "none"):
+        return activo
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", servicio)}),
+            sampler=ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATIO)),
+        )
+        provider.add_span_processor(BatchSpanProcessor(_exportador()))
+    except ImportError as e:
+        print(f"Trazas desactivadas: falta {e.name} para LICITACIONES_TRACE_EXPORTER={TRACE_EXPORTER}", file=sys.stderr)
+        return activo
+    # El SDK vacía los spans pendientes al salir (atexit) y rehace el hilo exportador tras un fork
+    trace.set_tracer_provider(provider)
+    activo = True
+    return activo
+
+
+@contextmanager
+def span(nombre: str, kind: str = "internal", contexto: Any = None, **atributos: Any) -> Iterator[Any]:
+    """Span hijo del actual (o del `contexto` extraído de otro servicio); None si no se graba.
+
+    Dentro de una traza descartada por el muestreo no se crean spans hijos (tampoco se
+    grabarían): el contexto actual sigue propagándose igual. Una excepción que salga
+    del bloque se registra en el span y lo marca como error.
+    """
+    if not activo:
+        yield None
+        return
+    if contexto is None:
+        padre = trace.get_current_span()
+        if padre.get_span_context().is_valid and not padre.is_recording():
+            yield None
+            return
+    with tracer.start_as_current_span(
+        nombre,
+        context=contexto,
+        kind=_KINDS[kind],
+        attributes={clave: valor for clave, valor in atributos.items() if valor is not None},
+    ) as actual:
+        yield actual
+
+
+def anotar(actual: Any, **atributos: Any) -> None:
+    """Añade atributos (los None se omiten) a un span devuelto por `span`."""
+    if actual is not None:
+        for clave, valor in atributos.items():
+            if valor is not None:
+                actual.set_attribute(clave, valor)
+
+
+def error(actual: Any, mensaje: str) -> None:
+    """Marca como error un span que terminó sin excepción (p. ej. un 5xx o un dict con `error`)."""
+    if actual is not None:
+        actual.set_status(Status(StatusCode.ERROR, mensaje))
+
+
+def inyectar(portador: dict[str, Any]) -> dict[str, Any]:
+    """Añade `traceparent` (y `tracestate`) del span actual a unas cabeceras o a un `_meta` MCP."""
+    if activo:
+        propagate.inject(portador)
+    return portador
+
+
+def extraer(portador: Mapping[str, Any] | None) -> Any:
+    """Contexto remoto de un portador con `traceparent`, o None para seguir con el contexto actual."""
+    if not activo or not portador or "traceparent" not in portador:
+        return None
+    return propagate.extract(portador)
+
+
+def contexto_mcp() -> Any:
+    """Contexto de traza de la petición MCP en curso: `_meta` de la llamada o, por HTTP, sus cabeceras."""
+    peticion = request_ctx.get(None) if activo and request_ctx is not None else None
+    if peticion is None:
+        return None
+    if peticion.meta is not None:
+        contexto = extraer(peticion.meta.model_dump(exclude_none=True))
+        if contexto is not None:
+            return contexto
+    cabeceras = getattr(peticion.request, "headers", None)
+    return extraer(cabeceras)
+
+
+def entorno() -> dict[str, str]:
+    """Variables de trazas de este proceso, para propagarlas a un subproceso (servidor MCP por stdio)."""
+    return {clave: valor for clave, valor in os.environ.items() if clave.startswith(VARIABLES_ENTORNO)}
@@ -0,0 +1,150 @@
+"""
+Lanzador multi-proceso (pre-fork) para server.py.
+
+El proceso maestro importa la aplicación una sola vez, abre el socket y crea N
+workers con fork: el código y los módulos importados se comparten copy-on-write
+entre todos. Cada worker ejecuta su propio bucle de uvicorn sobre el socket común
+y el kernel reparte las conexiones.
+
+Señales: SIGTERM/SIGINT en el maestro se reenvían a los workers, que dejan de
+aceptar conexiones y terminan las peticiones en curso (hasta `graceful_timeout`
+segundos); después se fuerza la salida.
+
+Un worker que muere se vuelve a crear. Si muere nada más arrancar (menos de
+`min_uptime` segundos: un fallo de configuración, el puerto de la base de datos...)
+se espera antes de relanzarlo, el doble cada vez hasta `backoff_max`; tras
+`max_fallos` fallos rápidos seguidos se deja de relanzar y, si no queda ninguno,
+el maestro termina con error para que lo vea el supervisor.
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    familia = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, graceful_timeout: float) -> None:
+    # El worker no hereda los manejadores del maestro; uvicorn instala los suyos
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, timeout_graceful_shutdown=graceful_timeout, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _espera_relanzar(fallos: int, backoff: float, backoff_max: float) -> float:
+    """Segundos antes de relanzar un worker tras `fallos` fallos rápidos seguidos."""
+    return 0.0 if fallos <= 0 else min(backoff * 2 ** (fallos - 1), backoff_max)
+
+
+def serve_prefork(
+    app,
+    host: str,
+    port: int,
+    workers: int,
+    graceful_timeout: float = 30.0,
+    min_uptime: float = 10.0,
+    backoff: float = 1.0,
+    backoff_max: float = 60.0,
+    max_fallos: int = 5,
+) -> None:
+    """Sirve `app` con `workers` procesos hijos que comparten el socket de escucha."""
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run(app, host=host, port=port, timeout_graceful_shutdown=graceful_timeout)
+        return
+
+    sock = _bind(host, port)
+    # Mueve los objetos ya creados a la generación permanente para que el GC no
+    # los toque en los hijos y las páginas sigan compartidas
+    gc.collect()
+    gc.freeze()
+
+    hijos: dict[int, int] = {}
+    inicios: dict[int, float] = {}
+    fallos = [0] * workers
+    # Workers muertos a la espera de relanzarse: índice → instante
+    pendientes: dict[int, float] = {}
+    parando = False
+
+    def lanzar(indice: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Permite a la aplicación saber qué worker es (p. ej. solo el 0 ejecuta la precarga)
+            os.environ["LICITACIONES_WORKER_INDEX"] = str(indice)
+            try:
+                _run_worker(app, sock, graceful_timeout)
+            finally:
+                os._exit(0)
+        hijos[pid] = indice
+        inicios[pid] = time.monotonic()
+        print(f"Worker {indice} iniciado (pid {pid})", file=sys.stderr)
+
+    def parar(signum, _frame) -> None:
+        nonlocal parando
+        parando = True
+        for pid in list(hijos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, parar)
+    signal.signal(signal.SIGINT, parar)
+
+    print(f"Sirviendo en http://{host}:{port} con {workers} workers (pid maestro {os.getpid()})", file=sys.stderr)
+    for indice in range(workers):
+        lanzar(indice)
+
+    limite: float | None = None
+    while hijos or (pendientes and not parando):
+        if parando and limite is None:
+            limite = time.monotonic() + graceful_timeout + 5
+        pid, status = 0, 0
+        if hijos:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+        if pid == 0:
+            if limite is not None and time.monotonic() > limite:
+                for pid_restante in list(hijos):
+                    os.kill(pid_restante, signal.SIGKILL)
+                limite = float("inf")
+            ahora = time.monotonic()
+            for indice, instante in list(pendientes.items()):
+                if not parando and ahora >= instante:
+                    del pendientes[indice]
+                    lanzar(indice)
+            time.sleep(0.1)
+            continue
+        indice = hijos.pop(pid, None)
+        vida = time.monotonic() - inicios.pop(pid, time.monotonic())
+        if indice is None or parando:
+            continue
+        fallos[indice] = fallos[indice] + 1 if vida < min_uptime else 0
+        if fallos[indice] >= max_fallos:
+            print(
+                f"Worker {indice} terminó ({status}) {fallos[indice]} veces seguidas al arrancar; no se relanza",
+                file=sys.stderr,
+            )
+            continue
+        espera = _espera_relanzar(fallos[indice], backoff, backoff_max)
+        print(f"Worker {indice} terminó ({status}); relanzando en {espera:g} s", file=sys.stderr)
+        pendientes[indice] = time.monotonic() + espera
+
+    sock.close()
+    if not parando:
+        print("Todos los workers fallaron al arrancar; el maestro termina", file=sys.stderr)
+        sys.exit(1)
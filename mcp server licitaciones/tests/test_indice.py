@@ -0,0 +1,46 @@
+"""
+Conversión de los montos del índice: separadores de miles y decimales.
+
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+from indice import _a_numero
+
+
+@pytest.mark.parametrize(
+    ("valor", "esperado"),
+    [
+        ("1.500", 1500.0),
+        ("1,500", 1500.0),
+        ("$ 12.345", 12345.0),
+        ("1.500.000", 1_500_000.0),
+        ("1,500,000", 1_500_000.0),
+        ("$ 1,500,000.50", 1_500_000.5),
+        ("1.500.000,50", 1_500_000.5),
+        ("1.500,25", 1500.25),
+    ],
+)
+def test_separadores_de_miles(valor, esperado):
+    assert _a_numero(valor) == esperado
+
+
+@pytest.mark.parametrize(
+    ("valor", "esperado"),
+    [("1.5", 1.5), ("1,5", 1.5), ("2.75", 2.75), ("1,50", 1.5), ("0.500", 0.5), (".5", 0.5), ("1500", 1500.0)],
+)
+def test_decimales(valor, esperado):
+    assert _a_numero(valor) == esperado
+
+
+@pytest.mark.parametrize(
+    ("valor", "esperado"),
+    [(1500000, 1_500_000.0), (2.5, 2.5), (True, None), (None, None), ("", None), ("n/a", None)],
+)
+def test_valores_no_textuales_o_vacios(valor, esperado):
+    assert _a_numero(valor) == esperado
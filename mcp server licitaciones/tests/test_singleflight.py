@@ -0,0 +1,65 @@
+"""
+N GETs concurrentes a la misma URL producen una sola petición a la API (single-flight).
+
+Se llama directamente a `make_licitaciones_request`, sin la caché de respuestas ni la
+copia en disco delante, contra el stub de `benchmarks/stub_api.py`.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import socket
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / "mcp_server_licitaciones"))
+sys.path.insert(0, str(RAIZ / "benchmarks"))
+
+from stub_api import StubConfig, run_stub
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PUERTO = _puerto_libre()
+# licitaciones lee la configuración al importarse
+os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+os.environ["LICITACIONES_CACHE_BACKEND"] = "memory"
+os.environ["LICITACIONES_RATE_GLOBAL"] = "0"
+os.environ["LICITACIONES_RATE_PER_CALLER"] = "0"
+
+import licitaciones
+
+CONCURRENCIA = 50
+
+
+async def _en_paralelo(*urls: str) -> list:
+    async with licitaciones.http_client_lifespan():
+        return await asyncio.gather(
+            *(licitaciones.make_licitaciones_request(url) for url in urls for _ in range(CONCURRENCIA))
+        )
+
+
+def test_peticiones_concurrentes_a_la_misma_url_salen_una_vez():
+    config = StubConfig(latency_ms=50)
+    with run_stub(config, port=PUERTO) as base_url:
+        resultados = asyncio.run(_en_paralelo(f"{base_url}/api/licitaciones/X/detalles"))
+
+    assert config.hits["/api/licitaciones/X/detalles"] == 1
+    assert sum(config.hits.values()) == 1
+    assert all(resultado == resultados[0] for resultado in resultados)
+    assert "error" not in resultados[0]
+    assert not licitaciones._inflight_requests
+
+
+def test_urls_distintas_no_se_agrupan():
+    config = StubConfig(latency_ms=50)
+    with run_stub(config, port=PUERTO) as base_url:
+        asyncio.run(_en_paralelo(f"{base_url}/api/licitaciones/X/detalles", f"{base_url}/api/licitaciones/Y/detalles"))
+
+    assert config.hits["/api/licitaciones/X/detalles"] == 1
+    assert config.hits["/api/licitaciones/Y/detalles"] == 1
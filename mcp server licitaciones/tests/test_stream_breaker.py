@@ -0,0 +1,61 @@
+"""
+`abrir_seccion_stream` libera la petición de prueba del circuit breaker (half_open)
+salga como salga, también con una excepción inesperada del cliente HTTP.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_server_licitaciones"))
+
+os.environ["LICITACIONES_SNAPSHOT_PATH"] = ""
+os.environ["LICITACIONES_RATE_GLOBAL"] = "0"
+os.environ["LICITACIONES_RATE_PER_CALLER"] = "0"
+
+import licitaciones
+
+
+class _ClienteQueFalla(httpx.AsyncClient):
+    async def send(self, request, **kwargs):
+        raise RuntimeError("fallo inesperado")
+
+
+def _breaker_half_open():
+    breaker = licitaciones.upstream_resilience.breaker("correo")
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+    breaker.trial_in_flight = False
+    return breaker
+
+
+def test_excepcion_inesperada_libera_la_prueba_del_half_open(monkeypatch):
+    cliente = _ClienteQueFalla()
+    monkeypatch.setattr(licitaciones, "get_http_client", lambda: cliente)
+    breaker = _breaker_half_open()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(licitaciones.abrir_seccion_stream("X", "correo"))
+
+    assert breaker.state == "half_open"
+    assert not breaker.trial_in_flight
+    # La siguiente petición puede hacer de prueba en lugar de quedar en cortocircuito
+    assert breaker.allow()
+
+
+def test_limite_excedido_libera_la_prueba_del_half_open(monkeypatch):
+    async def sin_turno():
+        raise licitaciones.LimiteExcedido("global", 1.0)
+
+    monkeypatch.setattr(licitaciones.upstream_limiter, "adquirir", sin_turno)
+    breaker = _breaker_half_open()
+
+    with pytest.raises(licitaciones.LimiteExcedido):
+        asyncio.run(licitaciones.abrir_seccion_stream("X", "correo"))
+
+    assert not breaker.trial_in_flight